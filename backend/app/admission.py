@@ -0,0 +1,268 @@
+"""
+Admission control for CPU-heavy endpoints.
+
+Each pool (code execution, auth) admits at most max_in_flight requests at
+a time. Excess requests wait in a FIFO of at most max_queued for up to
+queue_timeout seconds; beyond that, or when the recent handler latency
+says the wait would exceed queue_timeout anyway, they are shed with 503.
+Every client also has a token bucket per pool (user id for execution,
+client address for auth) and gets 429 once it is empty. Behind reverse
+proxies the client address is read from X-Forwarded-For, skipping the
+entries appended by the configured number of trusted proxy hops. Rejections carry
+a Retry-After header.
+
+Admission runs on the event loop as a FastAPI dependency whose slot is
+held until the response, including a streamed one, has been sent.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from app.config import settings
+from app.security.tokens import get_current_user_id
+
+EXECUTE = "execute"
+AUTH = "auth"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """
+    Per-key token buckets refilled at rate tokens per second up to burst.
+
+    Only the max_keys most recently used keys are tracked; a forgotten key
+    starts again with a full bucket, which is what an idle key would have.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def take(self, key) -> float:
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    In-flight limit, bounded wait queue and per-client rate limit for one pool.
+
+    latency is an exponentially weighted moving average of how long
+    admitted requests held their slot; it sizes Retry-After and the
+    expected queue wait. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queued: int,
+        queue_timeout: float,
+        client_rate: float,
+        client_burst: int,
+        latency_weight: float = 0.2,
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.latency_weight = latency_weight
+
+        self.buckets = TokenBuckets(client_rate, client_burst)
+        self.in_flight = 0
+        self.latency = 0.0
+        self._waiters = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def expected_wait(self) -> float:
+        return self.latency * (len(self._waiters) + 1) / self.max_in_flight
+
+    def _overloaded(self, detail: str) -> AdmissionRejected:
+        self.shed += 1
+        return AdmissionRejected(503, detail, self.expected_wait())
+
+    async def acquire(self, key) -> float:
+        """Wait for a slot. Returns the admission time to pass to release()."""
+        wait = self.buckets.take(key)
+        if wait:
+            self.rate_limited += 1
+            raise AdmissionRejected(429, "Too many requests", wait)
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return time.monotonic()
+
+        if len(self._waiters) >= self.max_queued or self.expected_wait() > self.queue_timeout:
+            raise self._overloaded("Server is overloaded")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the wait expired.
+            if waiter.cancelled():
+                self.timed_out += 1
+                raise self._overloaded("Timed out waiting for capacity")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, admitted_at: float):
+        elapsed = time.monotonic() - admitted_at
+        self.latency += self.latency_weight * (elapsed - self.latency)
+        self._hand_over()
+
+    def _hand_over(self):
+        """Pass a freed slot straight to the oldest live waiter, if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": len(self._waiters),
+            "latency_seconds": round(self.latency, 6),
+            "tracked_clients": len(self.buckets),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
+
+
+_controllers = {}
+
+
+def start_admission(limits: dict, queue_timeout: float, client_rate: float, client_burst: int) -> dict:
+    """limits maps each pool name to its (max_in_flight, max_queued)."""
+    if not _controllers:
+        for name, (max_in_flight, max_queued) in limits.items():
+            _controllers[name] = AdmissionController(
+                name=name,
+                max_in_flight=max_in_flight,
+                max_queued=max_queued,
+                queue_timeout=queue_timeout,
+                client_rate=client_rate,
+                client_burst=client_burst,
+            )
+    return _controllers
+
+
+def stop_admission():
+    _controllers.clear()
+
+
+def get_admission_controller(name: str):
+    return _controllers.get(name)
+
+
+def admission_status() -> dict:
+    return {name: controller.stats() for name, controller in _controllers.items()}
+
+
+@asynccontextmanager
+async def admission_slot(name: str, key):
+    controller = get_admission_controller(name)
+    if controller is None:
+        yield
+        return
+
+    try:
+        admitted_at = await controller.acquire(key)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+    try:
+        yield
+    finally:
+        controller.release(admitted_at)
+
+
+async def admit_execution(user_id: int = Depends(get_current_user_id)):
+    """FastAPI dependency admitting a code execution for the current user."""
+    async with admission_slot(EXECUTE, user_id):
+        yield
+
+
+def client_address(request: Request, trusted_proxy_hops: int) -> Optional[str]:
+    """
+    The address of the client behind trusted_proxy_hops reverse proxies.
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is the entry that many places from the
+    end; anything before it was supplied by the client and is ignored.
+    """
+    peer = request.client.host if request.client else None
+    if trusted_proxy_hops <= 0:
+        return peer
+
+    forwarded = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    if not forwarded:
+        return peer
+    return forwarded[-min(trusted_proxy_hops, len(forwarded))]
+
+
+async def admit_auth(request: Request):
+    """FastAPI dependency admitting an auth request, rate limited per client address."""
+    async with admission_slot(AUTH, client_address(request, settings.admission_trusted_proxy_hops)):
+        yield
@@ -0,0 +1,258 @@
+"""
+Cohort analytics over the v1 signal definitions.
+
+load_cohort() reads every session of a cohort with its run and error
+timestamps in a single query, as epoch seconds straight into NumPy arrays.
+session_signals() then evaluates the same definitions as
+app.signal_engine.build_signals for all sessions at once, and
+summarize() reduces them to shares, percentiles and histograms. Nothing
+here loops over sessions in Python except for archived sessions, whose
+events are read back from the archive.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import Float, and_, cast, func, literal, select
+from sqlalchemy.engine import Connection
+
+from app.execution.archive import EPOCH, get_archive_store
+from app.models.events import error_events, run_events
+from app.models.sessions import sessions
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+MISSING = -1.0
+
+COHORT_COLUMNS = 8
+
+
+def _epoch_seconds(column, dialect_name: str):
+    if dialect_name == "postgresql":
+        return cast(func.extract("epoch", column), Float)
+    if dialect_name == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    raise NotImplementedError(f"Cohort analytics is not supported on {dialect_name}")
+
+
+@dataclass
+class CohortEvents:
+    """
+    Event timestamps of a cohort, in epoch seconds.
+
+    Sessions are sorted by id. run_session and error_session hold the
+    index into session_ids of the session each run or error belongs to.
+    ended is NaN for sessions that have not ended.
+    """
+    session_ids: np.ndarray
+    started: np.ndarray
+    ended: np.ndarray
+    run_session: np.ndarray
+    run_at: np.ndarray
+    error_session: np.ndarray
+    error_at: np.ndarray
+
+
+def cohort_query(
+    dialect_name: str,
+    prompt_text: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+):
+    """One row per (session, run, error), with NULLs coalesced to MISSING."""
+    def epoch(column):
+        return func.coalesce(_epoch_seconds(column, dialect_name), literal(MISSING))
+
+    query = select(
+        sessions.c.id,
+        epoch(sessions.c.started_at),
+        epoch(sessions.c.ended_at),
+        func.coalesce(run_events.c.id, literal(MISSING)),
+        epoch(run_events.c.executed_at),
+        func.coalesce(error_events.c.id, literal(MISSING)),
+        epoch(error_events.c.occurred_at),
+        sessions.c.archived_at.is_not(None),
+    ).select_from(
+        sessions
+        .outerjoin(run_events, run_events.c.session_id == sessions.c.id)
+        .outerjoin(error_events, error_events.c.run_id == run_events.c.id)
+    )
+
+    conditions = []
+    if prompt_text is not None:
+        conditions.append(sessions.c.prompt_text == prompt_text)
+    if started_after is not None:
+        conditions.append(sessions.c.started_at >= started_after)
+    if started_before is not None:
+        conditions.append(sessions.c.started_at < started_before)
+    if conditions:
+        query = query.where(and_(*conditions))
+    return query
+
+
+def _archived_events(archive_dir: str, session_ids, started):
+    runs_session, runs_at, errors_session, errors_at = [], [], [], []
+    store = get_archive_store(archive_dir)
+    for index, session_id in session_ids:
+        session_started = EPOCH + timedelta(seconds=float(started[index]))
+        runs, errors = store.session_events(int(session_id), session_started)
+        runs_session.extend([index] * len(runs))
+        runs_at.extend((executed_at - EPOCH).total_seconds() for _, executed_at in runs)
+        errors_session.extend([index] * len(errors))
+        errors_at.extend((occurred_at - EPOCH).total_seconds() for _, occurred_at, _, _ in errors)
+    return (
+        np.array(runs_session, dtype=np.int64),
+        np.array(runs_at, dtype=np.float64),
+        np.array(errors_session, dtype=np.int64),
+        np.array(errors_at, dtype=np.float64),
+    )
+
+
+def load_cohort(
+    conn: Connection,
+    prompt_text: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    archive_dir: Optional[str] = None,
+) -> CohortEvents:
+    """
+    Load a cohort's sessions and event timestamps.
+
+    Sessions whose events were archived are filled in from archive_dir;
+    without it they count as sessions with no runs.
+    """
+    rows = conn.execute(
+        cohort_query(conn.dialect.name, prompt_text, started_after, started_before)
+    ).all()
+    # fromiter over the flattened rows is an order of magnitude faster than
+    # np.array(rows), which inspects every Row as a generic sequence.
+    table = np.fromiter(
+        chain.from_iterable(rows), dtype=np.float64, count=len(rows) * COHORT_COLUMNS
+    ).reshape(-1, COHORT_COLUMNS)
+
+    session_ids, first_row, row_session = np.unique(
+        table[:, 0].astype(np.int64), return_index=True, return_inverse=True
+    )
+    started = table[first_row, 1]
+    ended = table[first_row, 2].copy()
+    ended[ended == MISSING] = np.nan
+
+    # A run joined to several errors appears once per error.
+    has_run = table[:, 3] != MISSING
+    _, first_run_row = np.unique(table[has_run, 3], return_index=True)
+    run_session = row_session[has_run][first_run_row]
+    run_at = table[has_run, 4][first_run_row]
+
+    has_error = table[:, 5] != MISSING
+    error_session = row_session[has_error]
+    error_at = table[has_error, 6]
+
+    archived = np.flatnonzero(table[first_row, 7] == 1)
+    if archive_dir is not None and len(archived):
+        extra = _archived_events(archive_dir, zip(archived, session_ids[archived]), started)
+        run_session = np.concatenate([run_session, extra[0]])
+        run_at = np.concatenate([run_at, extra[1]])
+        error_session = np.concatenate([error_session, extra[2]])
+        error_at = np.concatenate([error_at, extra[3]])
+
+    return CohortEvents(
+        session_ids=session_ids,
+        started=started,
+        ended=ended,
+        run_session=run_session,
+        run_at=run_at,
+        error_session=error_session,
+        error_at=error_at,
+    )
+
+
+def session_signals(events: CohortEvents) -> Dict[str, np.ndarray]:
+    """
+    The v1 signal values of every session in the cohort, one array each.
+
+    Minutes are rounded half-to-even like round() in build_signals, and are
+    NaN where build_signals would omit the signal.
+    """
+    count = len(events.session_ids)
+
+    run_count = np.bincount(events.run_session, minlength=count)
+    error_count = np.bincount(events.error_session, minlength=count)
+
+    first_run_at = np.full(count, np.inf)
+    np.minimum.at(first_run_at, events.run_session, events.run_at)
+    first_error_at = np.full(count, np.inf)
+    np.minimum.at(first_error_at, events.error_session, events.error_at)
+
+    after_first_error = events.run_at > first_error_at[events.run_session]
+    runs_after_first_error = np.bincount(events.run_session[after_first_error], minlength=count)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        time_to_first_run = np.where(
+            run_count > 0, np.round((first_run_at - events.started) / 60), np.nan
+        )
+        error_rate = np.where(run_count > 0, error_count / run_count, np.nan)
+    session_duration = np.round((events.ended - events.started) / 60)
+
+    return {
+        "run_count": run_count,
+        "error_count": error_count,
+        "error_rate": error_rate,
+        "repeated_execution": run_count > 1,
+        "errors_present": error_count > 0,
+        "error_followed_by_run": (error_count > 0) & (runs_after_first_error > 0),
+        "time_to_first_run_minutes": time_to_first_run,
+        "session_duration_minutes": session_duration,
+    }
+
+
+def distribution(values: np.ndarray, bins: int) -> dict:
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"count": 0, "mean": None, "percentiles": {}, "histogram": {"edges": [], "counts": []}}
+
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "count": int(len(values)),
+        "mean": float(np.mean(values)),
+        "percentiles": {
+            f"p{p}": float(value)
+            for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def summarize(events: CohortEvents, bins: int = 20) -> dict:
+    """Cohort totals, share of sessions showing each signal, and distributions."""
+    signals = session_signals(events)
+    sessions_count = len(events.session_ids)
+    runs = int(len(events.run_at))
+    errors = int(len(events.error_at))
+
+    def share(flags):
+        return float(np.mean(flags)) if sessions_count else None
+
+    return {
+        "sessions": sessions_count,
+        "runs": runs,
+        "errors": errors,
+        "error_rate": errors / runs if runs else None,
+        "shares": {
+            "ran_code": share(signals["run_count"] > 0),
+            "repeated_execution": share(signals["repeated_execution"]),
+            "errors_present": share(signals["errors_present"]),
+            "error_followed_by_run": share(signals["error_followed_by_run"]),
+        },
+        "distributions": {
+            key: distribution(signals[key].astype(np.float64), bins)
+            for key in (
+                "run_count",
+                "error_count",
+                "error_rate",
+                "time_to_first_run_minutes",
+                "session_duration_minutes",
+            )
+        },
+    }
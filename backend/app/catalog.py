@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from array import array
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.prompts import prompt_catalog_version, prompts
+
+CATALOG_VERSION_ID = 1
+
+
+def bump_catalog_version(conn: Connection):
+    """Mark the catalog changed; call in the transaction that writes prompts."""
+    conn.execute(
+        update(prompt_catalog_version)
+        .where(prompt_catalog_version.c.id == CATALOG_VERSION_ID)
+        .values(version=prompt_catalog_version.c.version + 1)
+    )
+
+
+class PromptCatalog:
+    """
+    In-memory copy of the prompt catalog for O(1) uniform random picks.
+
+    Holds prompt ids in a compact int64 array with texts in a parallel list.
+    Once ttl_seconds have passed, the next pick triggers a background
+    primary-key read of prompt_catalog_version, and reloads only when the
+    version changed. Writers of prompts, including import_prompts.py and
+    seed_prompts.py in their own processes, bump it with
+    bump_catalog_version(). While the cache is cold, picks fall back to an
+    indexed random-id seek in the database.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._ids = array("q")
+        self._texts = []
+        self._version = None
+        self._loaded_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def pick_cached(self, engine: Engine) -> Tuple[bool, Optional[Tuple[int, str]]]:
+        """
+        Pick from memory, refreshing from engine in the background when
+        stale. Returns (loaded, prompt); loaded is False while the cache is
+        cold, leaving the caller to fall back to the database.
+        """
+        with self._lock:
+            ids, texts, loaded_at = self._ids, self._texts, self._loaded_at
+
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl_seconds:
+            self.refresh_in_background(engine)
+
+        if loaded_at is None:
+            return False, None
+
+        if not ids:
+            return True, None
+
+        index = random.randrange(len(ids))
+        return True, (ids[index], texts[index])
+
+    def pick(self, engine: Engine) -> Optional[Tuple[int, str]]:
+        loaded, prompt = self.pick_cached(engine)
+        return prompt if loaded else random_prompt_from_db(engine)
+
+    def refresh(self, engine: Engine):
+        with engine.connect() as conn:
+            version = conn.execute(
+                select(prompt_catalog_version.c.version)
+                .where(prompt_catalog_version.c.id == CATALOG_VERSION_ID)
+            ).scalar()
+
+            with self._lock:
+                unchanged = self._loaded_at is not None and self._version == version
+                if unchanged:
+                    self._loaded_at = time.monotonic()
+            if unchanged:
+                return
+
+            rows = conn.execute(select(prompts.c.id, prompts.c.text).order_by(prompts.c.id)).fetchall()
+
+        ids = array("q", (row.id for row in rows))
+        texts = [row.text for row in rows]
+
+        with self._lock:
+            self._ids, self._texts = ids, texts
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def refresh_in_background(self, engine: Engine):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(engine)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="prompt-catalog-refresh", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "prompts": len(self._ids),
+                "loaded": self._loaded_at is not None,
+            }
+
+
+def _id_range_query():
+    return select(func.min(prompts.c.id), func.max(prompts.c.id))
+
+
+def _seek_query(lowest: int, highest: int):
+    return (
+        select(prompts.c.id, prompts.c.text)
+        .where(prompts.c.id >= random.randint(lowest, highest))
+        .order_by(prompts.c.id)
+        .limit(1)
+    )
+
+
+def random_prompt_from_db(engine: Engine) -> Optional[Tuple[int, str]]:
+    """
+    Pick a prompt with an indexed seek to a random id instead of
+    ORDER BY random(). Gaps in the id sequence slightly favour the prompt
+    after each gap.
+    """
+    with engine.connect() as conn:
+        lowest, highest = conn.execute(_id_range_query()).one()
+
+        if lowest is None:
+            return None
+
+        row = conn.execute(_seek_query(lowest, highest)).first()
+
+    return row.id, row.text
+
+
+async def random_prompt_from_db_async(engine: AsyncEngine) -> Optional[Tuple[int, str]]:
+    """random_prompt_from_db on the asyncio engine."""
+    async with engine.connect() as conn:
+        lowest, highest = (await conn.execute(_id_range_query())).one()
+
+        if lowest is None:
+            return None
+
+        row = (await conn.execute(_seek_query(lowest, highest))).first()
+
+    return row.id, row.text
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +8,78 @@ class Settings(BaseSettings):
     secret_key: str
     env: str = "development"
 
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    database_replica_urls: List[str] = []
+    db_replica_health_interval: float = 5.0
+    db_read_your_writes_seconds: float = 10.0
+
+    async_mode: bool = False
+
+    execute_pool_enabled: bool = True
+    execute_pool_min_size: int = 2
+    execute_pool_max_size: int = 8
+    execute_pool_max_runs: int = 50
+
+    execute_queue_enabled: bool = False
+    execute_queue_max_in_flight: int = 4
+    execute_queue_max_per_user: int = 10
+    execute_queue_result_ttl: int = 300
+
+    event_buffer_enabled: bool = False
+    event_buffer_max_events: int = 500
+    event_buffer_flush_interval: float = 1.0
+    event_buffer_spill_dir: Optional[str] = None
+    event_buffer_fsync: bool = True
+
+    admission_enabled: bool = False
+    admission_execute_max_in_flight: int = 8
+    admission_execute_max_queued: int = 32
+    admission_auth_max_in_flight: int = 4
+    admission_auth_max_queued: int = 16
+    admission_queue_timeout: float = 5.0
+    admission_client_rate: float = 2.0
+    admission_client_burst: int = 10
+    # Reverse proxies in front of the app that append to X-Forwarded-For; 0 trusts none.
+    admission_trusted_proxy_hops: int = 0
+
+    execute_cpu_limit_seconds: int = 10
+    execute_memory_limit_mb: int = 1024
+
+    execute_stream_max_output_bytes: int = 1024 * 1024
+
+    execute_batch_max_cases: int = 100
+    execute_batch_case_timeout: float = 2.0
+    execute_batch_timeout: float = 10.0
+
+    execute_cache_enabled: bool = False
+    execute_cache_max_bytes: int = 16 * 1024 * 1024
+    execute_cache_ttl: float = 3600.0
+
+    error_message_storage: str = "compressed"
+
+    archive_dir: str = "archive"
+    archive_after_days: int = 180
+
+    prompt_cache_ttl: float = 60.0
+
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+
+    token_cache_size: int = 10000
+
+    otp_store: str = "database"
+    otp_ttl_seconds: float = 900.0
+    otp_memory_max_entries: int = 100000
+    otp_sweep_interval: float = 300.0
+    otp_sweep_batch_size: int = 1000
+
+    metrics_enabled: bool = True
+
     class Config:
         env_file = ".env"
         extra = "forbid"
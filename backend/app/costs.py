@@ -0,0 +1,96 @@
+"""
+Execution cost summaries from the resource usage recorded on run_events.
+
+Each summary aggregates a group of runs in one SQL query: how many ran,
+how many have usage recorded, total wall and CPU seconds, the most CPU any
+single run used and the highest peak RSS. Results served from the result
+cache and runs recorded before usage was tracked carry no usage, so they
+count as runs but add no cost. Archiving deletes a session's run events
+and segments keep no usage, so an archived session has no runs left to
+summarize: session_archived() tells that apart from a session that never
+ran, and archived sessions drop out of the prompt ranking.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import desc, distinct, func, select
+from sqlalchemy.engine import Connection
+
+from app.models.events import run_events
+from app.models.sessions import sessions
+
+_CPU_SECONDS = run_events.c.cpu_user_seconds + run_events.c.cpu_system_seconds
+
+
+def _cost_columns():
+    return [
+        func.count(run_events.c.id).label("runs"),
+        func.count(run_events.c.wall_seconds).label("measured_runs"),
+        func.coalesce(func.sum(run_events.c.wall_seconds), 0.0).label("wall_seconds"),
+        func.coalesce(func.sum(_CPU_SECONDS), 0.0).label("cpu_seconds"),
+        func.max(_CPU_SECONDS).label("max_cpu_seconds"),
+        func.max(run_events.c.max_rss_kb).label("max_rss_kb"),
+    ]
+
+
+def _summary(row) -> dict:
+    return {
+        "runs": row.runs,
+        "measured_runs": row.measured_runs,
+        "wall_seconds": row.wall_seconds,
+        "cpu_seconds": row.cpu_seconds,
+        "max_cpu_seconds": row.max_cpu_seconds,
+        "max_rss_kb": row.max_rss_kb,
+    }
+
+
+def session_costs_query(session_id: int):
+    return select(*_cost_columns()).where(run_events.c.session_id == session_id)
+
+
+def session_costs(conn: Connection, session_id: int) -> dict:
+    return _summary(conn.execute(session_costs_query(session_id)).one())
+
+
+def session_archived(conn: Connection, session_id: int) -> bool:
+    archived_at = conn.execute(
+        select(sessions.c.archived_at).where(sessions.c.id == session_id)
+    ).scalar_one_or_none()
+    return archived_at is not None
+
+
+def prompt_costs_query(
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = 20,
+):
+    query = (
+        select(
+            sessions.c.prompt_text,
+            func.count(distinct(sessions.c.id)).label("sessions"),
+            *_cost_columns(),
+        )
+        .select_from(sessions.join(run_events, run_events.c.session_id == sessions.c.id))
+        .group_by(sessions.c.prompt_text)
+        .order_by(desc("cpu_seconds"), sessions.c.prompt_text)
+        .limit(limit)
+    )
+    if started_after is not None:
+        query = query.where(sessions.c.started_at >= started_after)
+    if started_before is not None:
+        query = query.where(sessions.c.started_at < started_before)
+    return query
+
+
+def prompt_costs(
+    conn: Connection,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = 20,
+) -> List[dict]:
+    """The limit prompts whose sessions used the most CPU, most expensive first."""
+    query = prompt_costs_query(started_after, started_before, limit)
+    return [
+        {"prompt_text": row.prompt_text, "sessions": row.sessions, "costs": _summary(row)}
+        for row in conn.execute(query)
+    ]
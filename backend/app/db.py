@@ -1,5 +1,424 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+
+
+class PoolMetrics:
+    """
+    Running counters for connection pool usage.
+
+    Wait time is measured around the pool's own checkout, so it includes
+    time spent blocked on a full pool as well as time spent opening a new
+    connection. Does NOT keep per-request history.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            average_wait = (
+                self.wait_seconds_total / self.checkouts if self.checkouts else 0.0
+            )
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_avg": average_wait,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+
+class ReplicaRouter:
+    """
+    Routes read-only work to read replicas.
+
+    Replicas are used round-robin while healthy. A replica is healthy when
+    it answers the health query and has applied the same schema migrations
+    as the primary; the check runs every health_interval seconds on a
+    background thread, and a disconnect error marks a replica unhealthy
+    immediately. With no healthy replica, reads fall back to the primary.
+
+    Sessions written within sticky_seconds are read from the primary
+    (read-your-writes). Writes are tracked per process, so this protects
+    requests served by the worker that did the write.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        health_interval: float,
+        sticky_seconds: float,
+        max_tracked_sessions: int = 10000,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.health_interval = health_interval
+        self.sticky_seconds = sticky_seconds
+        self.max_tracked_sessions = max_tracked_sessions
+
+        self._healthy = [True] * len(replicas)
+        self._next = count()
+        self._written = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.replica_reads = 0
+        self.fallback_reads = 0
+        self.sticky_reads = 0
+        self.failed_checks = 0
+
+        for index, replica in enumerate(replicas):
+            event.listen(replica, "handle_error", self._on_error(index))
+
+    def _on_error(self, index: int):
+        def handle_error(context):
+            if context.is_disconnect:
+                self._healthy[index] = False
+        return handle_error
+
+    def start(self):
+        self.check_health()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for replica in self.replicas:
+            replica.dispose()
+
+    def _schema_version(self, engine: Engine):
+        from app.migrations import schema_migrations
+
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_migrations.c.version))).scalar()
+
+    def check_health(self):
+        try:
+            expected = self._schema_version(self.primary)
+        except Exception:
+            expected = None
+
+        for index, replica in enumerate(self.replicas):
+            try:
+                healthy = expected is None or self._schema_version(replica) == expected
+            except Exception:
+                healthy = False
+            if not healthy:
+                self.failed_checks += 1
+            self._healthy[index] = healthy
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def mark_written(self, session_id: int):
+        with self._lock:
+            self._written[session_id] = time.monotonic()
+            self._written.move_to_end(session_id)
+            while len(self._written) > self.max_tracked_sessions:
+                self._written.popitem(last=False)
+
+    def recently_written(self, session_id: int) -> bool:
+        with self._lock:
+            written_at = self._written.get(session_id)
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    def read_engine(self, session_id: Optional[int] = None) -> Engine:
+        if session_id is not None and self.recently_written(session_id):
+            self.sticky_reads += 1
+            return self.primary
+
+        start = next(self._next)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            if self._healthy[index]:
+                self.replica_reads += 1
+                return self.replicas[index]
+
+        self.fallback_reads += 1
+        return self.primary
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replicas),
+            "healthy": sum(self._healthy),
+            "replica_reads": self.replica_reads,
+            "fallback_reads": self.fallback_reads,
+            "sticky_reads": self.sticky_reads,
+            "failed_checks": self.failed_checks,
+            "tracked_sessions": len(self._written),
+        }
+
+
+_engine = None
+_async_engine = None
+_replica_router = None
+_engine_lock = threading.Lock()
+
+_ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
 
 
 def get_engine(database_url: str):
+    """
+    Build a standalone engine.
+
+    Intended for one-off scripts such as create_tables.py. Request handlers
+    must use the shared engine from get_db instead.
+    """
     return create_engine(database_url)
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def create_pooled_engine(database_url: str) -> Engine:
+    """
+    Build an engine with the pool settings from Settings.
+
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool since
+    a sized pool would give every connection its own empty database.
+    """
+    if _is_memory_sqlite(database_url):
+        return create_engine(database_url)
+
+    engine = create_engine(
+        database_url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+    event.listen(engine, "connect", lambda *args: pool_metrics.record_connect())
+    event.listen(engine, "checkin", lambda *args: pool_metrics.record_checkin())
+    event.listen(engine, "invalidate", lambda *args: pool_metrics.record_invalidation())
+
+    return engine
+
+
+def init_engine() -> Engine:
+    """
+    Create the process-wide engine, and the replica router when replica
+    URLs are configured, if they do not exist yet.
+    """
+    global _engine, _replica_router
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_pooled_engine(settings.database_url)
+            if settings.database_replica_urls:
+                _replica_router = ReplicaRouter(
+                    primary=_engine,
+                    replicas=[create_pooled_engine(url) for url in settings.database_replica_urls],
+                    health_interval=settings.db_replica_health_interval,
+                    sticky_seconds=settings.db_read_your_writes_seconds,
+                )
+                _replica_router.start()
+        return _engine
+
+
+def dispose_engine():
+    """Close every pooled connection and drop the process-wide engine."""
+    global _engine, _replica_router
+    with _engine_lock:
+        if _replica_router is not None:
+            _replica_router.close()
+            _replica_router = None
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def async_database_url(database_url: str) -> URL:
+    """The same database, addressed through its asyncio driver."""
+    url = make_url(database_url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise NotImplementedError(f"Async mode is not supported on {url.get_backend_name()}")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+def create_pooled_async_engine(database_url: str) -> AsyncEngine:
+    """
+    Build an asyncio engine with the pool settings from Settings.
+
+    Its pool is an asyncio queue, so waiting for a connection suspends the
+    request instead of blocking a threadpool worker. Checkout wait time is
+    not measured; connects, checkins and invalidations are counted in
+    pool_metrics together with the sync engine's.
+    """
+    url = async_database_url(database_url)
+    if _is_memory_sqlite(database_url):
+        return create_async_engine(url)
+
+    engine = create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+    event.listen(engine.sync_engine, "connect", lambda *args: pool_metrics.record_connect())
+    event.listen(engine.sync_engine, "checkin", lambda *args: pool_metrics.record_checkin())
+    event.listen(engine.sync_engine, "invalidate", lambda *args: pool_metrics.record_invalidation())
+
+    return engine
+
+
+def init_async_engine() -> AsyncEngine:
+    """Create the process-wide asyncio engine for async mode if it does not exist yet."""
+    global _async_engine
+    with _engine_lock:
+        if _async_engine is None:
+            _async_engine = create_pooled_async_engine(settings.database_url)
+        return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine
+    engine, _async_engine = _async_engine, None
+    if engine is not None:
+        await engine.dispose()
+
+
+def get_db() -> Engine:
+    """
+    FastAPI dependency returning the shared engine.
+
+    Handlers open connections from it only for as long as they need them,
+    so slow work like code execution never holds a pooled connection.
+    """
+    if _engine is None:
+        return init_engine()
+    return _engine
+
+
+async def get_async_db() -> AsyncEngine:
+    """
+    FastAPI dependency returning the shared asyncio engine used by the
+    async-mode handlers. A coroutine so resolving it needs no threadpool
+    hop. Reads and writes both go to the primary; replicas are only routed
+    on the sync path.
+    """
+    if _async_engine is None:
+        return init_async_engine()
+    return _async_engine
+
+
+def get_read_db() -> Engine:
+    """
+    FastAPI dependency returning an engine for read-only handlers: a
+    healthy replica when replicas are configured, otherwise the primary.
+    """
+    engine = get_db()
+    if _replica_router is None:
+        return engine
+    return _replica_router.read_engine()
+
+
+def get_session_read_db(session_id: int) -> Engine:
+    """
+    Like get_read_db for handlers reading one session, but stays on the
+    primary while that session has just been written.
+    """
+    engine = get_db()
+    if _replica_router is None:
+        return engine
+    return _replica_router.read_engine(session_id)
+
+
+def mark_session_written(*session_ids: int):
+    """Record writes to sessions so their reads stay on the primary for a while."""
+    if _replica_router is not None:
+        for session_id in session_ids:
+            _replica_router.mark_written(session_id)
+
+
+def replica_engines() -> List[Engine]:
+    return list(_replica_router.replicas) if _replica_router is not None else []
+
+
+def replica_status() -> dict:
+    return _replica_router.stats() if _replica_router is not None else {}
+
+
+def pool_status() -> dict:
+    """Current pool occupancy merged with the running checkout metrics."""
+    status = pool_metrics.snapshot()
+    if _engine is not None and isinstance(_engine.pool, QueuePool):
+        pool = _engine.pool
+        status.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "idle": pool.checkedin(),
+        })
+    return status
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.models.activity import session_activity
+from app.models.events import error_events, run_events
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def activity_row(session_id: int, executed_at: datetime, error_at: Optional[datetime], errors: int = 1) -> dict:
+    """
+    Aggregate contribution of a single run, used as the upsert parameters.
+    A batch run carries one error per failing case.
+    """
+    return {
+        "session_id": session_id,
+        "run_count": 1,
+        "error_count": errors if error_at else 0,
+        "first_run_at": executed_at,
+        "last_run_at": executed_at,
+        "first_error_at": error_at,
+        "runs_after_first_error": 0,
+    }
+
+
+def apply_runs(conn: Connection, rows: List[dict]):
+    """
+    Fold runs into their sessions' activity records, in order.
+
+    Each row comes from activity_row. Runs must be applied in execution
+    order for runs_after_first_error to match the signal definition.
+    """
+    if not rows:
+        return
+
+    dialect_insert = _DIALECT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        raise NotImplementedError(f"session_activity upsert is not supported on {conn.dialect.name}")
+
+    current = session_activity.c
+    stmt = dialect_insert(session_activity)
+    incoming = stmt.excluded
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[current.session_id],
+        set_={
+            "run_count": current.run_count + incoming.run_count,
+            "error_count": current.error_count + incoming.error_count,
+            "first_run_at": case(
+                (incoming.first_run_at < current.first_run_at, incoming.first_run_at),
+                else_=current.first_run_at,
+            ),
+            "last_run_at": case(
+                (incoming.last_run_at > current.last_run_at, incoming.last_run_at),
+                else_=current.last_run_at,
+            ),
+            "first_error_at": func.coalesce(current.first_error_at, incoming.first_error_at),
+            "runs_after_first_error": current.runs_after_first_error + case(
+                (and_(
+                    current.first_error_at.is_not(None),
+                    incoming.last_run_at > current.first_error_at,
+                ), 1),
+                else_=0,
+            ),
+        },
+    )
+
+    conn.execute(stmt, rows)
+
+
+def rebuild_activity(conn: Connection, session_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute activity records from run_events and error_events.
+
+    Rebuilds every session, or only session_ids when given. Returns the
+    number of activity records written.
+    """
+    first_errors = (
+        select(
+            run_events.c.session_id,
+            func.min(error_events.c.occurred_at).label("first_error_at"),
+            func.count(error_events.c.id).label("error_count"),
+        )
+        .join(run_events, error_events.c.run_id == run_events.c.id)
+        .group_by(run_events.c.session_id)
+        .subquery()
+    )
+
+    aggregates = (
+        select(
+            run_events.c.session_id,
+            func.count(run_events.c.id),
+            func.coalesce(first_errors.c.error_count, 0),
+            func.min(run_events.c.executed_at),
+            func.max(run_events.c.executed_at),
+            first_errors.c.first_error_at,
+            func.sum(case(
+                (run_events.c.executed_at > first_errors.c.first_error_at, 1),
+                else_=0,
+            )),
+        )
+        .select_from(run_events.outerjoin(
+            first_errors, first_errors.c.session_id == run_events.c.session_id
+        ))
+        .group_by(run_events.c.session_id, first_errors.c.first_error_at, first_errors.c.error_count)
+    )
+
+    delete_stmt = session_activity.delete()
+    if session_ids is not None:
+        aggregates = aggregates.where(run_events.c.session_id.in_(session_ids))
+        delete_stmt = delete_stmt.where(session_activity.c.session_id.in_(session_ids))
+
+    conn.execute(delete_stmt)
+    result = conn.execute(
+        session_activity.insert().from_select(
+            [
+                "session_id",
+                "run_count",
+                "error_count",
+                "first_run_at",
+                "last_run_at",
+                "first_error_at",
+                "runs_after_first_error",
+            ],
+            aggregates,
+        )
+    )
+    return result.rowcount
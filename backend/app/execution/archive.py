@@ -0,0 +1,470 @@
+"""
+Day-partitioned columnar archive for events of old sessions.
+
+archive_sessions() moves the run and error events of sessions that ended
+long enough ago out of the live tables into segment files named
+events-YYYY-MM-DD-<n>.cfa, partitioned by the day each session started.
+A segment holds two row groups sorted by session id, runs (id,
+executed_at) and errors (run_id, occurred_at, fingerprint_id, message),
+stored column by column in zlib-compressed blocks of BLOCK_ROWS rows, with
+integer columns delta-encoded. An uncompressed session index at the front
+maps each session id to its row ranges, so ArchiveStore can bisect it in a
+memory-mapped file and decompress only the blocks a session touches.
+
+Segments are written and fsynced before the live rows are deleted. When
+the transaction deleting them fails, its segments are removed again; only
+a crash in between leaves the same events both live and archived, and
+readers drop duplicate run ids. Archived error events keep their fingerprint references, which
+move from error_fingerprints.occurrences to archived_occurrences in the
+transaction that deletes the live rows.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+
+from app.execution.fingerprints import decode_error_message, release_fingerprints
+from app.models.activity import session_activity
+from app.models.events import error_events, run_events
+from app.models.sessions import sessions
+
+MAGIC = b"CFARCH1\0"
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".cfa"
+BLOCK_ROWS = 4096
+NULL_LENGTH = 0xFFFFFFFF
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Session index columns: session_id, run_start, run_count, error_start, error_count.
+INDEX_WIDTH = 5
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + value * MICROSECOND
+
+
+def _int_bytes(values) -> bytes:
+    packed = array("q", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _int_values(data) -> array:
+    values = array("q")
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _encode_ints(values: List[int]) -> bytes:
+    deltas = [values[0]] + [current - previous for previous, current in zip(values, values[1:])]
+    return zlib.compress(_int_bytes(deltas))
+
+
+def _decode_ints(data: bytes) -> List[int]:
+    values = []
+    total = 0
+    for delta in _int_values(zlib.decompress(data)):
+        total += delta
+        values.append(total)
+    return values
+
+
+def _encode_texts(values: List[Optional[str]]) -> bytes:
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append(struct.pack("<I", NULL_LENGTH))
+        else:
+            encoded = value.encode("utf-8", "surrogatepass")
+            parts.append(struct.pack("<I", len(encoded)))
+            parts.append(encoded)
+    return zlib.compress(b"".join(parts))
+
+
+def _decode_texts(data: bytes) -> List[Optional[str]]:
+    raw = zlib.decompress(data)
+    values = []
+    position = 0
+    while position < len(raw):
+        (length,) = struct.unpack_from("<I", raw, position)
+        position += 4
+        if length == NULL_LENGTH:
+            values.append(None)
+        else:
+            values.append(raw[position:position + length].decode("utf-8", "surrogatepass"))
+            position += length
+    return values
+
+
+_ENCODERS = {"ints": _encode_ints, "texts": _encode_texts}
+_DECODERS = {"ints": _decode_ints, "texts": _decode_texts}
+
+RUN_COLUMNS = {"id": "ints", "executed_at": "ints"}
+ERROR_COLUMNS = {"run_id": "ints", "occurred_at": "ints", "fingerprint_id": "ints", "message": "texts"}
+
+
+def write_segment(directory: str, day: date, runs: List[tuple], errors: List[tuple]) -> str:
+    """
+    Write one segment and return its path.
+
+    runs holds (session_id, run_id, executed_at) and errors holds
+    (session_id, run_id, occurred_at, fingerprint_id, message) tuples.
+    """
+    runs = sorted(runs)
+    errors = sorted(errors, key=lambda error: (error[0], error[1]))
+
+    index = OrderedDict()
+    for position, run in enumerate(runs):
+        entry = index.setdefault(run[0], [run[0], position, 0, 0, 0])
+        entry[2] += 1
+    for position, error in enumerate(errors):
+        entry = index.setdefault(error[0], [error[0], 0, 0, position, 0])
+        if entry[4] == 0:
+            entry[3] = position
+        entry[4] += 1
+    index_bytes = _int_bytes([value for session_id in sorted(index) for value in index[session_id]])
+
+    columns = {
+        "runs.id": [run[1] for run in runs],
+        "runs.executed_at": [_to_micros(run[2]) for run in runs],
+        "errors.run_id": [error[1] for error in errors],
+        "errors.occurred_at": [_to_micros(error[2]) for error in errors],
+        "errors.fingerprint_id": [error[3] if error[3] is not None else -1 for error in errors],
+        "errors.message": [error[4] for error in errors],
+    }
+    kinds = {f"runs.{name}": kind for name, kind in RUN_COLUMNS.items()}
+    kinds.update({f"errors.{name}": kind for name, kind in ERROR_COLUMNS.items()})
+
+    blocks = []
+    layout = {}
+    offset = len(index_bytes)
+    for name, values in columns.items():
+        layout[name] = []
+        for start in range(0, len(values), BLOCK_ROWS):
+            block = _ENCODERS[kinds[name]](values[start:start + BLOCK_ROWS])
+            layout[name].append([offset, len(block)])
+            blocks.append(block)
+            offset += len(block)
+
+    header = json.dumps({
+        "day": day.isoformat(),
+        "sessions": len(index),
+        "runs": len(runs),
+        "errors": len(errors),
+        "block_rows": BLOCK_ROWS,
+        "kinds": kinds,
+        "columns": layout,
+    }).encode()
+    # Pad so the session index starts 8-byte aligned and can be viewed in place.
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{SEGMENT_PREFIX}{day.isoformat()}-{time.time_ns()}{SEGMENT_SUFFIX}")
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as segment:
+        segment.write(MAGIC)
+        segment.write(struct.pack("<Q", len(header)))
+        segment.write(header)
+        segment.write(index_bytes)
+        for block in blocks:
+            segment.write(block)
+        segment.flush()
+        os.fsync(segment.fileno())
+    os.replace(temporary, path)
+    return path
+
+
+class _Segment:
+    """A memory-mapped segment file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not an event archive segment")
+
+        (header_length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._map[header_start:header_start + header_length])
+        self._data_start = header_start + header_length
+
+        index_end = self._data_start + self.header["sessions"] * INDEX_WIDTH * 8
+        if sys.byteorder == "little":
+            self._index = memoryview(self._map)[self._data_start:index_end].cast("q")
+        else:
+            self._index = _int_values(self._map[self._data_start:index_end])
+        self._session_ids = self._index[0::INDEX_WIDTH]
+
+    def close(self):
+        for view in (self._session_ids, self._index):
+            if isinstance(view, memoryview):
+                view.release()
+        self._map.close()
+
+    def _column(self, name: str, start: int, count: int) -> list:
+        if count == 0:
+            return []
+        block_rows = self.header["block_rows"]
+        decode = _DECODERS[self.header["kinds"][name]]
+        first_block = start // block_rows
+        last_block = (start + count - 1) // block_rows
+
+        values = []
+        for offset, length in self.header["columns"][name][first_block:last_block + 1]:
+            position = self._data_start + offset
+            values.extend(decode(self._map[position:position + length]))
+        skip = start - first_block * block_rows
+        return values[skip:skip + count]
+
+    def session_events(self, session_id: int) -> Tuple[List[tuple], List[tuple]]:
+        """(run_id, executed_at) and (run_id, occurred_at, fingerprint_id, message) rows."""
+        position = bisect_left(self._session_ids, session_id)
+        if position == len(self._session_ids) or self._session_ids[position] != session_id:
+            return [], []
+
+        entry = self._index[position * INDEX_WIDTH:(position + 1) * INDEX_WIDTH]
+        _, run_start, run_count, error_start, error_count = entry.tolist()
+
+        runs = list(zip(
+            self._column("runs.id", run_start, run_count),
+            [_from_micros(value) for value in self._column("runs.executed_at", run_start, run_count)],
+        ))
+        errors = list(zip(
+            self._column("errors.run_id", error_start, error_count),
+            [_from_micros(value) for value in self._column("errors.occurred_at", error_start, error_count)],
+            [value if value >= 0 else None for value in self._column("errors.fingerprint_id", error_start, error_count)],
+            self._column("errors.message", error_start, error_count),
+        ))
+        return runs, errors
+
+
+@dataclass
+class ArchivedActivity:
+    run_count: int
+    error_count: int
+    first_run_at: Optional[datetime]
+    last_run_at: Optional[datetime]
+    first_error_at: Optional[datetime]
+    runs_after_first_error: int
+
+
+class ArchiveStore:
+    """
+    Read access to archived events.
+
+    Keeps up to max_open_segments segments memory-mapped, least recently
+    used first out. Does NOT cache decoded rows; the page cache does that.
+    """
+
+    def __init__(self, directory: str, max_open_segments: int = 64):
+        self.directory = directory
+        self.max_open_segments = max_open_segments
+        self._segments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def segment_paths(self, day: date) -> List[str]:
+        pattern = os.path.join(self.directory, f"{SEGMENT_PREFIX}{day.isoformat()}-*{SEGMENT_SUFFIX}")
+        return sorted(glob.glob(pattern))
+
+    def _segment(self, path: str) -> _Segment:
+        with self._lock:
+            segment = self._segments.get(path)
+            if segment is not None:
+                self._segments.move_to_end(path)
+                return segment
+
+            segment = self._segments[path] = _Segment(path)
+            while len(self._segments) > self.max_open_segments:
+                _, evicted = self._segments.popitem(last=False)
+                evicted.close()
+            return segment
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+    def session_events(self, session_id: int, started_at: datetime) -> Tuple[List[tuple], List[tuple]]:
+        """All archived runs and errors of a session, in run id order."""
+        runs = {}
+        errors = {}
+        for path in self.segment_paths(started_at.date()):
+            try:
+                segment = self._segment(path)
+            except FileNotFoundError:
+                # Removed by a failed archive batch since the listing.
+                continue
+            segment_runs, segment_errors = segment.session_events(session_id)
+            for run in segment_runs:
+                runs[run[0]] = run
+            for error in segment_errors:
+                errors[(error[0], error[1])] = error
+        return (
+            [runs[run_id] for run_id in sorted(runs)],
+            [errors[key] for key in sorted(errors)],
+        )
+
+    def activity(self, session_id: int, started_at: datetime) -> ArchivedActivity:
+        """The session's activity record, recomputed from its archived events."""
+        runs, errors = self.session_events(session_id, started_at)
+        executed = [executed_at for _, executed_at in runs]
+        first_error_at = min((occurred_at for _, occurred_at, _, _ in errors), default=None)
+        return ArchivedActivity(
+            run_count=len(runs),
+            error_count=len(errors),
+            first_run_at=min(executed, default=None),
+            last_run_at=max(executed, default=None),
+            first_error_at=first_error_at,
+            runs_after_first_error=(
+                sum(1 for executed_at in executed if executed_at > first_error_at)
+                if first_error_at is not None else 0
+            ),
+        )
+
+
+def _archive_batch(conn: Connection, directory: str, batch: List[tuple], written: List[str]) -> Tuple[int, int]:
+    """Archive one batch of sessions in conn's transaction, appending each segment path to written."""
+    session_ids = [session_id for session_id, _ in batch]
+    started = dict(batch)
+
+    runs = conn.execute(
+        select(run_events.c.session_id, run_events.c.id, run_events.c.executed_at)
+        .where(run_events.c.session_id.in_(session_ids))
+    ).all()
+    errors = conn.execute(
+        select(
+            run_events.c.session_id,
+            error_events.c.run_id,
+            error_events.c.occurred_at,
+            error_events.c.fingerprint_id,
+            error_events.c.error_message,
+            error_events.c.error_message_compressed,
+        )
+        .join(run_events, run_events.c.id == error_events.c.run_id)
+        .where(run_events.c.session_id.in_(session_ids))
+    ).all()
+
+    by_day: Dict[date, Tuple[list, list]] = {}
+    for session_id, run_id, executed_at in runs:
+        by_day.setdefault(started[session_id].date(), ([], []))[0].append((session_id, run_id, executed_at))
+    for row in errors:
+        by_day.setdefault(started[row.session_id].date(), ([], []))[1].append((
+            row.session_id, row.run_id, row.occurred_at, row.fingerprint_id, decode_error_message(row),
+        ))
+
+    for day, (day_runs, day_errors) in sorted(by_day.items()):
+        written.append(write_segment(directory, day, day_runs, day_errors))
+
+    run_ids = select(run_events.c.id).where(run_events.c.session_id.in_(session_ids))
+    release_fingerprints(conn, [row.fingerprint_id for row in errors], archived=True)
+    conn.execute(error_events.delete().where(error_events.c.run_id.in_(run_ids)))
+    conn.execute(run_events.delete().where(run_events.c.session_id.in_(session_ids)))
+    conn.execute(session_activity.delete().where(session_activity.c.session_id.in_(session_ids)))
+    conn.execute(
+        sessions.update()
+        .where(sessions.c.id.in_(session_ids))
+        .values(archived_at=datetime.utcnow())
+    )
+    return len(runs), len(errors)
+
+
+def _batch_committed(engine: Engine, session_ids: List[int]) -> bool:
+    """
+    Whether a batch whose transaction raised was committed anyway, e.g. when
+    the connection dropped after COMMIT. Unknown counts as committed: a
+    duplicate archived event is dropped on read, a lost one is gone.
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(sessions.c.id)
+                .where(sessions.c.id.in_(session_ids), sessions.c.archived_at.is_not(None))
+                .limit(1)
+            ).first() is not None
+    except Exception:
+        return True
+
+
+def archive_sessions(engine: Engine, directory: str, older_than: timedelta, batch_size: int = 500) -> dict:
+    """
+    Archive the events of every session that ended before now - older_than.
+
+    Each batch of sessions is written to segments and removed from the live
+    tables in its own transaction. Session rows stay, marked archived_at;
+    their activity records are dropped because signals recompute them from
+    the archive.
+    """
+    cutoff = datetime.utcnow() - older_than
+    totals = {"sessions": 0, "runs": 0, "errors": 0, "batches": 0}
+
+    while True:
+        written = []
+        try:
+            with engine.begin() as conn:
+                batch = conn.execute(
+                    select(sessions.c.id, sessions.c.started_at)
+                    .where(
+                        sessions.c.ended_at.is_not(None),
+                        sessions.c.ended_at < cutoff,
+                        sessions.c.archived_at.is_(None),
+                    )
+                    .order_by(sessions.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not batch:
+                    return totals
+
+                run_count, error_count = _archive_batch(conn, directory, [tuple(row) for row in batch], written)
+        except BaseException:
+            if written and not _batch_committed(engine, [row.id for row in batch]):
+                # Nothing was deleted; drop the segments so the events are not archived twice.
+                for path in written:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            raise
+
+        totals["sessions"] += len(batch)
+        totals["runs"] += run_count
+        totals["errors"] += error_count
+        totals["batches"] += 1
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_archive_store(directory: str) -> ArchiveStore:
+    global _store
+    with _store_lock:
+        if _store is None or _store.directory != directory:
+            _store = ArchiveStore(directory)
+        return _store
@@ -0,0 +1,86 @@
+"""
+Execution of one program against a list of test cases.
+
+Every case of a batch runs in the same interpreter: a pooled worker when
+the interpreter pool is running, otherwise one worker started for the
+batch, so the process start is paid at most once. The worker gives each
+case its own stdin, namespace and module state, stops it after the
+per-case budget, and skips cases once the batch budget is spent. A worker
+that blows through the batch budget (e.g. stuck in C code) is killed and
+every case is reported as timed out.
+"""
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.execution.pool import get_pool, run_in_fresh_worker
+from app.execution.usage import ResourceUsage
+from app.metrics import execution_duration, span
+
+KILL_GRACE_SECONDS = 1.0
+
+
+@dataclass
+class CaseResult:
+    stdout: str
+    stderr: str
+    seconds: float
+    timed_out: bool
+    return_value: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    cases: List[CaseResult]
+    usage: Optional[ResourceUsage] = None
+
+
+def batch_failed_message(timeout: float) -> str:
+    return f"Batch interpreter exited, returned a malformed result or ran past the {timeout:g} second budget"
+
+
+def run_batch(
+    code: str,
+    cases: List[dict],
+    function: Optional[str],
+    case_timeout: float,
+    timeout: float,
+) -> BatchResult:
+    """
+    Run code once per case. Each case is {"stdin": str, "args": list}; when
+    function is given it is called with the case's args after the program
+    runs, and the repr of its return value is reported. usage covers the
+    whole batch.
+    """
+    job = {
+        "code": code,
+        "cases": cases,
+        "function": function,
+        "case_timeout": case_timeout,
+        "timeout": timeout,
+    }
+
+    pool = get_pool()
+    started = time.perf_counter()
+    with span(execution_duration, "batch"):
+        try:
+            if pool is not None:
+                reply = pool.run_batch(job, timeout + KILL_GRACE_SECONDS)
+            else:
+                reply = run_in_fresh_worker(job, timeout + KILL_GRACE_SECONDS)
+        except Exception as e:
+            return BatchResult([CaseResult(stdout="", stderr=str(e), seconds=0.0, timed_out=False) for _ in cases])
+    wall_seconds = time.perf_counter() - started
+
+    if reply is None:
+        return BatchResult(
+            [
+                CaseResult(stdout="", stderr=batch_failed_message(timeout), seconds=0.0, timed_out=True)
+                for _ in cases
+            ],
+            ResourceUsage(wall_seconds=wall_seconds),
+        )
+    return BatchResult(
+        [CaseResult(**case) for case in reply["cases"]],
+        ResourceUsage(wall_seconds=wall_seconds, **reply["usage"]),
+    )
@@ -0,0 +1,267 @@
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.db import mark_session_written
+from app.execution.activity import activity_row, apply_runs
+from app.execution.fingerprints import error_event_rows
+from app.execution.usage import USAGE_COLUMNS, ResourceUsage, usage_columns
+from app.models.events import error_events, run_events
+
+SPILL_PREFIX = "events-"
+SPILL_SUFFIX = ".jsonl"
+
+
+class EventBuffer:
+    """
+    Write-behind buffer for run and error events.
+
+    Events are held in memory and written in bulk, one transaction per
+    flush, once max_events are pending or flush_interval seconds have
+    passed. When spill_dir is set every event is also appended to a local
+    segment file before it is acknowledged; segments are deleted once their
+    events are committed and replayed on the next start after a crash.
+    Delivery is at-least-once: a crash between commit and segment deletion
+    replays that batch. Buffered events are not visible to signals until
+    they are flushed.
+    """
+
+    def __init__(
+        self,
+        engine_provider: Callable[[], Engine],
+        max_events: int,
+        flush_interval: float,
+        spill_dir: Optional[str] = None,
+        fsync: bool = True,
+    ):
+        self.engine_provider = engine_provider
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.fsync = fsync
+
+        self._pending = []
+        self._segments = []
+        self._spill_file = None
+        self._segment_number = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        self.flushed_events = 0
+        self.failed_flushes = 0
+
+    def start(self):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._recover()
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="event-buffer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        finally:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+                path = self._current_segment_path()
+                if os.path.getsize(path) == 0:
+                    self._delete_segments([path])
+
+    def add(
+        self,
+        session_id: int,
+        executed_at: datetime,
+        error_message: Optional[str],
+        occurred_at: Optional[datetime],
+        usage: Optional[ResourceUsage] = None,
+    ):
+        event = {
+            "session_id": session_id,
+            "executed_at": executed_at.isoformat(),
+            "error_message": error_message,
+            "occurred_at": occurred_at.isoformat() if occurred_at else None,
+            **usage_columns(usage),
+        }
+
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.write(json.dumps(event) + "\n")
+                self._spill_file.flush()
+                if self.fsync:
+                    os.fsync(self._spill_file.fileno())
+            self._pending.append(event)
+            full = len(self._pending) >= self.max_events
+
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write all pending events in one transaction. Returns the count written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                segments = self._rotate_segment()
+
+            if not batch:
+                self._delete_segments(segments)
+                return 0
+
+            try:
+                write_events(self.engine_provider(), batch)
+            except Exception:
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self._segments = segments + self._segments
+                self.failed_flushes += 1
+                raise
+
+            self._delete_segments(segments)
+            self.flushed_events += len(batch)
+            return len(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "flushed": self.flushed_events,
+                "failed_flushes": self.failed_flushes,
+            }
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def _current_segment_path(self) -> str:
+        return os.path.join(self.spill_dir, f"{SPILL_PREFIX}{self._segment_number:012d}{SPILL_SUFFIX}")
+
+    def _open_segment(self):
+        self._segment_number += 1
+        self._spill_file = open(self._current_segment_path(), "a", encoding="utf-8")
+
+    def _rotate_segment(self) -> List[str]:
+        """Close the current segment and return every segment awaiting commit."""
+        if self._spill_file is None:
+            return []
+        segments, self._segments = self._segments + [self._current_segment_path()], []
+        self._spill_file.close()
+        self._open_segment()
+        return segments
+
+    def _delete_segments(self, segments: List[str]):
+        for path in segments:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _recover(self):
+        segments = sorted(glob.glob(os.path.join(self.spill_dir, f"{SPILL_PREFIX}*{SPILL_SUFFIX}")))
+        if segments:
+            last = os.path.basename(segments[-1])[len(SPILL_PREFIX):-len(SPILL_SUFFIX)]
+            self._segment_number = int(last)
+
+        events = []
+        for path in segments:
+            with open(path, encoding="utf-8") as spill:
+                for line in spill:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # A torn final line from a crash mid-write was never acknowledged.
+                        continue
+
+        if events:
+            write_events(self.engine_provider(), events)
+        self._delete_segments(segments)
+
+
+def write_events(engine: Engine, events: List[dict]):
+    """
+    Insert run events and their error events, and update session activity
+    records, in a single transaction.
+    """
+    with engine.begin() as conn:
+        run_ids = conn.execute(
+            insert(run_events).returning(run_events.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "session_id": event["session_id"],
+                    "executed_at": datetime.fromisoformat(event["executed_at"]),
+                    **{name: event[name] for name in USAGE_COLUMNS},
+                }
+                for event in events
+            ],
+        ).scalars().all()
+
+        errors = error_event_rows(conn, [
+            {
+                "run_id": run_id,
+                "error_message": event["error_message"],
+                "occurred_at": datetime.fromisoformat(event["occurred_at"]),
+            }
+            for run_id, event in zip(run_ids, events)
+            if event["error_message"]
+        ], settings.error_message_storage)
+        if errors:
+            conn.execute(insert(error_events), errors)
+
+        apply_runs(conn, [
+            activity_row(
+                event["session_id"],
+                datetime.fromisoformat(event["executed_at"]),
+                datetime.fromisoformat(event["occurred_at"]) if event["occurred_at"] else None,
+            )
+            for event in events
+        ])
+
+    mark_session_written(*{event["session_id"] for event in events})
+
+
+_buffer = None
+
+
+def start_event_buffer(engine_provider, max_events: int, flush_interval: float, spill_dir: Optional[str], fsync: bool) -> EventBuffer:
+    global _buffer
+    if _buffer is None:
+        _buffer = EventBuffer(
+            engine_provider=engine_provider,
+            max_events=max_events,
+            flush_interval=flush_interval,
+            spill_dir=spill_dir,
+            fsync=fsync,
+        )
+        _buffer.start()
+    return _buffer
+
+
+def stop_event_buffer():
+    global _buffer
+    if _buffer is not None:
+        _buffer.close()
+        _buffer = None
+
+
+def get_event_buffer():
+    return _buffer
@@ -0,0 +1,241 @@
+import ast
+import hashlib
+import re
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.execution.runner import PYTHON_COMMAND, TIMEOUT_MESSAGE, ExecutionResult, run_code, run_code_async
+
+NONDETERMINISTIC_MODULES = frozenset({
+    "asyncio", "concurrent", "datetime", "glob", "http", "multiprocessing",
+    "os", "pathlib", "random", "secrets", "shutil", "signal", "socket",
+    "subprocess", "sys", "tempfile", "threading", "time", "urllib", "uuid",
+})
+
+NONDETERMINISTIC_BUILTINS = frozenset({
+    "__import__", "compile", "dir", "eval", "exec", "frozenset", "globals",
+    "hash", "id", "input", "locals", "object", "open", "set", "vars",
+})
+
+# Default reprs of functions, classes' instances, generators and the like
+# embed a memory address, which differs between interpreters.
+_ADDRESS = re.compile(r"0x[0-9a-f]{6,}")
+
+
+def is_deterministic(code: str) -> bool:
+    """
+    Conservative check that code prints the same output on every run.
+
+    Rejects imports of clock, randomness, filesystem, process and network
+    modules, dynamic code and I/O builtins, sets, whose iteration order
+    for strings changes with hash randomization between interpreters, and
+    classes, lambdas and namespace builtins, whose reprs carry memory
+    addresses. Code that fails to parse is deterministic: it always raises
+    the same SyntaxError.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return True
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        else:
+            modules = []
+        if any(module.split(".")[0] in NONDETERMINISTIC_MODULES for module in modules):
+            return False
+
+        if isinstance(node, (ast.Set, ast.SetComp, ast.ClassDef, ast.Lambda)):
+            return False
+        if isinstance(node, ast.Name) and node.id in NONDETERMINISTIC_BUILTINS:
+            return False
+        if isinstance(node, ast.Attribute) and node.attr.startswith("__"):
+            return False
+
+    return True
+
+
+def is_cacheable(result: ExecutionResult) -> bool:
+    """
+    Whether output is safe to replay: not a timeout and free of memory
+    addresses, which is_deterministic cannot rule out for every repr.
+    """
+    if result.stderr == TIMEOUT_MESSAGE:
+        return False
+    return not (_ADDRESS.search(result.stdout) or _ADDRESS.search(result.stderr))
+
+
+def interpreter_version() -> str:
+    """Full version string of the interpreter that runs user code."""
+    try:
+        result = subprocess.run(
+            [PYTHON_COMMAND, "-c", "import sys; print(sys.version)"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return result.stdout.strip() or PYTHON_COMMAND
+    except Exception:
+        return PYTHON_COMMAND
+
+
+class ResultCache:
+    """
+    Content-addressed cache of execution output.
+
+    Entries are keyed by a SHA-256 of the interpreter version and the code,
+    expire after ttl_seconds and are evicted least-recently-used once the
+    stored stdout/stderr exceed max_bytes. Does NOT cache code that
+    is_deterministic rejects or output that is_cacheable rejects.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, version: str):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def key(self, code: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.version.encode())
+        digest.update(b"\0")
+        digest.update(code.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[ExecutionResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, result, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ExecutionResult(stdout=result.stdout, stderr=result.stderr)
+
+    def put(self, key: str, result: ExecutionResult):
+        size = len(result.stdout.encode()) + len(result.stderr.encode())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def run(self, code: str) -> ExecutionResult:
+        if not is_deterministic(code):
+            with self._lock:
+                self.skipped += 1
+            return run_code(code)
+
+        key = self.key(code)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        result = run_code(code)
+        if is_cacheable(result):
+            self.put(key, result)
+        return result
+
+    async def run_async(self, code: str) -> ExecutionResult:
+        """run() executing misses with run_code_async."""
+        if not is_deterministic(code):
+            with self._lock:
+                self.skipped += 1
+            return await run_code_async(code)
+
+        key = self.key(code)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        result = await run_code_async(code)
+        if is_cacheable(result):
+            self.put(key, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+
+
+def start_result_cache(max_bytes: int, ttl_seconds: float) -> ResultCache:
+    global _cache
+    if _cache is None:
+        _cache = ResultCache(max_bytes=max_bytes, ttl_seconds=ttl_seconds, version=interpreter_version())
+    return _cache
+
+
+def stop_result_cache():
+    global _cache
+    _cache = None
+
+
+def get_result_cache():
+    return _cache
+
+
+def run_code_cached(code: str, bypass_cache: bool = False) -> ExecutionResult:
+    """
+    Execute code through the result cache when it is enabled.
+
+    bypass_cache always executes and does not store the result.
+    """
+    cache = get_result_cache()
+    if cache is None or bypass_cache:
+        return run_code(code)
+    return cache.run(code)
+
+
+async def run_code_cached_async(code: str, bypass_cache: bool = False) -> ExecutionResult:
+    """run_code_cached for async mode, executing with run_code_async."""
+    cache = get_result_cache()
+    if cache is None or bypass_cache:
+        return await run_code_async(code)
+    return await cache.run_async(code)
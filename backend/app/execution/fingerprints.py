@@ -0,0 +1,211 @@
+import hashlib
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.models.events import error_fingerprints
+
+TEXT = "text"
+COMPRESSED = "compressed"
+NONE = "none"
+
+MAX_MESSAGE_LENGTH = 500
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+_FRAME = re.compile(r'^\s*File "(?P<file>[^"]*)", line (?P<line>\d+)(?:, in (?P<scope>.+))?$')
+_EXCEPTION = re.compile(r"^(?P<type>[A-Za-z_][\w.]*)(?::\s?(?P<message>.*))?$")
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+@dataclass
+class Fingerprint:
+    digest: str
+    exception_type: str
+    location: Optional[str]
+    message: str
+
+
+def normalize_message(message: str) -> str:
+    """Replace the parts of an error message that vary between occurrences."""
+    message = _ADDRESS.sub("0x?", message)
+    message = _QUOTED.sub("'?'", message)
+    message = _NUMBER.sub("?", message)
+    return message[:MAX_MESSAGE_LENGTH]
+
+
+def fingerprint(stderr: str) -> Fingerprint:
+    """
+    Reduce stderr to its exception type, innermost frame and normalized
+    message.
+
+    Two tracebacks share a fingerprint when they raise the same exception
+    type at the same file, line and scope with messages that only differ in
+    quoted values, numbers or memory addresses. Output that is not a
+    traceback (a timeout, or text the program wrote to stderr itself) is
+    keyed on its normalized last line with an empty exception type.
+    """
+    lines = [line for line in stderr.strip().splitlines() if line.strip()]
+
+    location = None
+    for line in lines:
+        frame = _FRAME.match(line)
+        if frame:
+            location = f"{frame.group('file')}:{frame.group('line')}"
+            if frame.group("scope"):
+                location += f":{frame.group('scope')}"
+
+    last = lines[-1].strip() if lines else ""
+    summary = _EXCEPTION.match(last)
+    if summary and (summary.group("message") is not None or location):
+        exception_type = summary.group("type")
+        message = normalize_message(summary.group("message") or "")
+    else:
+        exception_type = ""
+        message = normalize_message(last)
+
+    digest = hashlib.sha256(
+        "\0".join([exception_type, location or "", message]).encode("utf-8", "surrogatepass")
+    ).hexdigest()
+    return Fingerprint(digest=digest, exception_type=exception_type, location=location, message=message)
+
+
+def encode_error_message(stderr: str, storage: str) -> dict:
+    """error_events columns holding the raw stderr under the given storage mode."""
+    if storage == TEXT:
+        return {"error_message": stderr, "error_message_compressed": None}
+    if storage == COMPRESSED:
+        return {"error_message": None, "error_message_compressed": zlib.compress(stderr.encode("utf-8", "surrogatepass"))}
+    if storage == NONE:
+        return {"error_message": None, "error_message_compressed": None}
+    raise ValueError(f"Unknown error message storage: {storage}")
+
+
+def decode_error_message(row) -> Optional[str]:
+    """Raw stderr of an error_events row, or None when it was not kept."""
+    if row.error_message is not None:
+        return row.error_message
+    if row.error_message_compressed is not None:
+        return zlib.decompress(row.error_message_compressed).decode("utf-8", "surrogatepass")
+    return None
+
+
+def resolve_fingerprints(conn: Connection, messages: List[str], seen_at: List[datetime]) -> List[int]:
+    """
+    Fingerprint each message, add one reference per message to its
+    error_fingerprints row (creating it on first sight) and return the
+    fingerprint ids in message order. seen_at holds each message's
+    occurrence time.
+    """
+    if not messages:
+        return []
+
+    dialect_insert = _DIALECT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        raise NotImplementedError(f"error_fingerprints upsert is not supported on {conn.dialect.name}")
+
+    prints = [fingerprint(message) for message in messages]
+    counts = Counter(p.digest for p in prints)
+    distinct = {p.digest: p for p in prints}
+    first_seen: Dict[str, datetime] = {}
+    last_seen: Dict[str, datetime] = {}
+    for p, occurred_at in zip(prints, seen_at):
+        first_seen[p.digest] = min(first_seen.get(p.digest, occurred_at), occurred_at)
+        last_seen[p.digest] = max(last_seen.get(p.digest, occurred_at), occurred_at)
+
+    current = error_fingerprints.c
+    stmt = dialect_insert(error_fingerprints)
+    incoming = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[current.digest],
+        set_={
+            "occurrences": current.occurrences + incoming.occurrences,
+            "last_seen_at": case(
+                (incoming.last_seen_at > current.last_seen_at, incoming.last_seen_at),
+                else_=current.last_seen_at,
+            ),
+        },
+    )
+    conn.execute(stmt, [
+        {
+            "digest": digest,
+            "exception_type": p.exception_type,
+            "location": p.location,
+            "message": p.message,
+            "occurrences": counts[digest],
+            "first_seen_at": first_seen[digest],
+            "last_seen_at": last_seen[digest],
+        }
+        # Sorted so concurrent writers lock fingerprint rows in the same order.
+        for digest, p in sorted(distinct.items())
+    ])
+
+    ids: Dict[str, int] = dict(conn.execute(
+        select(current.digest, current.id).where(current.digest.in_(list(distinct)))
+    ).all())
+    return [ids[p.digest] for p in prints]
+
+
+def release_fingerprints(conn: Connection, fingerprint_ids: List[int], archived: bool = False):
+    """
+    Drop one live reference per id, in the transaction that deletes the
+    error_events rows holding them. With archived, the references move to
+    archived_occurrences instead, because archive segments keep pointing at
+    the fingerprint. Fingerprints left with no live or archived reference
+    are removed.
+    """
+    counts = Counter(fingerprint_id for fingerprint_id in fingerprint_ids if fingerprint_id is not None)
+    if not counts:
+        return
+
+    current = error_fingerprints.c
+    for fingerprint_id, count in sorted(counts.items()):
+        values = {"occurrences": current.occurrences - count}
+        if archived:
+            values["archived_occurrences"] = current.archived_occurrences + count
+        conn.execute(error_fingerprints.update().where(current.id == fingerprint_id).values(**values))
+    conn.execute(
+        error_fingerprints.delete()
+        .where(
+            current.id.in_(list(counts)),
+            current.occurrences <= 0,
+            current.archived_occurrences <= 0,
+        )
+    )
+
+
+def error_event_rows(conn: Connection, errors: List[dict], storage: str) -> List[dict]:
+    """
+    Turn {"run_id", "error_message", "occurred_at"} dicts into error_events
+    insert parameters with fingerprint references and the raw message kept
+    according to storage.
+    """
+    if not errors:
+        return []
+
+    fingerprint_ids = resolve_fingerprints(
+        conn,
+        [error["error_message"] for error in errors],
+        [error["occurred_at"] for error in errors],
+    )
+    return [
+        {
+            "run_id": error["run_id"],
+            "fingerprint_id": fingerprint_id,
+            "occurred_at": error["occurred_at"],
+            **encode_error_message(error["error_message"], storage),
+        }
+        for error, fingerprint_id in zip(errors, fingerprint_ids)
+    ]
@@ -0,0 +1,191 @@
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    user_id: int
+    session_id: int
+    code: str
+    bypass_cache: bool = False
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    future: Future = field(default_factory=Future)
+
+
+class JobQueue:
+    """
+    Bounded scheduler for queued code executions.
+
+    Jobs wait in one FIFO per user and are drained round-robin across users,
+    so one user submitting many runs cannot starve everyone else. At most
+    max_in_flight jobs execute at once. Finished jobs are kept for
+    result_ttl_seconds so clients can poll for them; expired ones are
+    purged on every submit, get and stats, and by idle drain threads at
+    least once per result_ttl_seconds. Does NOT persist jobs across
+    restarts.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], object],
+        max_in_flight: int,
+        max_queued_per_user: int,
+        result_ttl_seconds: float,
+    ):
+        self.handler = handler
+        self.max_in_flight = max_in_flight
+        self.max_queued_per_user = max_queued_per_user
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._jobs = {}
+        self._finished = deque()
+        self._pending = {}
+        self._ready_users = deque()
+        self._threads = []
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def start(self):
+        for index in range(self.max_in_flight):
+            thread = threading.Thread(target=self._drain, name=f"execute-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            abandoned = [job for queue in self._pending.values() for job in queue]
+            self._pending.clear()
+            self._ready_users.clear()
+            self._cond.notify_all()
+        for job in abandoned:
+            job.status = FAILED
+            job.future.set_exception(RuntimeError("Execution queue shut down"))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, user_id: int, session_id: int, code: str, bypass_cache: bool = False) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            session_id=session_id,
+            code=code,
+            bypass_cache=bypass_cache,
+        )
+
+        with self._cond:
+            self._purge_expired()
+            queue = self._pending.get(user_id)
+            if queue is not None and len(queue) >= self.max_queued_per_user:
+                raise QueueFullError("Too many queued executions for this user")
+
+            if queue is None:
+                queue = self._pending[user_id] = deque()
+                self._ready_users.append(user_id)
+            queue.append(job)
+            self._jobs[job.id] = job
+            self._cond.notify()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._purge_expired()
+            return {
+                "queued": sum(len(queue) for queue in self._pending.values()),
+                "running": sum(1 for job in self._jobs.values() if job.status == RUNNING),
+                "retained": len(self._jobs),
+            }
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while not self._ready_users and not self._closed:
+                self._cond.wait(self.result_ttl_seconds)
+                self._purge_expired()
+            if self._closed:
+                return None
+
+            user_id = self._ready_users.popleft()
+            queue = self._pending[user_id]
+            job = queue.popleft()
+            if queue:
+                self._ready_users.append(user_id)
+            else:
+                del self._pending[user_id]
+
+            job.status = RUNNING
+            return job
+
+    def _drain(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                job.status = FAILED
+                job.future.set_exception(e)
+            else:
+                job.status = COMPLETED
+                job.future.set_result(result)
+            with self._cond:
+                job.finished_at = time.monotonic()
+                self._finished.append(job)
+
+    def _purge_expired(self):
+        # _finished is in finishing order, so expired jobs are at its head.
+        cutoff = time.monotonic() - self.result_ttl_seconds
+        while self._finished and self._finished[0].finished_at < cutoff:
+            del self._jobs[self._finished.popleft().id]
+
+
+_queue = None
+
+
+def start_job_queue(handler, max_in_flight: int, max_queued_per_user: int, result_ttl_seconds: float) -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(
+            handler=handler,
+            max_in_flight=max_in_flight,
+            max_queued_per_user=max_queued_per_user,
+            result_ttl_seconds=result_ttl_seconds,
+        )
+        _queue.start()
+    return _queue
+
+
+def stop_job_queue():
+    global _queue
+    if _queue is not None:
+        _queue.close()
+        _queue = None
+
+
+def get_job_queue():
+    return _queue
@@ -0,0 +1,372 @@
+import json
+import os
+import select
+import subprocess
+import threading
+import time
+
+from app.execution.runner import (
+    PYTHON_COMMAND,
+    TIMEOUT_MESSAGE,
+    TIMEOUT_SECONDS,
+    ExecutionResult,
+)
+from app.execution.usage import ResourceUsage, get_resource_limits, with_limit_message
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+STARTUP_TIMEOUT_SECONDS = 10
+EXIT_WAIT_SECONDS = 1
+READ_CHUNK_BYTES = 65536
+MALFORMED_MESSAGE = "Execution failed: the interpreter returned a malformed result"
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _valid_usage(usage) -> bool:
+    return (
+        isinstance(usage, dict)
+        and _is_number(usage.get("cpu_user_seconds"))
+        and _is_number(usage.get("cpu_system_seconds"))
+        and isinstance(usage.get("max_rss_kb"), int)
+    )
+
+
+def _valid_case(case) -> bool:
+    return (
+        isinstance(case, dict)
+        and isinstance(case.get("stdout"), str)
+        and isinstance(case.get("stderr"), str)
+        and _is_number(case.get("seconds"))
+        and isinstance(case.get("timed_out"), bool)
+        and isinstance(case.get("return_value", ""), str)
+        and set(case) <= {"stdout", "stderr", "seconds", "timed_out", "return_value"}
+    )
+
+
+def valid_reply(job: dict, reply) -> bool:
+    """Whether reply has the shape worker.py writes for job."""
+    if not isinstance(reply, dict) or not isinstance(reply.get("clean"), bool) or not _valid_usage(reply.get("usage")):
+        return False
+    if "cases" in job:
+        cases = reply.get("cases")
+        return isinstance(cases, list) and len(cases) == len(job["cases"]) and all(map(_valid_case, cases))
+    return isinstance(reply.get("stdout"), str) and isinstance(reply.get("stderr"), str)
+
+
+class _Worker:
+    """One pre-started interpreter running worker.py."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [PYTHON_COMMAND, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self.runs = 0
+        self.idle_since = time.monotonic()
+        self.timed_out = False
+        self.malformed = False
+        self._buffer = b""
+
+        if not self._read_line(time.monotonic() + STARTUP_TIMEOUT_SECONDS):
+            self.kill()
+            raise WorkerError("Interpreter worker failed to start")
+
+    def _read_line(self, deadline: float):
+        """
+        Read one protocol line, unbuffered so nothing a line was read
+        ahead with is left unseen by select(). Returns None on timeout and
+        b"" once the interpreter closed its end.
+        """
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            ready, _, _ = select.select([fd], [], [], max(deadline - time.monotonic(), 0))
+            if not ready:
+                return None
+            chunk = os.read(fd, READ_CHUNK_BYTES)
+            if not chunk:
+                return b""
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line + b"\n"
+
+    def request(self, job: dict, timeout: float):
+        """
+        Send one job, under the configured resource limits, and wait up to
+        timeout for its reply. Lines carrying an earlier job's seq, e.g.
+        written by user code through the protocol descriptor, are skipped.
+        Returns None when the interpreter timed out, exited or replied with
+        something other than a result for this job (malformed is set),
+        leaving the worker unusable.
+        """
+        self.runs += 1
+        limits = get_resource_limits()
+        job = dict(job, limits={"cpu_seconds": limits.cpu_seconds, "memory_bytes": limits.memory_bytes})
+        try:
+            self.process.stdin.write(json.dumps(dict(job, seq=self.runs)) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None
+
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._read_line(deadline)
+            if not line:
+                # Timed out, or the interpreter exited mid-job, e.g. via os._exit().
+                self.timed_out = line is None
+                return None
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                reply = None
+            seq = reply.get("seq") if isinstance(reply, dict) else None
+            if isinstance(seq, int) and not isinstance(seq, bool) and seq < self.runs:
+                continue
+            if seq != self.runs or not valid_reply(job, reply):
+                self.malformed = True
+                return None
+            return reply
+
+    def exit_message(self) -> str:
+        """
+        stderr for a job without a reply: the malformed reply message, or
+        the CPU limit message if that killed the interpreter.
+        """
+        if self.malformed:
+            return MALFORMED_MESSAGE
+        try:
+            returncode = self.process.wait(EXIT_WAIT_SECONDS)
+        except subprocess.TimeoutExpired:
+            return ""
+        return with_limit_message("", returncode, get_resource_limits())
+
+    def run(self, code: str, timeout: float):
+        """
+        Returns (result, reusable). A worker that timed out, crashed,
+        replied with a malformed result, left threads behind or changed
+        state it cannot restore is not reusable. Usage of a job without a
+        reply is only its wall time.
+        """
+        started = time.perf_counter()
+        reply = self.request({"code": code}, timeout)
+        if reply is None:
+            stderr = TIMEOUT_MESSAGE if self.timed_out else self.exit_message()
+            usage = ResourceUsage(wall_seconds=time.perf_counter() - started)
+            return ExecutionResult(stdout="", stderr=stderr, usage=usage), False
+        usage = ResourceUsage(wall_seconds=time.perf_counter() - started, **reply["usage"])
+        return ExecutionResult(stdout=reply["stdout"], stderr=reply["stderr"], usage=usage), reply["clean"]
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class InterpreterPool:
+    """
+    Pool of pre-started Python interpreters for code execution.
+
+    Keeps at least min_size warm workers and grows on demand up to max_size.
+    A worker is recycled after max_runs jobs, after a timeout or crash, and
+    whenever user code leaves threads running. Workers beyond min_size are
+    retired once they have been idle for idle_seconds. Between jobs the
+    worker restores its baseline interpreter state (see worker.py), and a
+    job that changed state it cannot restore, or whose reply is malformed,
+    retires its worker. Set max_runs to 1 for a fresh interpreter per job.
+    Does NOT sandbox filesystem or network access.
+    """
+
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        max_runs: int,
+        timeout: float = TIMEOUT_SECONDS,
+        idle_seconds: float = 60.0,
+    ):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.spawned = 0
+        self.recycled = 0
+        self.timeouts = 0
+
+    def start(self):
+        for _ in range(self.min_size):
+            with self._cond:
+                self._size += 1
+            self._add_worker()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            workers, self._idle = self._idle, []
+            self._size -= len(workers)
+            self._cond.notify_all()
+        for worker in workers:
+            worker.kill()
+
+    def run(self, code: str) -> ExecutionResult:
+        worker = self._acquire()
+        reusable = False
+        try:
+            result, reusable = worker.run(code, self.timeout)
+            if result.stderr == TIMEOUT_MESSAGE and not reusable:
+                with self._cond:
+                    self.timeouts += 1
+            return result
+        finally:
+            self._release(worker, reusable)
+
+    def run_batch(self, job: dict, timeout: float):
+        """
+        Run a batch job (see worker.py) on one worker. Returns the reply, or
+        None when the worker overran timeout or crashed.
+        """
+        worker = self._acquire()
+        reply = None
+        try:
+            reply = worker.request(job, timeout)
+            if reply is None and worker.timed_out:
+                with self._cond:
+                    self.timeouts += 1
+            return reply
+        finally:
+            self._release(worker, reply is not None and reply["clean"])
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "spawned": self.spawned,
+                "recycled": self.recycled,
+                "timeouts": self.timeouts,
+            }
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker()
+        with self._cond:
+            self.spawned += 1
+        return worker
+
+    def _add_worker(self):
+        """Start a worker for a slot already counted in _size."""
+        try:
+            worker = self._spawn()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        worker.kill()
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerError("Interpreter pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                self._cond.wait()
+
+        try:
+            return self._spawn()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker: _Worker, reusable: bool):
+        retired = []
+        replenish = 0
+
+        with self._cond:
+            if reusable and worker.runs < self.max_runs and not self._closed:
+                worker.idle_since = time.monotonic()
+                self._idle.append(worker)
+            else:
+                retired.append(worker)
+                self._size -= 1
+
+            cutoff = time.monotonic() - self.idle_seconds
+            while self._size > self.min_size and self._idle and self._idle[0].idle_since < cutoff:
+                retired.append(self._idle.pop(0))
+                self._size -= 1
+
+            if not self._closed and self._size < self.min_size:
+                replenish = self.min_size - self._size
+                self._size += replenish
+
+            self.recycled += len(retired)
+            self._cond.notify()
+
+        for stale in retired:
+            stale.kill()
+        for _ in range(replenish):
+            threading.Thread(target=self._add_worker, daemon=True).start()
+
+
+_pool = None
+
+
+def start_pool(min_size: int, max_size: int, max_runs: int) -> InterpreterPool:
+    global _pool
+    if _pool is None:
+        _pool = InterpreterPool(min_size=min_size, max_size=max_size, max_runs=max_runs)
+        _pool.start()
+    return _pool
+
+
+def stop_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_pool():
+    return _pool
+
+
+def run_in_fresh_worker(job: dict, timeout: float):
+    """Run one job (see worker.py) on a worker started just for it."""
+    worker = _Worker()
+    try:
+        return worker.request(job, timeout)
+    finally:
+        worker.kill()
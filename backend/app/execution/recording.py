@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+from functools import partial
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.execution.activity import activity_row, apply_runs
+from app.config import settings
+from app.db import mark_session_written
+from app.execution.buffer import get_event_buffer
+from app.execution.fingerprints import error_event_rows
+from app.execution.usage import ResourceUsage, usage_columns
+from app.models.events import error_events, run_events
+
+
+def _write_run(
+    conn: Connection,
+    session_id: int,
+    executed_at: datetime,
+    occurred_at: Optional[datetime],
+    errors: List[str],
+    usage: Optional[ResourceUsage],
+) -> int:
+    """Insert one RunEvent with an ErrorEvent per error and fold it into activity. Returns the run id."""
+    run_id = conn.execute(
+        insert(run_events).values(
+            session_id=session_id,
+            executed_at=executed_at,
+            **usage_columns(usage)
+        ).returning(run_events.c.id)
+    ).scalar()
+
+    if errors:
+        conn.execute(
+            insert(error_events),
+            error_event_rows(
+                conn,
+                [{"run_id": run_id, "error_message": stderr, "occurred_at": occurred_at} for stderr in errors],
+                settings.error_message_storage,
+            ),
+        )
+
+    apply_runs(conn, [activity_row(session_id, executed_at, occurred_at, errors=len(errors))])
+    return run_id
+
+
+def record_run(engine: Engine, session_id: int, stderr: str, usage: Optional[ResourceUsage] = None) -> Optional[int]:
+    """
+    Persist one execution as a RunEvent carrying its resource usage, plus an
+    ErrorEvent referencing the error's fingerprint when stderr is non-empty,
+    and fold it into the session's activity record. usage is None for
+    results served from the result cache. Returns the new run id, or None
+    when the write-behind event buffer is enabled and the run was only
+    queued for the next flush.
+    """
+    executed_at = datetime.utcnow()
+    occurred_at = datetime.utcnow() if stderr else None
+
+    event_buffer = get_event_buffer()
+    if event_buffer is not None:
+        event_buffer.add(
+            session_id=session_id,
+            executed_at=executed_at,
+            error_message=stderr or None,
+            occurred_at=occurred_at,
+            usage=usage,
+        )
+        return None
+
+    with engine.begin() as conn:
+        run_id = _write_run(conn, session_id, executed_at, occurred_at, [stderr] if stderr else [], usage)
+
+    mark_session_written(session_id)
+    return run_id
+
+
+async def record_run_async(
+    engine: AsyncEngine,
+    session_id: int,
+    stderr: str,
+    usage: Optional[ResourceUsage] = None,
+) -> Optional[int]:
+    """
+    record_run on the asyncio engine. A buffer that spills to disk is
+    appended to from a thread, since the append may fsync.
+    """
+    executed_at = datetime.utcnow()
+    occurred_at = datetime.utcnow() if stderr else None
+
+    event_buffer = get_event_buffer()
+    if event_buffer is not None:
+        add = partial(
+            event_buffer.add,
+            session_id=session_id,
+            executed_at=executed_at,
+            error_message=stderr or None,
+            occurred_at=occurred_at,
+            usage=usage,
+        )
+        if event_buffer.spill_dir:
+            await asyncio.to_thread(add)
+        else:
+            add()
+        return None
+
+    async with engine.begin() as conn:
+        run_id = await conn.run_sync(
+            _write_run, session_id, executed_at, occurred_at, [stderr] if stderr else [], usage
+        )
+
+    mark_session_written(session_id)
+    return run_id
+
+
+def record_batch(
+    engine: Engine,
+    session_id: int,
+    errors: List[str],
+    usage: Optional[ResourceUsage] = None,
+) -> int:
+    """
+    Persist a batch execution as one RunEvent, carrying the usage of the
+    whole batch, with an ErrorEvent per failing case, in a single
+    transaction. Always written directly, after flushing
+    the event buffer if it is enabled so activity is folded in run order.
+    Returns the new run id.
+    """
+    event_buffer = get_event_buffer()
+    if event_buffer is not None:
+        event_buffer.flush()
+
+    executed_at = datetime.utcnow()
+    occurred_at = datetime.utcnow() if errors else None
+
+    with engine.begin() as conn:
+        run_id = _write_run(conn, session_id, executed_at, occurred_at, errors, usage)
+
+    mark_session_written(session_id)
+    return run_id
@@ -0,0 +1,30 @@
+"""
+Soft resource limits for executed code, shared by the server and the
+pooled interpreters.
+
+worker.py runs as a script and imports this module from its own directory,
+so it depends on nothing but the standard library and stays cheap to
+snapshot and restore between jobs.
+"""
+import math
+import resource
+
+
+def set_soft_limits(pid: int, cpu_seconds: int, memory_bytes: int, cpu_used: float = 0.0):
+    """
+    Set the RLIMIT_CPU and RLIMIT_AS soft limits of process pid (0 for the
+    caller) with prlimit(); 0 raises a soft limit back to the hard limit.
+    cpu_used is CPU time the process has already spent, since RLIMIT_CPU
+    counts from its start. A process that has already exited is ignored.
+    """
+    for name, soft in (
+        (resource.RLIMIT_CPU, math.ceil(cpu_used) + cpu_seconds if cpu_seconds else resource.RLIM_INFINITY),
+        (resource.RLIMIT_AS, memory_bytes or resource.RLIM_INFINITY),
+    ):
+        try:
+            _, hard = resource.prlimit(pid, name)
+            if hard != resource.RLIM_INFINITY and (soft == resource.RLIM_INFINITY or soft > hard):
+                soft = hard
+            resource.prlimit(pid, name, (soft, hard))
+        except ProcessLookupError:
+            return
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import selectors
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from app.execution.usage import ResourceUsage, get_resource_limits, kill_child, wait_for_child, with_limit_message
+from app.metrics import execution_duration, span
+
+PYTHON_COMMAND = "python"
+TIMEOUT_SECONDS = 2
+TIMEOUT_MESSAGE = f"Execution timed out after {TIMEOUT_SECONDS} seconds"
+
+
+READ_CHUNK_BYTES = 65536
+
+
+@dataclass
+class ExecutionResult:
+    stdout: str
+    stderr: str
+    usage: Optional[ResourceUsage] = None
+
+
+def _read_output(process: subprocess.Popen, deadline: float) -> Tuple[bytes, bytes, bool]:
+    """Read stdout and stderr to EOF. Returns (stdout, stderr, timed_out)."""
+    chunks = {process.stdout: [], process.stderr: []}
+    with selectors.DefaultSelector() as selector:
+        for pipe in chunks:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                return b"", b"", True
+            for key, _ in selector.select(wait):
+                data = os.read(key.fd, READ_CHUNK_BYTES)
+                if data:
+                    chunks[key.fileobj].append(data)
+                else:
+                    selector.unregister(key.fileobj)
+    return b"".join(chunks[process.stdout]), b"".join(chunks[process.stderr]), False
+
+
+def run_in_subprocess(code: str) -> ExecutionResult:
+    """
+    Execute code in a fresh `python -c` process under the configured
+    resource limits, and measure its usage with wait4().
+
+    Pays full interpreter startup on every call. Used when the interpreter
+    pool is disabled and as the baseline in benchmarks.
+    """
+    limits = get_resource_limits()
+    started = time.perf_counter()
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    try:
+        process = subprocess.Popen(
+            [PYTHON_COMMAND, "-c", code],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except Exception as e:
+        return ExecutionResult(stdout="", stderr=str(e))
+    limits.apply_to_child(process)
+
+    try:
+        stdout, stderr, timed_out = _read_output(process, deadline)
+        if timed_out:
+            kill_child(process)
+        usage, killed = wait_for_child(process, started, deadline)
+    finally:
+        kill_child(process)
+        process.stdout.close()
+        process.stderr.close()
+
+    if timed_out or killed:
+        return ExecutionResult(stdout="", stderr=TIMEOUT_MESSAGE, usage=usage)
+    return ExecutionResult(
+        stdout=stdout.decode(errors="replace"),
+        stderr=with_limit_message(stderr.decode(errors="replace"), process.returncode, limits),
+        usage=usage,
+    )
+
+
+async def run_in_subprocess_async(code: str) -> ExecutionResult:
+    """
+    run_in_subprocess with asyncio.create_subprocess_exec, so waiting for
+    the program suspends the request instead of holding a thread. The event
+    loop reaps the child itself, so only wall time is measured.
+    """
+    limits = get_resource_limits()
+    started = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            PYTHON_COMMAND, "-c", code,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except Exception as e:
+        return ExecutionResult(stdout="", stderr=str(e))
+    limits.apply_to_child(process)
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return ExecutionResult(
+            stdout="",
+            stderr=TIMEOUT_MESSAGE,
+            usage=ResourceUsage(wall_seconds=time.perf_counter() - started),
+        )
+
+    return ExecutionResult(
+        stdout=stdout.decode(errors="replace"),
+        stderr=with_limit_message(stderr.decode(errors="replace"), process.returncode, limits),
+        usage=ResourceUsage(wall_seconds=time.perf_counter() - started),
+    )
+
+
+def run_code(code: str) -> ExecutionResult:
+    """
+    Execute code on a warm pooled interpreter when the pool is running,
+    otherwise in a fresh subprocess. Both paths share the same timeout and
+    output semantics.
+    """
+    from app.execution.pool import get_pool
+
+    pool = get_pool()
+    if pool is None:
+        with span(execution_duration, "subprocess"):
+            return run_in_subprocess(code)
+
+    with span(execution_duration, "pool"):
+        try:
+            return pool.run(code)
+        except Exception as e:
+            return ExecutionResult(stdout="", stderr=str(e))
+
+
+async def run_code_async(code: str) -> ExecutionResult:
+    """
+    Execute code in a fresh asyncio subprocess. The interpreter pool is
+    driven through blocking pipes, so async mode does not use it.
+    """
+    with span(execution_duration, "subprocess"):
+        return await run_in_subprocess_async(code)
@@ -0,0 +1,102 @@
+import codecs
+import os
+import selectors
+import subprocess
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+from app.execution.runner import PYTHON_COMMAND, TIMEOUT_MESSAGE, TIMEOUT_SECONDS
+from app.execution.usage import ResourceUsage, get_resource_limits, kill_child, wait_for_child, with_limit_message
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+READ_CHUNK_BYTES = 4096
+
+
+def output_limit_message(max_output_bytes: int) -> str:
+    return f"Output limit of {max_output_bytes} bytes exceeded"
+
+
+def stream_subprocess(
+    code: str,
+    max_output_bytes: int,
+    timeout: float = TIMEOUT_SECONDS,
+    on_exit: Optional[Callable[[ResourceUsage], None]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Execute code in a fresh unbuffered `python -c` process and yield
+    (stream, text) chunks as the process writes them.
+
+    At most max_output_bytes of combined stdout/stderr are forwarded; past
+    that the process is killed and a final stderr chunk explains why. The
+    same happens with TIMEOUT_MESSAGE when the process outlives the timeout.
+    Closing the generator early kills the process. The process runs under
+    the configured resource limits; once it has been reaped, on_exit is
+    called with its usage. Does NOT use the interpreter pool, whose
+    protocol only returns output once a job ends.
+    """
+    limits = get_resource_limits()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [PYTHON_COMMAND, "-u", "-c", code],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    limits.apply_to_child(process)
+    selector = selectors.DefaultSelector()
+    decoders = {}
+    for name, pipe in ((STDOUT, process.stdout), (STDERR, process.stderr)):
+        selector.register(pipe, selectors.EVENT_READ, name)
+        decoders[name] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    deadline = time.monotonic() + timeout
+    remaining_bytes = max_output_bytes
+    usage = None
+
+    try:
+        while selector.get_map():
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                yield STDERR, TIMEOUT_MESSAGE
+                return
+
+            for key, _ in selector.select(wait):
+                data = os.read(key.fd, READ_CHUNK_BYTES)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    tail = decoders[key.data].decode(b"", final=True)
+                    if tail:
+                        yield key.data, tail
+                    continue
+
+                if len(data) > remaining_bytes:
+                    data = data[:remaining_bytes]
+                    remaining_bytes = -1
+                else:
+                    remaining_bytes -= len(data)
+
+                text = decoders[key.data].decode(data)
+                if text:
+                    yield key.data, text
+                if remaining_bytes < 0:
+                    yield STDERR, output_limit_message(max_output_bytes)
+                    return
+
+        usage, killed = wait_for_child(process, started, deadline)
+        if killed:
+            yield STDERR, TIMEOUT_MESSAGE
+            return
+        message = with_limit_message("", process.returncode, limits)
+        if message:
+            yield STDERR, message
+    finally:
+        selector.close()
+        if usage is None:
+            kill_child(process)
+            usage, _ = wait_for_child(process, started)
+        process.stdout.close()
+        process.stderr.close()
+        if on_exit is not None:
+            on_exit(usage)
@@ -0,0 +1,143 @@
+"""
+Resource accounting and limits for executed code.
+
+ResourceUsage is what one execution cost: wall time measured by the
+server, plus user and system CPU seconds and peak resident set size of the
+program. A fresh subprocess is reaped with os.wait4(), which reports the
+child's own totals; Linux carries the forking server's RSS high-water mark
+across exec, so its peak RSS is never below the server's own. A pooled
+interpreter reports the growth of its getrusage() counters over the job
+and the peak RSS of the job alone. Usage the server could not measure is
+None.
+
+ResourceLimits are enforced with prlimit: RLIMIT_CPU caps the CPU
+seconds of one execution, and the program is killed with SIGXCPU past it;
+RLIMIT_AS caps its address space, so large allocations raise MemoryError.
+The same implementation limits fresh subprocesses, from the server right
+after spawning them, and pooled interpreters, which limit themselves
+before each job; both go through rlimits.set_soft_limits.
+"""
+import os
+import signal
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Optional, Tuple
+
+from app.execution.rlimits import set_soft_limits
+
+CPU_LIMIT_MESSAGE = "CPU time limit of {} seconds exceeded"
+REAP_POLL_SECONDS = 0.01
+
+
+@dataclass
+class ResourceUsage:
+    wall_seconds: float
+    cpu_user_seconds: Optional[float] = None
+    cpu_system_seconds: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+
+    def columns(self) -> dict:
+        """run_events column values."""
+        return asdict(self)
+
+
+USAGE_COLUMNS = [field.name for field in fields(ResourceUsage)]
+
+
+def usage_columns(usage: Optional[ResourceUsage]) -> dict:
+    """run_events column values, all NULL when nothing was measured."""
+    return usage.columns() if usage is not None else dict.fromkeys(USAGE_COLUMNS)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Per-execution limits; 0 leaves a resource unlimited."""
+    cpu_seconds: int = 0
+    memory_bytes: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cpu_seconds or self.memory_bytes)
+
+    def apply(self, pid: int = 0, cpu_used: float = 0.0):
+        """Set the soft limits of process pid (0 for the caller); see set_soft_limits."""
+        set_soft_limits(pid, self.cpu_seconds, self.memory_bytes, cpu_used)
+
+    def apply_to_child(self, process):
+        """
+        Limit a child right after it was spawned. Done from the parent
+        rather than in preexec_fn, which is unsafe in a threaded server;
+        the child is still starting the interpreter when the limits land,
+        well before the submitted code runs.
+        """
+        if self.enabled:
+            self.apply(process.pid)
+
+
+_limits = ResourceLimits()
+
+
+def set_resource_limits(limits: ResourceLimits):
+    global _limits
+    _limits = limits
+
+
+def get_resource_limits() -> ResourceLimits:
+    return _limits
+
+
+def kill_child(process):
+    """
+    SIGKILL a subprocess.Popen child without reaping it, unlike
+    Popen.kill(), which polls first and would leave nothing for wait4().
+    """
+    if process.returncode is None:
+        try:
+            os.kill(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def wait_for_child(process, started: float, deadline: Optional[float] = None) -> Tuple[ResourceUsage, bool]:
+    """
+    Reap a subprocess.Popen child with os.wait4() and return (usage,
+    killed). Wall time counts from started, a time.perf_counter() value. A
+    child still running at deadline, a time.monotonic() value, is killed
+    first. Sets the Popen's returncode, so it never waits for the child
+    again.
+    """
+    killed = False
+    poll = REAP_POLL_SECONDS / 16
+    try:
+        while True:
+            blocking = deadline is None or killed
+            pid, status, rusage = os.wait4(process.pid, 0 if blocking else os.WNOHANG)
+            if pid:
+                break
+            if time.monotonic() >= deadline:
+                kill_child(process)
+                killed = True
+            else:
+                time.sleep(poll)
+                poll = min(poll * 2, REAP_POLL_SECONDS)
+    except ChildProcessError:
+        # Already reaped through the Popen itself; only wall time is known.
+        process.wait()
+        return ResourceUsage(wall_seconds=time.perf_counter() - started), killed
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return ResourceUsage(
+        wall_seconds=time.perf_counter() - started,
+        cpu_user_seconds=rusage.ru_utime,
+        cpu_system_seconds=rusage.ru_stime,
+        max_rss_kb=rusage.ru_maxrss,
+    ), killed
+
+
+def with_limit_message(stderr: str, returncode: Optional[int], limits: ResourceLimits) -> str:
+    """stderr, plus CPU_LIMIT_MESSAGE when the program was killed by RLIMIT_CPU."""
+    if returncode != -signal.SIGXCPU:
+        return stderr
+    if stderr and not stderr.endswith("\n"):
+        stderr += "\n"
+    return stderr + CPU_LIMIT_MESSAGE.format(limits.cpu_seconds)
@@ -0,0 +1,375 @@
+"""
+Long-lived interpreter that executes submitted code one job at a time.
+
+Started by InterpreterPool. Reads one JSON job per line from stdin and writes
+one JSON result per line to stdout, echoing the job's "seq" so the pool can
+discard stale or forged lines. The real stdin/stdout/stderr file
+descriptors are pointed at /dev/null so user code cannot corrupt the
+protocol stream by printing.
+
+After every job (and every batch case) the worker restores its baseline
+state before anything else runs: modules imported by the job are unloaded;
+builtins, sys.path, sys.meta_path, sys.path_hooks, the recursion limit,
+profile/trace and async generator hooks, gc callbacks, signal handlers,
+soft rlimits, the umask, the working directory and os.environ are reset;
+pending garbage is collected so no finalizer of the job runs during the
+next one. The namespaces of the modules loaded at startup, and the classes
+they define, are compared against a snapshot and restored, which also
+keeps the protocol serializer intact for the reply. A job that changed any
+of those, added an audit hook, lowered a hard rlimit or replaced the
+protocol descriptors reports "clean": false, and the pool retires the
+worker.
+
+A job with "cases" is a batch: the program runs once per case, with that
+case's stdin and, when "function" is set, followed by a call to that
+function with the case's args. Each case gets a fresh namespace and module
+state and at most "case_timeout" seconds; cases that would start after
+"timeout" seconds are skipped.
+
+Every job may carry "limits" ({"cpu_seconds", "memory_bytes"}, 0 for
+unlimited), applied as soft rlimits for that job by rlimits.set_soft_limits,
+imported from this directory; the CPU limit counts from the CPU time
+already used, since RLIMIT_CPU is cumulative. Every result carries the
+job's "usage": the growth of this process's CPU times and its peak RSS
+during the job, read from VmHWM after resetting it through
+/proc/self/clear_refs (the peak so far where /proc is unavailable).
+"""
+import builtins
+import gc
+import io
+import json
+import operator
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from rlimits import set_soft_limits
+
+TIMEOUT_MESSAGE = "Execution timed out after {:.3g} seconds"
+SKIPPED_MESSAGE = "Skipped: batch time budget exhausted"
+
+
+class CaseTimeout(BaseException):
+    pass
+
+
+def _raise_case_timeout(signum, frame):
+    raise CaseTimeout()
+
+
+def _capture_stream() -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(), encoding="utf-8", errors="replace", write_through=True)
+
+
+def _read_stream(stream: io.TextIOWrapper) -> str:
+    stream.flush()
+    return stream.buffer.getvalue().decode("utf-8", errors="replace")
+
+
+def _report_system_exit(exc: SystemExit, stderr: io.TextIOWrapper):
+    # Mirrors the interpreter: only non-integer exit codes are printed.
+    if exc.code is not None and not isinstance(exc.code, int):
+        print(exc.code, file=stderr)
+
+
+def run_job(code: str, stdin: str = "", function=None, args=()) -> dict:
+    stdout = _capture_stream()
+    stderr = _capture_stream()
+    sys.stdout, sys.stderr, sys.stdin = stdout, stderr, io.StringIO(stdin)
+    sys.argv = ["-c"]
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    result = {}
+
+    try:
+        compiled = compile(code, "<string>", "exec")
+    except (SyntaxError, ValueError) as exc:
+        stderr.write("".join(traceback.format_exception_only(type(exc), exc)))
+    else:
+        try:
+            exec(compiled, namespace)
+            if function is not None:
+                if not callable(namespace.get(function)):
+                    raise NameError(f"function '{function}' is not defined")
+                result["return_value"] = repr(namespace[function](*args))
+        except SystemExit as exc:
+            _report_system_exit(exc, stderr)
+        except CaseTimeout:
+            raise
+        except BaseException as exc:
+            # Drop this module's frame so tracebacks match `python -c`.
+            stderr.write("".join(traceback.format_exception(type(exc), exc, exc.__traceback__.tb_next)))
+    finally:
+        sys.stdout, sys.stderr, sys.stdin = sys.__stdout__, sys.__stderr__, sys.__stdin__
+        result.update({
+            "stdout": _read_stream(stdout),
+            "stderr": _read_stream(stderr),
+            "clean": threading.active_count() == 1,
+        })
+
+    return result
+
+
+def run_case(code: str, case: dict, function, case_timeout: float) -> dict:
+    """Run one batch case under an interval timer; returns its result and timing."""
+    started = time.perf_counter()
+    previous = signal.signal(signal.SIGALRM, _raise_case_timeout)
+    signal.setitimer(signal.ITIMER_REAL, case_timeout)
+    try:
+        result = run_job(code, case.get("stdin") or "", function, case.get("args") or ())
+        result["timed_out"] = False
+    except CaseTimeout:
+        result = {
+            "stdout": "",
+            "stderr": TIMEOUT_MESSAGE.format(case_timeout),
+            "clean": threading.active_count() == 1,
+            "timed_out": True,
+        }
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(job: dict, reset) -> dict:
+    deadline = time.monotonic() + job["timeout"]
+    cases = []
+    clean = True
+    for case in job["cases"]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            cases.append({"stdout": "", "stderr": SKIPPED_MESSAGE, "seconds": 0.0, "timed_out": True})
+            continue
+        result = run_case(job["code"], case, job.get("function"), min(job["case_timeout"], remaining))
+        intact = reset()
+        clean = clean and result.pop("clean") and intact
+        cases.append(result)
+    return {"cases": cases, "clean": clean}
+
+
+RLIMITS = [
+    getattr(resource, name)
+    for name in ("RLIMIT_AS", "RLIMIT_CORE", "RLIMIT_CPU", "RLIMIT_DATA", "RLIMIT_FSIZE", "RLIMIT_NOFILE", "RLIMIT_NPROC", "RLIMIT_STACK")
+    if hasattr(resource, name)
+]
+# Module attributes the interpreter itself rebinds while running jobs.
+VOLATILE_ATTRIBUTES = {
+    "sys": frozenset({"argv", "stdin", "stdout", "stderr", "last_type", "last_value", "last_traceback", "last_exc"}),
+}
+_MISSING = object()
+_IMMUTABLE_TYPE = 1 << 8  # Py_TPFLAGS_IMMUTABLETYPE
+
+
+def _is_mutable_class(value, module_name: str) -> bool:
+    return isinstance(value, type) and value.__module__ == module_name and not value.__flags__ & _IMMUTABLE_TYPE
+
+
+class Baseline:
+    """
+    Snapshot of the interpreter state taken before the first job, and
+    restore() to return to it after each one.
+    """
+
+    def __init__(self, protocol_fds):
+        self.modules = {}
+        self.classes = {}
+        for name, module in list(sys.modules.items()):
+            namespace = getattr(module, "__dict__", None)
+            if namespace is None:
+                continue
+            volatile = VOLATILE_ATTRIBUTES.get(name, frozenset())
+            self.modules[name] = (module, {key: value for key, value in namespace.items() if key not in volatile})
+            for value in list(namespace.values()):
+                if _is_mutable_class(value, name) and value not in self.classes:
+                    self.classes[value] = dict(value.__dict__)
+
+        self.builtins = dict(vars(builtins))
+        self.path = list(sys.path)
+        self.meta_path = list(sys.meta_path)
+        self.path_hooks = list(sys.path_hooks)
+        self.recursion_limit = sys.getrecursionlimit()
+        self.switch_interval = sys.getswitchinterval()
+        self.asyncgen_hooks = sys.get_asyncgen_hooks()
+        self.gc_callbacks = list(gc.callbacks)
+        self.signals = {signum: signal.getsignal(signum) for signum in signal.valid_signals() if signal.getsignal(signum) is not None}
+        self.rlimits = {name: resource.getrlimit(name) for name in RLIMITS}
+        self.umask = os.umask(0o022)
+        os.umask(self.umask)
+        self.cwd = os.getcwd()
+        self.environ = dict(os.environ)
+        self.protocol_fds = {fd: self._fd_identity(fd) for fd in protocol_fds}
+        self.audit_hook_added = False
+        sys.addaudithook(self._audit)
+        # Keep the baseline objects out of the collections restore() runs.
+        gc.collect()
+        gc.freeze()
+
+    def _audit(self, event, args):
+        if event == "sys.addaudithook":
+            self.audit_hook_added = True
+
+    @staticmethod
+    def _fd_identity(fd):
+        try:
+            status = os.fstat(fd)
+        except OSError:
+            return None
+        return status.st_dev, status.st_ino
+
+    def restore(self) -> bool:
+        """Reset the interpreter to the snapshot. Returns False when the job changed something that cannot be undone reliably."""
+        sys.setprofile(None)
+        sys.settrace(None)
+        threading.setprofile(None)
+        threading.settrace(None)
+        sys.set_asyncgen_hooks(*self.asyncgen_hooks)
+        intact = not self.audit_hook_added
+
+        for name in set(sys.modules) - set(self.modules):
+            del sys.modules[name]
+        for name, (module, snapshot) in self.modules.items():
+            if sys.modules.get(name) is not module:
+                sys.modules[name] = module
+                intact = False
+            intact = self._restore_namespace(module.__dict__, snapshot, VOLATILE_ATTRIBUTES.get(name, frozenset())) and intact
+        for cls, snapshot in self.classes.items():
+            intact = self._restore_class(cls, snapshot) and intact
+
+        builtins_namespace = vars(builtins)
+        builtins_namespace.clear()
+        builtins_namespace.update(self.builtins)
+        sys.path[:] = self.path
+        sys.meta_path[:] = self.meta_path
+        sys.path_hooks[:] = self.path_hooks
+        sys.setrecursionlimit(self.recursion_limit)
+        sys.setswitchinterval(self.switch_interval)
+        gc.callbacks[:] = self.gc_callbacks
+
+        for signum in signal.valid_signals():
+            handler = self.signals.get(signum)
+            if handler is not None and signal.getsignal(signum) is not handler:
+                signal.signal(signum, handler)
+        for name, (soft, hard) in self.rlimits.items():
+            if resource.getrlimit(name)[1] != hard:
+                intact = False
+            elif name not in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+                resource.setrlimit(name, (soft, hard))
+        os.umask(self.umask)
+        try:
+            changed_cwd = os.getcwd() != self.cwd
+        except OSError:
+            changed_cwd = True
+        if changed_cwd:
+            os.chdir(self.cwd)
+        if dict(os.environ) != self.environ:
+            os.environ.clear()
+            os.environ.update(self.environ)
+        for fd, identity in self.protocol_fds.items():
+            if self._fd_identity(fd) != identity:
+                intact = False
+
+        gc.collect()
+        return intact
+
+    @staticmethod
+    def _changed(namespace, snapshot: dict, volatile=frozenset()) -> list:
+        """Names bound, rebound or deleted since snapshot, which excludes the volatile names."""
+        # Compare by identity, in C for the common unchanged case: a replaced object may compare equal.
+        present = len(namespace) - sum(name in namespace for name in volatile)
+        if present == len(snapshot) and all(map(operator.is_, map(namespace.get, snapshot), snapshot.values())):
+            return []
+        added = [name for name in namespace if name not in snapshot and name not in volatile]
+        return added + [name for name, value in snapshot.items() if namespace.get(name, _MISSING) is not value]
+
+    def _restore_namespace(self, namespace: dict, snapshot: dict, volatile) -> bool:
+        changed = self._changed(namespace, snapshot, volatile)
+        for name in changed:
+            if name in snapshot:
+                namespace[name] = snapshot[name]
+            else:
+                del namespace[name]
+        return not changed
+
+    def _restore_class(self, cls, snapshot: dict) -> bool:
+        changed = self._changed(cls.__dict__, snapshot)
+        for name in changed:
+            try:
+                if name in snapshot:
+                    setattr(cls, name, snapshot[name])
+                else:
+                    delattr(cls, name)
+            except (AttributeError, TypeError):
+                pass
+        return not changed
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_measured(job: dict, reset) -> dict:
+    reset_peak_rss()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    limits = job.get("limits") or {}
+    set_soft_limits(0, limits.get("cpu_seconds") or 0, limits.get("memory_bytes") or 0, before.ru_utime + before.ru_stime)
+    if "cases" in job:
+        result = run_batch(job, reset)
+    else:
+        result = run_job(job["code"])
+        intact = reset()
+        result["clean"] = result["clean"] and intact
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    result["usage"] = {
+        "cpu_user_seconds": after.ru_utime - before.ru_utime,
+        "cpu_system_seconds": after.ru_stime - before.ru_stime,
+        "max_rss_kb": peak_rss_kb(),
+    }
+    return result
+
+
+def main():
+    protocol_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    sys.path[0] = ""
+    baseline = Baseline([protocol_in.fileno(), protocol_out.fileno()])
+    encode = json.JSONEncoder().encode
+    decode = json.JSONDecoder().decode
+
+    protocol_out.write(encode({"ready": True}) + "\n")
+    protocol_out.flush()
+
+    for line in protocol_in:
+        job = decode(line)
+        seq = job.pop("seq", None)
+        result = run_measured(job, baseline.restore)
+        result["seq"] = seq
+
+        protocol_out.write(encode(result) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
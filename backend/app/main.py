@@ -1,8 +1,124 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, sessions, execute, prompts, signals
+from fastapi.responses import PlainTextResponse
+from app import metrics
+from app.admission import AUTH, EXECUTE, admission_status, get_admission_controller, start_admission, stop_admission
+from app.config import settings
+from app.db import (
+    dispose_async_engine,
+    dispose_engine,
+    get_db,
+    init_async_engine,
+    init_engine,
+    pool_status,
+    replica_engines,
+    replica_status,
+)
+from app.execution.buffer import get_event_buffer, start_event_buffer, stop_event_buffer
+from app.execution.cache import get_result_cache, start_result_cache, stop_result_cache
+from app.execution.jobs import get_job_queue, start_job_queue, stop_job_queue
+from app.execution.pool import get_pool, start_pool, stop_pool
+from app.execution.usage import ResourceLimits, set_resource_limits
+from app.security.hashing import start_password_executor, stop_password_executor
+from app.security.otp import get_otp_store, start_otp_store, stop_otp_store
+from app.security.tokens import token_cache
+from app.routes import analytics, auth, sessions, execute, prompts, signals
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine = init_engine()
+    instrumented = [engine, *replica_engines()]
+    if settings.async_mode:
+        instrumented.append(init_async_engine().sync_engine)
+    if settings.metrics_enabled:
+        for instrumented_engine in instrumented:
+            metrics.instrument_engine(instrumented_engine)
+    prompts.prompt_catalog.refresh_in_background(engine)
+    start_password_executor(settings.password_hash_workers)
+    start_otp_store(
+        backend=settings.otp_store,
+        engine_provider=get_db,
+        ttl_seconds=settings.otp_ttl_seconds,
+        max_entries=settings.otp_memory_max_entries,
+        sweep_interval=settings.otp_sweep_interval,
+        sweep_batch_size=settings.otp_sweep_batch_size,
+    )
+    if settings.event_buffer_enabled:
+        start_event_buffer(
+            engine_provider=get_db,
+            max_events=settings.event_buffer_max_events,
+            flush_interval=settings.event_buffer_flush_interval,
+            spill_dir=settings.event_buffer_spill_dir,
+            fsync=settings.event_buffer_fsync,
+        )
+    set_resource_limits(ResourceLimits(
+        cpu_seconds=settings.execute_cpu_limit_seconds,
+        memory_bytes=settings.execute_memory_limit_mb * 1024 * 1024,
+    ))
+    if settings.execute_pool_enabled:
+        start_pool(
+            min_size=settings.execute_pool_min_size,
+            max_size=settings.execute_pool_max_size,
+            max_runs=settings.execute_pool_max_runs,
+        )
+    if settings.execute_cache_enabled:
+        start_result_cache(
+            max_bytes=settings.execute_cache_max_bytes,
+            ttl_seconds=settings.execute_cache_ttl,
+        )
+    if settings.admission_enabled:
+        start_admission(
+            limits={
+                EXECUTE: (settings.admission_execute_max_in_flight, settings.admission_execute_max_queued),
+                AUTH: (settings.admission_auth_max_in_flight, settings.admission_auth_max_queued),
+            },
+            queue_timeout=settings.admission_queue_timeout,
+            client_rate=settings.admission_client_rate,
+            client_burst=settings.admission_client_burst,
+        )
+    if settings.execute_queue_enabled:
+        start_job_queue(
+            handler=execute.run_queued_job,
+            max_in_flight=settings.execute_queue_max_in_flight,
+            max_queued_per_user=settings.execute_queue_max_per_user,
+            result_ttl_seconds=settings.execute_queue_result_ttl,
+        )
+    yield
+    stop_job_queue()
+    stop_admission()
+    stop_result_cache()
+    stop_pool()
+    stop_event_buffer()
+    stop_otp_store()
+    stop_password_executor()
+    await dispose_async_engine()
+    dispose_engine()
+
 
-app = FastAPI()
+def _stats_of(get_component):
+    component = get_component()
+    return component.stats() if component is not None else {}
+
+
+app = FastAPI(lifespan=lifespan)
+
+if settings.metrics_enabled:
+    metrics.enable()
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_collector("db_pool", pool_status)
+    metrics.register_collector("db_replicas", replica_status)
+    metrics.register_collector("interpreter_pool", lambda: _stats_of(get_pool))
+    metrics.register_collector("job_queue", lambda: _stats_of(get_job_queue))
+    metrics.register_collector("result_cache", lambda: _stats_of(get_result_cache))
+    metrics.register_collector("event_buffer", lambda: _stats_of(get_event_buffer))
+    metrics.register_collector("token_cache", token_cache.stats)
+    metrics.register_collector("admission_execute", lambda: _stats_of(lambda: get_admission_controller(EXECUTE)))
+    metrics.register_collector("admission_auth", lambda: _stats_of(lambda: get_admission_controller(AUTH)))
+    metrics.register_collector("otp_store", lambda: _stats_of(get_otp_store))
+    metrics.register_collector("prompt_catalog", prompts.prompt_catalog.stats)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,13 +128,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(auth.router)
-app.include_router(sessions.router)
-app.include_router(execute.router)
-app.include_router(prompts.router)
-app.include_router(signals.router)
+# Async mode swaps in handlers that run on the event loop with the asyncio engine.
+for module in (auth, sessions, execute, prompts, signals):
+    app.include_router(module.async_router if settings.async_mode else module.router)
+app.include_router(analytics.router)
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/db")
+def db_pool_health():
+    return pool_status()
+
+
+@app.get("/health/db/replicas")
+def db_replica_health():
+    return replica_status()
+
+
+@app.get("/health/auth")
+def token_cache_health():
+    return token_cache.stats()
+
+
+@app.get("/health/admission")
+def admission_health():
+    return admission_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+
+    Does NOT require authentication; expose it only on an internal network.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
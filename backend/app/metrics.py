@@ -0,0 +1,214 @@
+"""
+In-process latency histograms exposed in Prometheus text format.
+
+Request timings come from MetricsMiddleware, statement timings from
+SQLAlchemy cursor events tagged with the route being served, and code
+execution and password hashing timings from explicit spans. When metrics
+are disabled the middleware passes requests straight through, the engine
+is not instrumented and spans return without reading the clock.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+BACKGROUND_ROUTE = "background"
+
+enabled = False
+
+_current_scope: ContextVar[Optional[dict]] = ContextVar("metrics_current_scope", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: List[str], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {total}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+request_duration = Histogram(
+    "cogniflow_http_request_duration_seconds",
+    "HTTP request latency by route template and status code.",
+    ["method", "route", "status"],
+)
+
+query_duration = Histogram(
+    "cogniflow_db_query_duration_seconds",
+    "Database statement latency by the route that issued it.",
+    ["route", "statement"],
+)
+
+execution_duration = Histogram(
+    "cogniflow_execution_duration_seconds",
+    "User code execution latency by execution backend.",
+    ["backend"],
+)
+
+password_hash_duration = Histogram(
+    "cogniflow_password_hash_duration_seconds",
+    "bcrypt latency including time queued for a hashing worker.",
+    ["operation"],
+)
+
+HISTOGRAMS = [request_duration, query_duration, execution_duration, password_hash_duration]
+
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_collector(prefix: str, collect: Callable[[], dict]):
+    """
+    Expose numeric values from collect() as gauges named
+    cogniflow_<prefix>_<key>. Non-numeric values are skipped.
+    """
+    _collectors[prefix] = collect
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def current_route_of(scope: dict) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return BACKGROUND_ROUTE
+    return current_route_of(scope)
+
+
+@contextmanager
+def span(histogram: Histogram, *labels):
+    if not enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, *labels)
+
+
+def instrument_engine(engine: Engine):
+    """Time every statement the engine executes and tag it with the current route."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_started"].pop()
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        query_duration.observe(time.perf_counter() - started, current_route(), keyword)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_scope.reset(token)
+            request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                current_route_of(scope),
+                str(status["code"]),
+            )
+
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    for prefix, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"cogniflow_{prefix}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,525 @@
+"""
+Versioned schema migrations.
+
+Each migration is a function registered with @migration(version,
+description) and applied in version order inside its own transaction.
+Applied versions are recorded in schema_migrations, so running the
+migrator repeatedly only applies what is new. Migrations must be safe on
+databases created by the pre-migration create_tables.py, which is why
+table and index creation use checkfirst.
+
+Migration 1 creates the baseline schema from a frozen snapshot rather than
+the live models, so a fresh database passes through the same shapes as an
+upgraded one and later migrations run against the tables they were written
+for. Migrations that move data (2 and 4) likewise carry frozen copies of the
+tables and logic they need instead of calling into the application.
+"""
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    case,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.prompt_import import text_hash
+from app.models.activity import session_activity
+from app.models.email_verification import email_verification_tokens
+from app.models.events import error_events, error_fingerprints, run_events
+from app.models.prompts import prompt_catalog_version, prompts
+from app.models.sessions import sessions
+from app.models.users import users
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Model modules each own a MetaData; foreign keys only resolve once every
+# table shares one.
+for table in [
+    users,
+    sessions,
+    prompts,
+    prompt_catalog_version,
+    run_events,
+    error_fingerprints,
+    error_events,
+    email_verification_tokens,
+    session_activity,
+]:
+    table.to_metadata(metadata)
+
+
+# The schema create_tables.py created before migrations existed. Frozen:
+# never edit these to follow the models; add a migration instead.
+baseline_metadata = MetaData()
+
+Table(
+    "users",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("email", String(255), unique=True, nullable=False),
+    Column("password_hash", String(255), nullable=False),
+    Column("is_verified", Boolean, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+Table(
+    "sessions",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("prompt_text", String, nullable=False),
+    Column("started_at", DateTime, nullable=False),
+    Column("ended_at", DateTime, nullable=True),
+)
+
+Table(
+    "prompts",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("text", String, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+Table(
+    "run_events",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", Integer, ForeignKey("sessions.id"), nullable=False),
+    Column("executed_at", DateTime, nullable=False),
+)
+
+Table(
+    "error_events",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("run_id", Integer, ForeignKey("run_events.id"), nullable=False),
+    Column("error_message", Text, nullable=False),
+    Column("occurred_at", DateTime, nullable=False),
+)
+
+Table(
+    "email_verification_tokens",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("otp_code", String(6), nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("used", Boolean, nullable=False),
+)
+
+
+def _frozen_metadata(*baseline_tables: str) -> MetaData:
+    """A MetaData holding copies of the named baseline tables, for foreign keys."""
+    frozen = MetaData()
+    for name in baseline_tables:
+        baseline_metadata.tables[name].to_metadata(frozen)
+    return frozen
+
+
+# session_activity as migration 2 creates it, next to the baseline event
+# tables it is backfilled from. Frozen.
+activity_metadata = _frozen_metadata("users", "sessions", "run_events", "error_events")
+
+Table(
+    "session_activity",
+    activity_metadata,
+    Column("session_id", Integer, ForeignKey("sessions.id"), primary_key=True),
+    Column("run_count", Integer, nullable=False),
+    Column("error_count", Integer, nullable=False),
+    Column("first_run_at", DateTime, nullable=True),
+    Column("last_run_at", DateTime, nullable=True),
+    Column("first_error_at", DateTime, nullable=True),
+    Column("runs_after_first_error", Integer, nullable=False),
+)
+
+# error_fingerprints and error_events as migration 4 creates them. Frozen.
+fingerprint_metadata = _frozen_metadata("users", "sessions", "run_events")
+
+Table(
+    "error_fingerprints",
+    fingerprint_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("digest", String(64), nullable=False, unique=True),
+    Column("exception_type", String, nullable=False),
+    Column("location", String, nullable=True),
+    Column("message", Text, nullable=False),
+    Column("occurrences", Integer, nullable=False),
+    Column("archived_occurrences", Integer, server_default="0", nullable=False),
+    Column("first_seen_at", DateTime, nullable=False),
+    Column("last_seen_at", DateTime, nullable=False),
+)
+
+Table(
+    "error_events",
+    fingerprint_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("run_id", Integer, ForeignKey("run_events.id"), nullable=False),
+    Column("fingerprint_id", Integer, ForeignKey("error_fingerprints.id"), nullable=True),
+    Column("error_message", Text, nullable=True),
+    Column("error_message_compressed", LargeBinary, nullable=True),
+    Column("occurred_at", DateTime, nullable=False),
+    Index("ix_error_events_run_id", "run_id"),
+    Index("ix_error_events_fingerprint_id", "fingerprint_id"),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    def register(upgrade):
+        MIGRATIONS.append(Migration(version, description, upgrade))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return register
+
+
+def _create_tables(conn: Connection, *names: str):
+    metadata.create_all(conn, tables=[metadata.tables[name] for name in names], checkfirst=True)
+
+
+def _add_columns(conn: Connection, table_name: str, *column_names: str):
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    for name in column_names:
+        if name in existing:
+            continue
+        column = metadata.tables[table_name].c[name]
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+
+
+def _create_indexes(conn: Connection, table_name: str, *index_names: str):
+    for index in metadata.tables[table_name].indexes:
+        if index.name in index_names:
+            index.create(conn, checkfirst=True)
+
+
+def _rebuild_activity(conn: Connection):
+    """Migration 2's backfill: one session_activity row per session with runs."""
+    run_events = activity_metadata.tables["run_events"]
+    error_events = activity_metadata.tables["error_events"]
+    session_activity = activity_metadata.tables["session_activity"]
+
+    first_errors = (
+        select(
+            run_events.c.session_id,
+            func.min(error_events.c.occurred_at).label("first_error_at"),
+            func.count(error_events.c.id).label("error_count"),
+        )
+        .join(run_events, error_events.c.run_id == run_events.c.id)
+        .group_by(run_events.c.session_id)
+        .subquery()
+    )
+    aggregates = (
+        select(
+            run_events.c.session_id,
+            func.count(run_events.c.id),
+            func.coalesce(first_errors.c.error_count, 0),
+            func.min(run_events.c.executed_at),
+            func.max(run_events.c.executed_at),
+            first_errors.c.first_error_at,
+            func.sum(case(
+                (run_events.c.executed_at > first_errors.c.first_error_at, 1),
+                else_=0,
+            )),
+        )
+        .select_from(run_events.outerjoin(
+            first_errors, first_errors.c.session_id == run_events.c.session_id
+        ))
+        .group_by(run_events.c.session_id, first_errors.c.first_error_at, first_errors.c.error_count)
+    )
+
+    conn.execute(session_activity.delete())
+    conn.execute(session_activity.insert().from_select(
+        [
+            "session_id",
+            "run_count",
+            "error_count",
+            "first_run_at",
+            "last_run_at",
+            "first_error_at",
+            "runs_after_first_error",
+        ],
+        aggregates,
+    ))
+
+
+_FRAME = re.compile(r'^\s*File "(?P<file>[^"]*)", line (?P<line>\d+)(?:, in (?P<scope>.+))?$')
+_EXCEPTION = re.compile(r"^(?P<type>[A-Za-z_][\w.]*)(?::\s?(?P<message>.*))?$")
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def _fingerprint(stderr: str) -> dict:
+    """Migration 4's fingerprint of a traceback, as error_fingerprints values."""
+    lines = [line for line in stderr.strip().splitlines() if line.strip()]
+
+    location = None
+    for line in lines:
+        frame = _FRAME.match(line)
+        if frame:
+            location = f"{frame.group('file')}:{frame.group('line')}"
+            if frame.group("scope"):
+                location += f":{frame.group('scope')}"
+
+    last = lines[-1].strip() if lines else ""
+    summary = _EXCEPTION.match(last)
+    if summary and (summary.group("message") is not None or location):
+        exception_type = summary.group("type")
+        message = summary.group("message") or ""
+    else:
+        exception_type = ""
+        message = last
+    message = _NUMBER.sub("?", _QUOTED.sub("'?'", _ADDRESS.sub("0x?", message)))[:500]
+
+    digest = hashlib.sha256(
+        "\0".join([exception_type, location or "", message]).encode("utf-8", "surrogatepass")
+    ).hexdigest()
+    return {"digest": digest, "exception_type": exception_type, "location": location, "message": message}
+
+
+def _encode_message(stderr: str, storage: str) -> dict:
+    """Migration 4's error_events message columns under a storage mode."""
+    if storage == "text":
+        return {"error_message": stderr, "error_message_compressed": None}
+    if storage == "compressed":
+        return {"error_message": None, "error_message_compressed": zlib.compress(stderr.encode("utf-8", "surrogatepass"))}
+    if storage == "none":
+        return {"error_message": None, "error_message_compressed": None}
+    raise ValueError(f"Unknown error message storage: {storage}")
+
+
+@migration(1, "Create baseline tables")
+def create_baseline_tables(conn: Connection):
+    baseline_metadata.create_all(conn, checkfirst=True)
+
+
+@migration(2, "Create session_activity and backfill it from events")
+def create_session_activity(conn: Connection):
+    activity_metadata.create_all(conn, tables=[activity_metadata.tables["session_activity"]], checkfirst=True)
+    _rebuild_activity(conn)
+
+
+@migration(3, "Index hot lookups on sessions, events and verification tokens")
+def add_hot_path_indexes(conn: Connection):
+    _create_indexes(conn, "run_events", "ix_run_events_session_id_executed_at")
+    _create_indexes(conn, "error_events", "ix_error_events_run_id")
+    _create_indexes(conn, "sessions", "ix_sessions_user_id_started_at", "ix_sessions_started_at")
+    _create_indexes(conn, "email_verification_tokens", "ix_email_verification_tokens_unused")
+
+
+@migration(4, "Deduplicate error messages into error_fingerprints")
+def fingerprint_error_events(conn: Connection, batch_size: int = 1000):
+    error_fingerprints = fingerprint_metadata.tables["error_fingerprints"]
+    error_events = fingerprint_metadata.tables["error_events"]
+    fingerprint_metadata.create_all(conn, tables=[error_fingerprints], checkfirst=True)
+
+    columns = {column["name"] for column in inspect(conn).get_columns("error_events")}
+    if "fingerprint_id" in columns:
+        return
+
+    # The old table keeps its rows under another name while error_events is
+    # recreated with the new columns; its index name has to be freed first.
+    conn.execute(text("DROP INDEX IF EXISTS ix_error_events_run_id"))
+    conn.execute(text("ALTER TABLE error_events RENAME TO error_events_legacy"))
+    fingerprint_metadata.create_all(conn, tables=[error_events], checkfirst=True)
+
+    legacy = Table("error_events_legacy", MetaData(), autoload_with=conn)
+    fingerprint_ids: Dict[str, int] = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(legacy.c.id, legacy.c.run_id, legacy.c.error_message, legacy.c.occurred_at)
+            .where(legacy.c.id > last_id)
+            .order_by(legacy.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        prints = [_fingerprint(row.error_message) for row in rows]
+        seen: Dict[str, dict] = {}
+        for values, row in zip(prints, rows):
+            stats = seen.setdefault(values["digest"], {
+                **values, "occurrences": 0, "first_seen_at": row.occurred_at, "last_seen_at": row.occurred_at,
+            })
+            stats["occurrences"] += 1
+            stats["first_seen_at"] = min(stats["first_seen_at"], row.occurred_at)
+            stats["last_seen_at"] = max(stats["last_seen_at"], row.occurred_at)
+
+        known = [stats for digest, stats in seen.items() if digest in fingerprint_ids]
+        fresh = [stats for digest, stats in seen.items() if digest not in fingerprint_ids]
+        if fresh:
+            conn.execute(error_fingerprints.insert(), fresh)
+            fingerprint_ids.update(conn.execute(
+                select(error_fingerprints.c.digest, error_fingerprints.c.id)
+                .where(error_fingerprints.c.digest.in_([stats["digest"] for stats in fresh]))
+            ).all())
+        if known:
+            current = error_fingerprints.c
+            conn.execute(
+                error_fingerprints.update()
+                .where(current.id == bindparam("fingerprint_id"))
+                .values(
+                    occurrences=current.occurrences + bindparam("added"),
+                    first_seen_at=case(
+                        (bindparam("seen_first") < current.first_seen_at, bindparam("seen_first")),
+                        else_=current.first_seen_at,
+                    ),
+                    last_seen_at=case(
+                        (bindparam("seen_last") > current.last_seen_at, bindparam("seen_last")),
+                        else_=current.last_seen_at,
+                    ),
+                ),
+                [
+                    {
+                        "fingerprint_id": fingerprint_ids[stats["digest"]],
+                        "added": stats["occurrences"],
+                        "seen_first": stats["first_seen_at"],
+                        "seen_last": stats["last_seen_at"],
+                    }
+                    for stats in known
+                ],
+            )
+
+        conn.execute(error_events.insert(), [
+            {
+                "id": row.id,
+                "run_id": row.run_id,
+                "fingerprint_id": fingerprint_ids[values["digest"]],
+                "occurred_at": row.occurred_at,
+                **_encode_message(row.error_message, settings.error_message_storage),
+            }
+            for values, row in zip(prints, rows)
+        ])
+        last_id = rows[-1].id
+
+    legacy.drop(conn)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('error_events', 'id'), "
+            "COALESCE((SELECT MAX(id) FROM error_events), 0) + 1, false)"
+        ))
+
+
+@migration(5, "Mark sessions whose events were moved to the archive")
+def add_session_archived_at(conn: Connection):
+    _add_columns(conn, "sessions", "archived_at")
+
+
+@migration(6, "Add a unique text hash to prompts for import deduplication")
+def add_prompt_text_hash(conn: Connection, batch_size: int = 1000):
+    _add_columns(conn, "prompts", "text_hash")
+
+    # Only the oldest copy of a duplicated text gets the hash; later copies
+    # keep NULL, which the unique index allows, so nothing is deleted.
+    seen = set(conn.execute(
+        select(prompts.c.text_hash).where(prompts.c.text_hash.is_not(None))
+    ).scalars())
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(prompts.c.id, prompts.c.text)
+            .where(prompts.c.id > last_id, prompts.c.text_hash.is_(None))
+            .order_by(prompts.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            digest = text_hash(row.text)
+            if digest not in seen:
+                seen.add(digest)
+                updates.append({"prompt_id": row.id, "digest": digest})
+        if updates:
+            conn.execute(
+                prompts.update()
+                .where(prompts.c.id == bindparam("prompt_id"))
+                .values(text_hash=bindparam("digest")),
+                updates,
+            )
+        last_id = rows[-1].id
+
+    _create_indexes(conn, "prompts", "ux_prompts_text_hash")
+
+
+@migration(7, "Record per-run resource usage on run_events")
+def add_run_resource_usage(conn: Connection):
+    _add_columns(conn, "run_events", "wall_seconds", "cpu_user_seconds", "cpu_system_seconds", "max_rss_kb")
+
+
+@migration(8, "Add prompt_catalog_version for cross-process catalog invalidation")
+def add_prompt_catalog_version(conn: Connection):
+    _create_tables(conn, "prompt_catalog_version")
+    exists = conn.execute(select(prompt_catalog_version.c.id)).first()
+    if exists is None:
+        conn.execute(prompt_catalog_version.insert().values(id=1, version=0))
+
+
+@migration(9, "Index sessions by prompt text and by archive eligibility")
+def add_analytics_indexes(conn: Connection):
+    _create_indexes(conn, "sessions", "ix_sessions_prompt_text", "ix_sessions_archived_at_ended_at")
+
+
+def applied_versions(conn: Connection) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine: Engine) -> List[Migration]:
+    """Apply every pending migration in order. Returns the ones applied."""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for pending in MIGRATIONS:
+        if pending.version in done:
+            continue
+        with engine.begin() as conn:
+            pending.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=pending.version,
+                description=pending.description,
+                applied_at=datetime.utcnow(),
+            ))
+        applied.append(pending)
+    return applied
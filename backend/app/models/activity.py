@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table
+
+metadata = MetaData()
+
+session_activity = Table(
+    "session_activity",
+    metadata,
+    Column("session_id", Integer, ForeignKey("sessions.id"), primary_key=True),
+    Column("run_count", Integer, default=0, nullable=False),
+    Column("error_count", Integer, default=0, nullable=False),
+    Column("first_run_at", DateTime, nullable=True),
+    Column("last_run_at", DateTime, nullable=True),
+    Column("first_error_at", DateTime, nullable=True),
+    Column("runs_after_first_error", Integer, default=0, nullable=False),
+)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
 
 metadata = MetaData()
 
@@ -13,3 +13,12 @@ email_verification_tokens = Table(
     Column("expires_at", DateTime, nullable=False),
     Column("used", Boolean, default=False, nullable=False),
 )
+
+# Lookups only ever target unused tokens, so used ones stay out of the index.
+Index(
+    "ix_email_verification_tokens_unused",
+    email_verification_tokens.c.user_id,
+    email_verification_tokens.c.otp_code,
+    postgresql_where=email_verification_tokens.c.used == False,
+    sqlite_where=email_verification_tokens.c.used == False,
+)
@@ -1,6 +1,18 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table, Text
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
 
 metadata = MetaData()
 
@@ -10,6 +22,27 @@ run_events = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("session_id", Integer, ForeignKey("sessions.id"), nullable=False),
     Column("executed_at", DateTime, default=datetime.utcnow, nullable=False),
+    # Resource usage of the execution; NULL where it was not measured.
+    Column("wall_seconds", Float, nullable=True),
+    Column("cpu_user_seconds", Float, nullable=True),
+    Column("cpu_system_seconds", Float, nullable=True),
+    Column("max_rss_kb", Integer, nullable=True),
+    Index("ix_run_events_session_id_executed_at", "session_id", "executed_at"),
+)
+
+error_fingerprints = Table(
+    "error_fingerprints",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("digest", String(64), nullable=False, unique=True),
+    Column("exception_type", String, nullable=False),
+    Column("location", String, nullable=True),
+    Column("message", Text, nullable=False),
+    # References from live error_events rows, and from archive segments.
+    Column("occurrences", Integer, default=0, nullable=False),
+    Column("archived_occurrences", Integer, default=0, server_default="0", nullable=False),
+    Column("first_seen_at", DateTime, nullable=False),
+    Column("last_seen_at", DateTime, nullable=False),
 )
 
 error_events = Table(
@@ -17,6 +50,10 @@ error_events = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("run_id", Integer, ForeignKey("run_events.id"), nullable=False),
-    Column("error_message", Text, nullable=False),
+    Column("fingerprint_id", Integer, ForeignKey("error_fingerprints.id"), nullable=True),
+    Column("error_message", Text, nullable=True),
+    Column("error_message_compressed", LargeBinary, nullable=True),
     Column("occurred_at", DateTime, default=datetime.utcnow, nullable=False),
+    Index("ix_error_events_run_id", "run_id"),
+    Index("ix_error_events_fingerprint_id", "fingerprint_id"),
 )
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
 
 metadata = MetaData()
 
@@ -9,5 +9,16 @@ prompts = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("text", String, nullable=False),
+    Column("text_hash", String(64), nullable=True),
     Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Index("ux_prompts_text_hash", "text_hash", unique=True),
+)
+
+# One row whose version every writer of prompts bumps in the same
+# transaction, so other processes' catalog caches see the change.
+prompt_catalog_version = Table(
+    "prompt_catalog_version",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
 )
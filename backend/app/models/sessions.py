@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
 
 metadata = MetaData()
 
@@ -12,4 +12,11 @@ sessions = Table(
     Column("prompt_text", String, nullable=False),
     Column("started_at", DateTime, default=datetime.utcnow, nullable=False),
     Column("ended_at", DateTime, nullable=True),
+    Column("archived_at", DateTime, nullable=True),
+    Index("ix_sessions_user_id_started_at", "user_id", "started_at"),
+    Index("ix_sessions_started_at", "started_at"),
+    # Hash on PostgreSQL: equality is the only lookup, and btree entries
+    # are capped at about 2.7 kB while prompt texts are unbounded.
+    Index("ix_sessions_prompt_text", "prompt_text", postgresql_using="hash"),
+    Index("ix_sessions_archived_at_ended_at", "archived_at", "ended_at"),
 )
@@ -0,0 +1,156 @@
+"""
+Streaming bulk import of prompts.
+
+Prompts are read lazily from JSONL or CSV files, so memory stays bounded by
+one batch however large the file. Each batch is a single executemany of
+INSERT ... ON CONFLICT DO NOTHING RETURNING id against the unique
+prompts.text_hash index, which skips prompts whose text is already in the
+catalog (or earlier in the same file). SQLAlchemy's insertmanyvalues sends
+it as multi-row VALUES statements while compiling the statement only
+once, and the returned ids count what was actually inserted. Batches are
+committed in chunks, and every chunk that inserted rows bumps the catalog
+version so running servers reload their in-memory catalog.
+"""
+import csv
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+
+from app.catalog import bump_catalog_version
+from app.models.prompts import prompts
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+FORMATS = ("jsonl", "csv")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def prompt_row(text: str, created_at: Optional[datetime] = None) -> dict:
+    """Insert parameters for one prompt, including its dedup hash."""
+    return {
+        "text": text,
+        "text_hash": text_hash(text),
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def read_prompts(path: str, file_format: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield prompt texts from a file, one at a time.
+
+    JSONL lines are either JSON strings or objects with a "text" field. CSV
+    files use their "text" column when the header has one, otherwise the
+    first column of every row. Blank texts are skipped.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported prompt file format: {file_format or path}")
+
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "jsonl":
+            for line in source:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                text = record if isinstance(record, str) else record.get("text")
+                if text and text.strip():
+                    yield text.strip()
+            return
+
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            return
+        column = header.index("text") if "text" in header else 0
+        if "text" not in header and header and header[0].strip():
+            yield header[0].strip()
+        for row in reader:
+            if len(row) > column and row[column].strip():
+                yield row[column].strip()
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    inserted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.inserted
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def _batches(texts: Iterable[str], size: int) -> Iterator[list]:
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_prompts(
+    engine: Engine,
+    texts: Iterable[str],
+    batch_size: int = 1000,
+    batches_per_transaction: int = 20,
+    progress=None,
+) -> ImportResult:
+    """
+    Insert prompts in multi-row batches, committing every
+    batches_per_transaction batches. progress, when given, is called with
+    the running ImportResult after each commit.
+    """
+    dialect_insert = _DIALECT_INSERTS.get(engine.dialect.name)
+    if dialect_insert is None:
+        raise NotImplementedError(f"Prompt import is not supported on {engine.dialect.name}")
+
+    stmt = (
+        dialect_insert(prompts)
+        .on_conflict_do_nothing(index_elements=[prompts.c.text_hash])
+        .returning(prompts.c.id)
+    )
+
+    result = ImportResult()
+    started = time.perf_counter()
+    batches = _batches(texts, batch_size)
+
+    while True:
+        chunk = list(islice(batches, batches_per_transaction))
+        if not chunk:
+            break
+
+        with engine.begin() as conn:
+            inserted_before = result.inserted
+            for batch in chunk:
+                created_at = datetime.utcnow()
+                inserted = conn.execute(stmt, [prompt_row(text, created_at) for text in batch]).all()
+                result.inserted += len(inserted)
+                result.read += len(batch)
+            if result.inserted > inserted_before:
+                bump_catalog_version(conn)
+
+        result.seconds = time.perf_counter() - started
+        if progress is not None:
+            progress(result)
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.engine import Engine
+
+from app.analytics import load_cohort, summarize
+from app.config import settings
+from app.costs import prompt_costs, session_archived, session_costs
+from app.db import get_read_db, get_session_read_db
+from app.security.ownership import require_session_owner
+from app.security.tokens import get_current_user_id
+from app.schemas.analytics import CohortResponse, PromptCostsResponse, SessionCostsResponse
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+
+@router.get("/cohort", response_model=CohortResponse)
+def get_cohort_analytics(
+    prompt_text: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    bins: int = Query(20, ge=1, le=200),
+    engine: Engine = Depends(get_read_db),
+):
+    """
+    Summarize v1 signals across a cohort of sessions.
+    
+    The cohort is every session for a prompt and/or started in a time range.
+    Returns session, run and error totals, the share of sessions showing
+    each signal, and percentiles and histograms of run counts, error rates,
+    time to first run and session duration. Does NOT return per-session or
+    per-user values, rank sessions, or compare users.
+    """
+    if prompt_text is None and started_after is None and started_before is None:
+        raise HTTPException(status_code=400, detail="At least one cohort filter is required")
+    
+    with engine.connect() as conn:
+        events = load_cohort(conn, prompt_text, started_after, started_before, settings.archive_dir)
+    
+    return summarize(events, bins)
+
+
+@router.get("/costs/sessions/{session_id}", response_model=SessionCostsResponse)
+def get_session_costs(
+    session_id: int,
+    engine: Engine = Depends(get_session_read_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Summarize the execution cost of one of the user's sessions.
+    
+    Totals the wall and CPU time and reports the peak memory recorded on
+    the session's runs. Runs without recorded usage (cached results, older
+    runs) count towards runs but not measured_runs. The run events of an
+    archived session are gone from the live tables and the archive keeps no
+    usage, so its costs are all zero and archived is true. Does NOT break
+    costs down per run or read the archive.
+    """
+    require_session_owner(engine, session_id, user_id)
+    
+    with engine.connect() as conn:
+        costs = session_costs(conn, session_id)
+        archived = session_archived(conn, session_id)
+    
+    return SessionCostsResponse(session_id=session_id, archived=archived, costs=costs)
+
+
+@router.get("/costs/prompts", response_model=PromptCostsResponse)
+def get_prompt_costs(
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    engine: Engine = Depends(get_read_db),
+):
+    """
+    Rank prompts by the CPU time their sessions used.
+    
+    Aggregates the recorded usage of every session started in the optional
+    time range, grouped by prompt, most expensive first, to find the
+    programs that dominate execute capacity. Archived sessions have no run
+    events left and are not counted. Does NOT return per-session or
+    per-user values.
+    """
+    with engine.connect() as conn:
+        prompts = prompt_costs(conn, started_after, started_before, limit)
+    
+    return PromptCostsResponse(prompts=prompts)
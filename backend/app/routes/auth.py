@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import select, insert, update
-from datetime import datetime, timedelta
-import secrets
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from datetime import datetime
 import os
 
 from app.schemas.auth import (
@@ -12,140 +14,262 @@ from app.schemas.auth import (
     LoginRequest,
     LoginResponse
 )
-from app.security.auth import hash_password, verify_password, create_access_token
+from app.admission import admit_auth
+from app.security.auth import create_access_token
+from app.security.hashing import hash_password_async, needs_rehash, verify_password_async
+from app.security.otp import EXPIRED, INVALID, DatabaseOtpStore, get_otp_store
 from app.models.users import users
-from app.models.email_verification import email_verification_tokens
-from app.db import get_engine
 from app.config import settings
+from app.db import get_async_db, get_db, get_read_db
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(
+    prefix="/auth",
+    tags=["auth"],
+    dependencies=[Depends(admit_auth)],
+)
 
+# Serves the same routes in async mode (Settings.async_mode).
+async_router = APIRouter(
+    prefix="/auth",
+    tags=["auth"],
+    dependencies=[Depends(admit_auth)],
+)
 
-@router.post("/signup", response_model=SignupResponse)
-def signup(request: SignupRequest):
-    """
-    Create a new user account with email verification.
-    
-    Generates a 6-digit OTP with 15-minute expiration. In development mode,
-    the OTP is printed to console. Does NOT send emails. Does NOT validate
-    email domain or password strength beyond basic requirements.
-    """
-    engine = get_engine(settings.database_url)
-    
+# Used when the app runs without its lifespan (scripts, bare test clients).
+_fallback_otp_store = DatabaseOtpStore(get_db, ttl_seconds=settings.otp_ttl_seconds)
+
+
+def _otp_store():
+    return get_otp_store() or _fallback_otp_store
+
+
+def _user_by_email(email: str):
+    return select(users).where(users.c.email == email)
+
+
+def _insert_unverified_user(email: str, password_hash: str):
+    return insert(users).values(
+        email=email,
+        password_hash=password_hash,
+        is_verified=False,
+        created_at=datetime.utcnow()
+    ).returning(users.c.id)
+
+
+def _find_user(engine: Engine, email: str):
     with engine.connect() as conn:
-        existing = conn.execute(
-            select(users).where(users.c.email == request.email)
-        ).first()
-        
-        if existing:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        password_hash = hash_password(request.password)
-        
-        result = conn.execute(
-            insert(users).values(
-                email=request.email,
-                password_hash=password_hash,
-                is_verified=False,
-                created_at=datetime.utcnow()
-            ).returning(users.c.id)
-        )
+        return conn.execute(_user_by_email(email)).first()
+
+
+async def _find_user_async(engine: AsyncEngine, email: str):
+    async with engine.connect() as conn:
+        return (await conn.execute(_user_by_email(email))).first()
+
+
+def _create_unverified_user(engine: Engine, email: str, password_hash: str) -> str:
+    """Insert the user and issue its verification code; returns the OTP code."""
+    with engine.connect() as conn:
+        result = conn.execute(_insert_unverified_user(email, password_hash))
         user_id = result.fetchone()[0]
         
-        otp_code = ''.join([str(secrets.randbelow(10)) for _ in range(6)])
-        expires_at = datetime.utcnow() + timedelta(minutes=15)
+        otp_code = _otp_store().issue(user_id, conn)
         
+        conn.commit()
+    
+    return otp_code
+
+
+def _update_password_hash(engine: Engine, user_id: int, password_hash: str):
+    with engine.connect() as conn:
         conn.execute(
-            insert(email_verification_tokens).values(
-                user_id=user_id,
-                otp_code=otp_code,
-                expires_at=expires_at,
-                used=False
-            )
+            update(users).where(users.c.id == user_id).values(password_hash=password_hash)
         )
-        
         conn.commit()
-        
-        if os.getenv("ENV") == "development":
-            print(f"[DEV MODE] OTP for {request.email}: {otp_code}")
+
+
+def _signup_response(email: str, otp_code: str) -> SignupResponse:
+    if os.getenv("ENV") == "development":
+        print(f"[DEV MODE] OTP for {email}: {otp_code}")
     
     return SignupResponse(
-        email=request.email,
+        email=email,
         message="Signup successful. Check your email for verification code."
     )
 
 
+def _check_otp_status(status: str):
+    if status == INVALID:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+    
+    if status == EXPIRED:
+        raise HTTPException(status_code=400, detail="OTP expired")
+
+
+async def _check_credentials(user, password: str):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    if not user.is_verified:
+        raise HTTPException(status_code=403, detail="Email not verified")
+    
+    if not await verify_password_async(password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+
+@router.post("/signup", response_model=SignupResponse)
+async def signup(request: SignupRequest, engine: Engine = Depends(get_db)):
+    """
+    Create a new user account with email verification.
+    
+    Generates a 6-digit OTP, valid for otp_ttl_seconds (15 minutes by
+    default), in the configured OTP store. In development mode,
+    the OTP is printed to console. Does NOT send emails. Does NOT validate
+    email domain or password strength beyond basic requirements. Password
+    hashing runs on the dedicated bcrypt process pool.
+    """
+    existing = await run_in_threadpool(_find_user, engine, request.email)
+    
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    password_hash = await hash_password_async(request.password)
+    
+    otp_code = await run_in_threadpool(
+        _create_unverified_user, engine, request.email, password_hash
+    )
+    
+    return _signup_response(request.email, otp_code)
+
+
 @router.post("/verify-email", response_model=VerifyEmailResponse)
-def verify_email(request: VerifyEmailRequest):
+def verify_email(request: VerifyEmailRequest, engine: Engine = Depends(get_db)):
     """
     Verify user email using OTP code.
     
     Validates OTP exists, has not expired, and has not been used. Marks user
-    as verified. Does NOT allow re-verification or OTP regeneration.
+    as verified. Codes are checked against the configured OTP store. Does
+    NOT allow re-verification or OTP regeneration.
     """
-    engine = get_engine(settings.database_url)
-    
     with engine.connect() as conn:
-        user = conn.execute(
-            select(users).where(users.c.email == request.email)
-        ).first()
+        user = conn.execute(_user_by_email(request.email)).first()
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        token = conn.execute(
-            select(email_verification_tokens).where(
-                email_verification_tokens.c.user_id == user.id,
-                email_verification_tokens.c.otp_code == request.otp,
-                email_verification_tokens.c.used == False
-            )
-        ).first()
-        
-        if not token:
-            raise HTTPException(status_code=400, detail="Invalid OTP")
-        
-        if token.expires_at < datetime.utcnow():
-            raise HTTPException(status_code=400, detail="OTP expired")
+        _check_otp_status(_otp_store().consume(user.id, request.otp, conn))
         
         conn.execute(
             update(users).where(users.c.id == user.id).values(is_verified=True)
         )
         
-        conn.execute(
-            update(email_verification_tokens).where(
-                email_verification_tokens.c.id == token.id
-            ).values(used=True)
-        )
-        
         conn.commit()
     
     return VerifyEmailResponse(message="Email verified successfully")
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest):
+async def login(
+    request: LoginRequest,
+    engine: Engine = Depends(get_db),
+    read_engine: Engine = Depends(get_read_db),
+):
     """
     Authenticate user and return JWT access token.
     
-    Requires verified email. Returns 24-hour JWT token. Does NOT implement
-    refresh tokens, session storage, or device tracking.
+    Requires verified email. Returns 24-hour JWT token. Re-hashes the
+    password when the stored bcrypt cost differs from the configured one.
+    The user lookup reads from a replica when one is configured, falling
+    back to the primary for unknown or unverified users.
+    Does NOT implement refresh tokens, session storage, or device tracking.
     """
-    engine = get_engine(settings.database_url)
+    user = await run_in_threadpool(_find_user, read_engine, request.email)
     
-    with engine.connect() as conn:
-        user = conn.execute(
-            select(users).where(users.c.email == request.email)
-        ).first()
+    if (not user or not user.is_verified) and read_engine is not engine:
+        # The replica may not have caught up with a recent signup or verification.
+        user = await run_in_threadpool(_find_user, engine, request.email)
+    
+    await _check_credentials(user, request.password)
+    
+    if needs_rehash(user.password_hash):
+        password_hash = await hash_password_async(request.password)
+        await run_in_threadpool(_update_password_hash, engine, user.id, password_hash)
+    
+    access_token = create_access_token(user.id)
+    
+    return LoginResponse(access_token=access_token, token_type="bearer")
+
+
+@async_router.post("/signup", response_model=SignupResponse)
+async def signup_async(request: SignupRequest, engine: AsyncEngine = Depends(get_async_db)):
+    """
+    Create a new user account with email verification, on the asyncio engine.
+    
+    Same behaviour as the sync handler. The OTP store is called through
+    run_sync on the same connection, so a database code still commits
+    together with the user row.
+    """
+    existing = await _find_user_async(engine, request.email)
+    
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    password_hash = await hash_password_async(request.password)
+    
+    async with engine.connect() as conn:
+        user_id = (await conn.execute(_insert_unverified_user(request.email, password_hash))).scalar()
+        
+        otp_code = await conn.run_sync(lambda sync_conn: _otp_store().issue(user_id, sync_conn))
+        
+        await conn.commit()
+    
+    return _signup_response(request.email, otp_code)
+
+
+@async_router.post("/verify-email", response_model=VerifyEmailResponse)
+async def verify_email_async(request: VerifyEmailRequest, engine: AsyncEngine = Depends(get_async_db)):
+    """
+    Verify user email using OTP code, on the asyncio engine.
+    
+    Same behaviour as the sync handler.
+    """
+    async with engine.connect() as conn:
+        user = (await conn.execute(_user_by_email(request.email))).first()
         
         if not user:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
+            raise HTTPException(status_code=404, detail="User not found")
         
-        if not user.is_verified:
-            raise HTTPException(status_code=403, detail="Email not verified")
+        _check_otp_status(await conn.run_sync(
+            lambda sync_conn: _otp_store().consume(user.id, request.otp, sync_conn)
+        ))
         
-        if not verify_password(request.password, user.password_hash):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
+        await conn.execute(
+            update(users).where(users.c.id == user.id).values(is_verified=True)
+        )
         
-        access_token = create_access_token(user.id)
+        await conn.commit()
+    
+    return VerifyEmailResponse(message="Email verified successfully")
+
+
+@async_router.post("/login", response_model=LoginResponse)
+async def login_async(request: LoginRequest, engine: AsyncEngine = Depends(get_async_db)):
+    """
+    Authenticate user and return JWT access token, on the asyncio engine.
+    
+    Same behaviour as the sync handler, but the user lookup always reads
+    the primary.
+    """
+    user = await _find_user_async(engine, request.email)
+    
+    await _check_credentials(user, request.password)
+    
+    if needs_rehash(user.password_hash):
+        password_hash = await hash_password_async(request.password)
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(users).where(users.c.id == user.id).values(password_hash=password_hash)
+            )
+    
+    access_token = create_access_token(user.id)
     
     return LoginResponse(access_token=access_token, token_type="bearer")
@@ -1,67 +1,286 @@
-import subprocess
-from datetime import datetime
+import asyncio
+import json
+import time
 
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import insert
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from app.admission import admit_execution
 from app.config import settings
-from app.db import get_engine
-from app.models.events import error_events, run_events
-from app.schemas.events import ExecuteRequest, ExecuteResponse
+from app.db import get_async_db, get_db
+from app.execution.batch import run_batch
+from app.execution.cache import run_code_cached, run_code_cached_async
+from app.execution.jobs import COMPLETED, FAILED, Job, QueueFullError, get_job_queue
+from app.execution.recording import record_batch, record_run, record_run_async
+from app.execution.streaming import STDERR, stream_subprocess
+from app.schemas.events import (
+    BatchCaseResult,
+    ExecuteBatchRequest,
+    ExecuteBatchResponse,
+    ExecuteJobResponse,
+    ExecuteRequest,
+    ExecuteResponse,
+)
+from app.security.ownership import require_session_owner, require_session_owner_async
+from app.security.tokens import get_current_user_id
 
-router = APIRouter(prefix="/execute", tags=["execute"])
+router = APIRouter(
+    prefix="/execute",
+    tags=["execute"],
+    dependencies=[Depends(get_current_user_id)],
+)
 
+# Serves POST /execute in async mode (Settings.async_mode); the other
+# execute routes are shared with router, see the end of this module.
+async_router = APIRouter(
+    prefix="/execute",
+    tags=["execute"],
+    dependencies=[Depends(get_current_user_id)],
+)
 
-@router.post("", response_model=ExecuteResponse)
-def execute_code(request: ExecuteRequest):
+
+def _execute_response(stdout: str, stderr: str) -> ExecuteResponse:
+    if stderr:
+        return ExecuteResponse(output=stderr, error=True)
+    else:
+        return ExecuteResponse(output=stdout, error=False)
+
+
+def execute_and_record(engine: Engine, session_id: int, code: str, bypass_cache: bool = False) -> ExecuteResponse:
+    result = run_code_cached(code, bypass_cache)
+    
+    record_run(engine, session_id, result.stderr, result.usage)
+    
+    return _execute_response(result.stdout, result.stderr)
+
+
+def run_queued_job(job: Job) -> ExecuteResponse:
+    return execute_and_record(get_db(), job.session_id, job.code, job.bypass_cache)
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_and_record(engine: Engine, session_id: int, code: str):
+    stderr_chunks = []
+    usage = []
+    chunks = stream_subprocess(code, settings.execute_stream_max_output_bytes, on_exit=usage.append)
+    try:
+        for stream, text in chunks:
+            if stream == STDERR:
+                stderr_chunks.append(text)
+            yield _sse(stream, {"text": text})
+    finally:
+        # Closing reaps the process first, so its usage is recorded too.
+        chunks.close()
+        stderr = "".join(stderr_chunks)
+        record_run(engine, session_id, stderr, usage[0] if usage else None)
+    
+    yield _sse("exit", {"error": bool(stderr)})
+
+
+def _job_response(job: Job) -> ExecuteJobResponse:
+    response = ExecuteJobResponse(job_id=job.id, status=job.status)
+    if job.status == COMPLETED:
+        response.result = job.future.result()
+    elif job.status == FAILED:
+        response.detail = str(job.future.exception())
+    return response
+
+
+def _require_job_queue():
+    queue = get_job_queue()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Queued execution is disabled")
+    return queue
+
+
+@router.post("", response_model=ExecuteResponse, dependencies=[Depends(admit_execution)])
+def execute_code(
+    request: ExecuteRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
     """
     Execute Python code and capture run/error events.
     
-    Runs code via subprocess with 2-second timeout. Always creates a RunEvent.
-    Creates ErrorEvent if stderr is non-empty. Does NOT grade correctness,
-    sandbox filesystem access, or validate code quality.
+    Runs code on a warm pooled interpreter (or a fresh subprocess when the
+    pool is disabled) with 2-second timeout. When the result cache is
+    enabled, deterministic code that already ran returns the stored output
+    unless bypass_cache is set. Always creates a RunEvent, cached or not.
+    Creates ErrorEvent if stderr is non-empty. With admission control
+    enabled, excess requests get 429 or 503 with Retry-After. Does NOT
+    grade correctness, sandbox filesystem access, or validate code quality.
     """
-    engine = get_engine(settings.database_url)
+    require_session_owner(engine, request.session_id, user_id)
     
-    try:
-        result = subprocess.run(
-            ["python", "-c", request.code],
-            capture_output=True,
-            text=True,
-            timeout=2
-        )
-        
-        stdout = result.stdout
-        stderr = result.stderr
-        
-    except subprocess.TimeoutExpired:
-        stderr = "Execution timed out after 2 seconds"
-        stdout = ""
-    except Exception as e:
-        stderr = str(e)
-        stdout = ""
-    
-    with engine.connect() as conn:
-        run_result = conn.execute(
-            insert(run_events).values(
-                session_id=request.session_id,
-                executed_at=datetime.utcnow()
-            ).returning(run_events.c.id)
+    return execute_and_record(engine, request.session_id, request.code, request.bypass_cache)
+
+
+@async_router.post("", response_model=ExecuteResponse, dependencies=[Depends(admit_execution)])
+async def execute_code_async(
+    request: ExecuteRequest,
+    engine: AsyncEngine = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Execute Python code and capture run/error events, on the event loop.
+    
+    Same behaviour as the sync handler, except that code always runs in a
+    fresh subprocess started with asyncio.create_subprocess_exec, so a
+    request waiting on its program holds no thread; the interpreter pool is
+    not used. Events are recorded on the asyncio engine.
+    """
+    await require_session_owner_async(engine, request.session_id, user_id)
+    
+    result = await run_code_cached_async(request.code, request.bypass_cache)
+    
+    await record_run_async(engine, request.session_id, result.stderr, result.usage)
+    
+    return _execute_response(result.stdout, result.stderr)
+
+
+@router.post("/stream", dependencies=[Depends(admit_execution)])
+def stream_execution(
+    request: ExecuteRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Execute Python code and stream its output as Server-Sent Events.
+    
+    Emits `stdout` and `stderr` events with {"text": ...} as the program
+    writes, then one `exit` event with {"error": ...}. Output beyond
+    EXECUTE_STREAM_MAX_OUTPUT_BYTES kills the program. Run/error events are
+    recorded once it ends, exactly as for POST /execute, including when the
+    client disconnects early. Does NOT use the result cache or the
+    interpreter pool.
+    """
+    require_session_owner(engine, request.session_id, user_id)
+    
+    return StreamingResponse(
+        stream_and_record(engine, request.session_id, request.code),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch", response_model=ExecuteBatchResponse, dependencies=[Depends(admit_execution)])
+def execute_batch(
+    request: ExecuteBatchRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Execute one program against a list of test cases in a single interpreter.
+    
+    Each case runs the program with its own stdin and fresh module state;
+    when function is set, that function is then called with the case's args
+    and the repr of its return value is returned. Cases are limited to
+    EXECUTE_BATCH_CASE_TIMEOUT seconds each and EXECUTE_BATCH_TIMEOUT in
+    total; cases past the total budget are skipped. Records the batch as
+    one RunEvent with an ErrorEvent per failing case, in one transaction.
+    Does NOT compare outputs against expected values or use the result cache.
+    """
+    if not request.cases or len(request.cases) > settings.execute_batch_max_cases:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch needs between 1 and {settings.execute_batch_max_cases} cases",
         )
-        run_id = run_result.fetchone()[0]
-        
-        if stderr:
-            conn.execute(
-                insert(error_events).values(
-                    run_id=run_id,
-                    error_message=stderr,
-                    occurred_at=datetime.utcnow()
-                )
+    
+    require_session_owner(engine, request.session_id, user_id)
+    
+    started = time.perf_counter()
+    batch = run_batch(
+        request.code,
+        [case.model_dump() for case in request.cases],
+        request.function,
+        settings.execute_batch_case_timeout,
+        settings.execute_batch_timeout,
+    )
+    seconds = time.perf_counter() - started
+    results = batch.cases
+    
+    run_id = record_batch(
+        engine,
+        request.session_id,
+        [result.stderr for result in results if result.stderr],
+        batch.usage,
+    )
+    
+    return ExecuteBatchResponse(
+        run_id=run_id,
+        error=any(result.stderr for result in results),
+        seconds=seconds,
+        cases=[
+            BatchCaseResult(
+                stdout=result.stdout,
+                stderr=result.stderr,
+                error=bool(result.stderr),
+                timed_out=result.timed_out,
+                seconds=result.seconds,
+                return_value=result.return_value,
             )
-        
-        conn.commit()
+            for result in results
+        ],
+    )
+
+
+@router.post("/jobs", response_model=ExecuteJobResponse, status_code=202, dependencies=[Depends(admit_execution)])
+def submit_execution_job(
+    request: ExecuteRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Queue Python code for execution and return a job id immediately.
     
-    if stderr:
-        return ExecuteResponse(output=stderr, error=True)
-    else:
-        return ExecuteResponse(output=stdout, error=False)
+    Jobs are drained with per-user fairness and a bounded number in flight.
+    Run/error events are recorded exactly as for POST /execute once the job
+    runs. Does NOT persist queued jobs across server restarts.
+    """
+    queue = _require_job_queue()
+    
+    require_session_owner(engine, request.session_id, user_id)
+    
+    try:
+        job = queue.submit(user_id, request.session_id, request.code, request.bypass_cache)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ExecuteJobResponse)
+async def get_execution_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Fetch the status and result of a queued execution.
+    
+    With wait > 0 the request long-polls for up to that many seconds until
+    the job finishes. Results are retained for a limited time after the job
+    finishes.
+    """
+    queue = _require_job_queue()
+    job = queue.get(job_id)
+    
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if wait and not job.future.done():
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout=wait)
+        except Exception:
+            pass
+    
+    return _job_response(job)
+
+
+# Streaming, batch and queued execution keep their sync handlers in async mode.
+async_router.routes.extend(route for route in router.routes if route.path != router.prefix)
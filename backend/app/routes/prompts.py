@@ -1,33 +1,59 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from app.catalog import PromptCatalog, random_prompt_from_db_async
 from app.config import settings
-from app.db import get_engine
-from app.models.prompts import prompts
+from app.db import get_async_db, get_read_db
 from app.schemas.prompts import PromptResponse
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
+# Serves the same routes in async mode (Settings.async_mode).
+async_router = APIRouter(prefix="/prompts", tags=["prompts"])
+
+prompt_catalog = PromptCatalog(ttl_seconds=settings.prompt_cache_ttl)
+
 
 @router.get("/random", response_model=PromptResponse)
-def get_random_prompt():
+def get_random_prompt(engine: Engine = Depends(get_read_db)):
     """
     Fetch a random coding prompt from the catalog.
     
     Returns a single neutral question to start a session. Does NOT filter by
-    difficulty, personalize to user, or track prompt history.
+    difficulty, personalize to user, or track prompt history. Served from the
+    in-memory prompt catalog, which may lag new imports by up to the cache
+    TTL. Refreshes read from a replica when one is configured.
+    """
+    result = prompt_catalog.pick(engine)
+    
+    return _prompt_response(result)
+
+
+@async_router.get("/random", response_model=PromptResponse)
+async def get_random_prompt_async(engine: AsyncEngine = Depends(get_async_db)):
     """
-    engine = get_engine(settings.database_url)
+    Fetch a random coding prompt from the catalog, on the event loop.
+    
+    Same behaviour as the sync handler. Catalog refreshes still run on a
+    background thread; while the catalog is cold, the fallback seek uses
+    the asyncio engine.
+    """
+    loaded, result = prompt_catalog.pick_cached(get_read_db())
+    
+    if not loaded:
+        result = await random_prompt_from_db_async(engine)
+    
+    return _prompt_response(result)
+
+
+def _prompt_response(result) -> PromptResponse:
+    if not result:
+        raise HTTPException(status_code=404, detail="No prompts available")
     
-    with engine.connect() as conn:
-        result = conn.execute(
-            select(prompts).order_by(func.random()).limit(1)
-        ).first()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="No prompts available")
+    prompt_id, text = result
     
     return PromptResponse(
-        id=result.id,
-        text=result.text
+        id=prompt_id,
+        text=text
     )
@@ -1,10 +1,12 @@
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
-from app.config import settings
-from app.db import get_engine
+from app.db import get_async_db, get_db, mark_session_written
+from app.security.tokens import get_current_user_id
 from app.models.sessions import sessions
 from app.schemas.sessions import (
     EndSessionRequest,
@@ -13,31 +15,66 @@ from app.schemas.sessions import (
     StartSessionResponse,
 )
 
-router = APIRouter(prefix="/sessions", tags=["sessions"])
+router = APIRouter(
+    prefix="/sessions",
+    tags=["sessions"],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+# Serves the same routes in async mode (Settings.async_mode).
+async_router = APIRouter(
+    prefix="/sessions",
+    tags=["sessions"],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+
+def _check_start(request: StartSessionRequest, user_id: int):
+    if request.user_id is not None and request.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Cannot start a session for another user")
+
+
+def _insert_session(request: StartSessionRequest, user_id: int):
+    return insert(sessions).values(
+        user_id=user_id,
+        prompt_text=request.prompt_text,
+        started_at=datetime.utcnow(),
+        ended_at=None
+    ).returning(sessions.c.id, sessions.c.started_at)
+
+
+def _check_end(existing, user_id: int):
+    if not existing:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if existing.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Session belongs to another user")
+    
+    if existing.ended_at is not None:
+        raise HTTPException(status_code=400, detail="Session already ended")
 
 
 @router.post("/start", response_model=StartSessionResponse)
-def start_session(request: StartSessionRequest):
+def start_session(
+    request: StartSessionRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
     """
     Start a new coding session tied to a prompt.
     
-    Each session is bound to exactly one prompt question. Does NOT validate
-    user_id, check for existing open sessions, or auto-close previous sessions.
+    Each session is bound to exactly one prompt question and owned by the
+    authenticated user; a user_id in the body must match the token. Does NOT
+    check for existing open sessions or auto-close previous sessions.
     """
-    engine = get_engine(settings.database_url)
+    _check_start(request, user_id)
     
     with engine.connect() as conn:
-        result = conn.execute(
-            insert(sessions).values(
-                user_id=request.user_id,
-                prompt_text=request.prompt_text,
-                started_at=datetime.utcnow(),
-                ended_at=None
-            ).returning(sessions.c.id, sessions.c.started_at)
-        )
-        row = result.fetchone()
+        row = conn.execute(_insert_session(request, user_id)).fetchone()
         conn.commit()
     
+    mark_session_written(row[0])
+    
     return StartSessionResponse(
         session_id=row[0],
         started_at=row[1]
@@ -45,25 +82,23 @@ def start_session(request: StartSessionRequest):
 
 
 @router.post("/end", response_model=EndSessionResponse)
-def end_session(request: EndSessionRequest):
+def end_session(
+    request: EndSessionRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
     """
     End an active coding session.
     
     Sets ended_at timestamp. Prevents double-ending. Does NOT compute session
     duration, analyze activity, or generate summaries.
     """
-    engine = get_engine(settings.database_url)
-    
     with engine.connect() as conn:
         existing = conn.execute(
             select(sessions).where(sessions.c.id == request.session_id)
         ).first()
         
-        if not existing:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        if existing.ended_at is not None:
-            raise HTTPException(status_code=400, detail="Session already ended")
+        _check_end(existing, user_id)
         
         ended_at = datetime.utcnow()
         
@@ -75,6 +110,70 @@ def end_session(request: EndSessionRequest):
         
         conn.commit()
     
+    mark_session_written(request.session_id)
+    
+    return EndSessionResponse(
+        session_id=request.session_id,
+        ended_at=ended_at
+    )
+
+
+
+@async_router.post("/start", response_model=StartSessionResponse)
+async def start_session_async(
+    request: StartSessionRequest,
+    engine: AsyncEngine = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Start a new coding session tied to a prompt, on the asyncio engine.
+    
+    Same behaviour as the sync handler.
+    """
+    _check_start(request, user_id)
+    
+    async with engine.connect() as conn:
+        row = (await conn.execute(_insert_session(request, user_id))).fetchone()
+        await conn.commit()
+    
+    mark_session_written(row[0])
+    
+    return StartSessionResponse(
+        session_id=row[0],
+        started_at=row[1]
+    )
+
+
+@async_router.post("/end", response_model=EndSessionResponse)
+async def end_session_async(
+    request: EndSessionRequest,
+    engine: AsyncEngine = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    End an active coding session, on the asyncio engine.
+    
+    Same behaviour as the sync handler.
+    """
+    async with engine.connect() as conn:
+        existing = (await conn.execute(
+            select(sessions).where(sessions.c.id == request.session_id)
+        )).first()
+        
+        _check_end(existing, user_id)
+        
+        ended_at = datetime.utcnow()
+        
+        await conn.execute(
+            update(sessions).where(sessions.c.id == request.session_id).values(
+                ended_at=ended_at
+            )
+        )
+        
+        await conn.commit()
+    
+    mark_session_written(request.session_id)
+    
     return EndSessionResponse(
         session_id=request.session_id,
         ended_at=ended_at
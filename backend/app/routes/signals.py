@@ -1,110 +1,165 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
-from app.config import settings
-from app.db import get_engine
-from app.models.events import error_events, run_events
+from app.db import get_async_db, get_db, get_session_read_db
+from app.security.tokens import get_current_user_id
 from app.models.sessions import sessions
-from app.schemas.signals import Signal, SignalsResponse
+from app.schemas.signals import (
+    BulkSignalsRequest,
+    BulkSignalsResponse,
+    SignalsResponse,
+)
+from app.signal_engine import build_signals, signals_query
 
-router = APIRouter(prefix="/sessions", tags=["signals"])
+router = APIRouter(
+    prefix="/sessions",
+    tags=["signals"],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+# Serves the same routes in async mode (Settings.async_mode).
+async_router = APIRouter(
+    prefix="/sessions",
+    tags=["signals"],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+MAX_BULK_SESSIONS = 1000
+
+
+def _check_owner(session, user_id: int):
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if session.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Session belongs to another user")
+
+
+def _bulk_query(request: BulkSignalsRequest, user_id: int):
+    if (
+        request.session_ids is None
+        and request.user_id is None
+        and request.started_after is None
+        and request.started_before is None
+    ):
+        raise HTTPException(status_code=400, detail="At least one session filter is required")
+    
+    if request.user_id is not None and request.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Cannot read another user's sessions")
+    
+    query = signals_query().where(sessions.c.user_id == user_id)
+    
+    if request.session_ids is not None:
+        query = query.where(sessions.c.id.in_(request.session_ids))
+    if request.started_after is not None:
+        query = query.where(sessions.c.started_at >= request.started_after)
+    if request.started_before is not None:
+        query = query.where(sessions.c.started_at < request.started_before)
+    
+    return query.order_by(sessions.c.started_at, sessions.c.id).limit(MAX_BULK_SESSIONS)
+
+
+def _bulk_response(rows) -> BulkSignalsResponse:
+    return BulkSignalsResponse(sessions=[
+        SignalsResponse(session_id=row.id, signals=build_signals(row))
+        for row in rows
+    ])
 
 
 @router.get("/{session_id}/signals", response_model=SignalsResponse)
-def get_session_signals(session_id: int):
+def get_session_signals(
+    session_id: int,
+    engine: Engine = Depends(get_session_read_db),
+    user_id: int = Depends(get_current_user_id),
+):
     """
     Compute v1 signals for a single session.
     
     Signals are descriptive summaries of observable activity. They describe
-    what happened, not quality or ability. Computed on-demand from run_events,
-    error_events, and session data. Does NOT store signals, compare across
+    what happened, not quality or ability. Every registered signal is
+    computed on-demand by one query over session data and the session's
+    activity record, which is maintained as run_events and error_events
+    are recorded, or from the event archive once the session has been
+    archived. Read from a replica when one is configured, unless the
+    session was just written. Does NOT store signals, compare across
     sessions, or infer intent.
     """
-    engine = get_engine(settings.database_url)
-    
     with engine.connect() as conn:
         session = conn.execute(
-            select(sessions).where(sessions.c.id == session_id)
+            signals_query().where(sessions.c.id == session_id)
         ).first()
         
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        runs = conn.execute(
-            select(run_events).where(run_events.c.session_id == session_id)
-            .order_by(run_events.c.executed_at)
-        ).fetchall()
-        
-        errors = conn.execute(
-            select(error_events)
-            .join(run_events, error_events.c.run_id == run_events.c.id)
-            .where(run_events.c.session_id == session_id)
-            .order_by(error_events.c.occurred_at)
-        ).fetchall()
-    
-    signals = []
-    
-    run_count = len(runs)
-    
-    if run_count == 1:
-        signals.append(Signal(
-            key="run_count",
-            value=run_count,
-            description="You ran your code once during this session."
-        ))
-    elif run_count > 1:
-        signals.append(Signal(
-            key="run_count",
-            value=run_count,
-            description="You ran your code multiple times during this session."
-        ))
-    
-    if run_count > 1:
-        signals.append(Signal(
-            key="repeated_execution",
-            value=True,
-            description="The code was executed more than once during this session."
-        ))
-    
-    if len(errors) > 0:
-        signals.append(Signal(
-            key="errors_present",
-            value=True,
-            description="Errors occurred during this session."
-        ))
-        
-        first_error_time = errors[0].occurred_at
-        runs_after_error = [r for r in runs if r.executed_at > first_error_time]
-        
-        if len(runs_after_error) > 0:
-            signals.append(Signal(
-                key="error_followed_by_run",
-                value=True,
-                description="After an error occurred, the code was run again."
-            ))
-    
-    if session.ended_at is not None:
-        duration_seconds = (session.ended_at - session.started_at).total_seconds()
-        duration_minutes = round(duration_seconds / 60)
-        
-        signals.append(Signal(
-            key="session_duration_minutes",
-            value=duration_minutes,
-            description=f"This session lasted {duration_minutes} minutes."
-        ))
-    
-    if run_count > 0:
-        first_run_time = runs[0].executed_at
-        time_to_first_seconds = (first_run_time - session.started_at).total_seconds()
-        time_to_first_minutes = round(time_to_first_seconds / 60)
-        
-        signals.append(Signal(
-            key="time_to_first_run_minutes",
-            value=time_to_first_minutes,
-            description=f"The first code execution occurred after {time_to_first_minutes} minutes."
-        ))
+        _check_owner(session, user_id)
     
     return SignalsResponse(
         session_id=session_id,
-        signals=signals
+        signals=build_signals(session)
     )
+
+
+@router.post("/signals/bulk", response_model=BulkSignalsResponse)
+def get_bulk_signals(
+    request: BulkSignalsRequest,
+    engine: Engine = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Compute v1 signals for many sessions with a single query.
+    
+    Selects the authenticated user's sessions by explicit ids and/or
+    start-time range, up to 1000 sessions ordered by start time. Each entry
+    has the same shape and meaning as the single-session endpoint. Unknown
+    or other users' session ids are omitted. Does NOT compare or rank
+    sessions.
+    """
+    query = _bulk_query(request, user_id)
+    
+    with engine.connect() as conn:
+        rows = conn.execute(query).fetchall()
+    
+    return _bulk_response(rows)
+
+
+@async_router.get("/{session_id}/signals", response_model=SignalsResponse)
+async def get_session_signals_async(
+    session_id: int,
+    engine: AsyncEngine = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Compute v1 signals for a single session, on the asyncio engine.
+    
+    Same behaviour as the sync handler, but always reads the primary.
+    """
+    async with engine.connect() as conn:
+        session = (await conn.execute(
+            signals_query().where(sessions.c.id == session_id)
+        )).first()
+    
+    _check_owner(session, user_id)
+    
+    return SignalsResponse(
+        session_id=session_id,
+        signals=build_signals(session)
+    )
+
+
+@async_router.post("/signals/bulk", response_model=BulkSignalsResponse)
+async def get_bulk_signals_async(
+    request: BulkSignalsRequest,
+    engine: AsyncEngine = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Compute v1 signals for many sessions with a single query, on the
+    asyncio engine.
+    
+    Same behaviour as the sync handler.
+    """
+    query = _bulk_query(request, user_id)
+    
+    async with engine.connect() as conn:
+        rows = (await conn.execute(query)).fetchall()
+    
+    return _bulk_response(rows)
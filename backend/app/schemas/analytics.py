@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+class Histogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+class Distribution(BaseModel):
+    count: int
+    mean: Optional[float]
+    percentiles: Dict[str, float]
+    histogram: Histogram
+
+class CohortResponse(BaseModel):
+    sessions: int
+    runs: int
+    errors: int
+    error_rate: Optional[float]
+    shares: Dict[str, Optional[float]]
+    distributions: Dict[str, Distribution]
+
+class CostSummary(BaseModel):
+    runs: int
+    measured_runs: int
+    wall_seconds: float
+    cpu_seconds: float
+    max_cpu_seconds: Optional[float]
+    max_rss_kb: Optional[int]
+
+class SessionCostsResponse(BaseModel):
+    session_id: int
+    archived: bool
+    costs: CostSummary
+
+class PromptCost(BaseModel):
+    prompt_text: str
+    sessions: int
+    costs: CostSummary
+
+class PromptCostsResponse(BaseModel):
+    prompts: List[PromptCost]
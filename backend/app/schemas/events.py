@@ -1,11 +1,49 @@
+from typing import Any, List, Optional
+
 from pydantic import BaseModel
 
 
 class ExecuteRequest(BaseModel):
     session_id: int
     code: str
+    bypass_cache: bool = False
 
 
 class ExecuteResponse(BaseModel):
     output: str
     error: bool
+
+
+class ExecuteJobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[ExecuteResponse] = None
+    detail: Optional[str] = None
+
+
+class BatchCase(BaseModel):
+    stdin: str = ""
+    args: List[Any] = []
+
+
+class ExecuteBatchRequest(BaseModel):
+    session_id: int
+    code: str
+    function: Optional[str] = None
+    cases: List[BatchCase]
+
+
+class BatchCaseResult(BaseModel):
+    stdout: str
+    stderr: str
+    error: bool
+    timed_out: bool
+    seconds: float
+    return_value: Optional[str] = None
+
+
+class ExecuteBatchResponse(BaseModel):
+    run_id: int
+    error: bool
+    seconds: float
+    cases: List[BatchCaseResult]
@@ -1,10 +1,12 @@
 from datetime import datetime
 
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class StartSessionRequest(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     prompt_text: str
 
 
@@ -1,6 +1,7 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class Signal(BaseModel):
     key: str
@@ -9,4 +10,13 @@ class Signal(BaseModel):
 
 class SignalsResponse(BaseModel):
     session_id: int
-    signals: List[Signal]
\ No newline at end of file
+    signals: List[Signal]
+
+class BulkSignalsRequest(BaseModel):
+    session_ids: Optional[List[int]] = Field(default=None, max_length=1000)
+    user_id: Optional[int] = None
+    started_after: Optional[datetime] = None
+    started_before: Optional[datetime] = None
+
+class BulkSignalsResponse(BaseModel):
+    sessions: List[SignalsResponse]
@@ -4,8 +4,8 @@ from jose import jwt
 from app.config import settings
 
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+def hash_password(password: str, rounds: int = 12) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -14,6 +14,11 @@ def verify_password(password: str, password_hash: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
 
+def password_hash_rounds(password_hash: str) -> int:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    return int(password_hash.split('$')[2])
+
+
 def create_access_token(user_id: int) -> str:
     expire = datetime.utcnow() + timedelta(hours=24)
     payload = {
@@ -22,3 +27,8 @@ def create_access_token(user_id: int) -> str:
     }
     token = jwt.encode(payload, settings.secret_key, algorithm="HS256")
     return token
+
+
+def decode_access_token(token: str) -> dict:
+    """Verify signature and expiry; raises jose.JWTError when either fails."""
+    return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
@@ -0,0 +1,50 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import settings
+from app.metrics import password_hash_duration, span
+from app.security.auth import hash_password, password_hash_rounds, verify_password
+
+_executor = None
+
+
+def start_password_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Start the dedicated process pool for bcrypt work.
+
+    Uses the spawn start method so workers never inherit locks held by the
+    server's other threads at fork time.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def stop_password_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash with the configured bcrypt cost off the event loop and request threadpool."""
+    loop = asyncio.get_running_loop()
+    with span(password_hash_duration, "hash"):
+        return await loop.run_in_executor(_executor, hash_password, password, settings.bcrypt_rounds)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    with span(password_hash_duration, "verify"):
+        return await loop.run_in_executor(_executor, verify_password, password, password_hash)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash was made with a different cost than configured."""
+    return password_hash_rounds(password_hash) != settings.bcrypt_rounds
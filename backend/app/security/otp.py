@@ -0,0 +1,283 @@
+"""
+Pluggable stores for email verification codes.
+
+Both stores expose issue(user_id, conn), consume(user_id, code, conn),
+sweep() and stats(). conn is the caller's open connection; the database
+store issues and consumes codes on it so they commit together with the
+user row, the memory store ignores it.
+
+MemoryOtpStore keeps codes in process and suits single-node deployments
+only: codes are lost on restart and are not shared between workers.
+DatabaseOtpStore keeps them in email_verification_tokens, shared by every
+node. A background sweeper purges expired and used codes from either.
+"""
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.email_verification import email_verification_tokens
+
+MEMORY = "memory"
+DATABASE = "database"
+
+VALID = "valid"
+INVALID = "invalid"
+EXPIRED = "expired"
+
+
+def generate_otp() -> str:
+    return ''.join([str(secrets.randbelow(10)) for _ in range(6)])
+
+
+class MemoryOtpStore:
+    """
+    In-process codes with a TTL, at most one per user.
+
+    Entries are bounded by max_entries; issuing past the bound evicts the
+    oldest code, which with a single TTL is also the one closest to
+    expiry. Expiry uses a hashed time wheel of tick_seconds slots covering
+    one TTL, so a sweep only visits the slots whose time has passed rather
+    than every entry. Expired codes still answer EXPIRED until swept.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, tick_seconds: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.tick_seconds = tick_seconds
+
+        self._entries = OrderedDict()
+        self._wheel = [set() for _ in range(math.ceil(ttl_seconds / tick_seconds) + 2)]
+        self._swept_tick = self._tick(time.monotonic())
+        self._lock = threading.Lock()
+
+        self.issued = 0
+        self.verified = 0
+        self.evicted = 0
+        self.swept = 0
+
+    def _tick(self, moment: float) -> int:
+        return math.floor(moment / self.tick_seconds)
+
+    def _remove(self, user_id: int):
+        _, _, tick = self._entries.pop(user_id)
+        self._wheel[tick % len(self._wheel)].discard(user_id)
+
+    def issue(self, user_id: int, conn: Optional[Connection] = None) -> str:
+        code = generate_otp()
+        expires_at = time.monotonic() + self.ttl_seconds
+        tick = math.ceil(expires_at / self.tick_seconds)
+
+        with self._lock:
+            if user_id in self._entries:
+                self._remove(user_id)
+            self._entries[user_id] = (code, expires_at, tick)
+            self._wheel[tick % len(self._wheel)].add(user_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+            self.issued += 1
+        return code
+
+    def consume(self, user_id: int, code: str, conn: Optional[Connection] = None) -> str:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or not secrets.compare_digest(entry[0], code):
+                return INVALID
+            if entry[1] <= time.monotonic():
+                return EXPIRED
+            self._remove(user_id)
+            self.verified += 1
+            return VALID
+
+    def sweep(self) -> int:
+        """Drop codes whose wheel slot has passed. Returns the count removed."""
+        with self._lock:
+            now_tick = self._tick(time.monotonic())
+            first = max(self._swept_tick + 1, now_tick - len(self._wheel) + 1)
+            removed = 0
+            for tick in range(first, now_tick + 1):
+                slot = self._wheel[tick % len(self._wheel)]
+                for user_id in [user_id for user_id in slot if self._entries[user_id][2] <= now_tick]:
+                    self._remove(user_id)
+                    removed += 1
+            self._swept_tick = now_tick
+            self.swept += removed
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "issued": self.issued,
+                "verified": self.verified,
+                "evicted": self.evicted,
+                "swept": self.swept,
+            }
+
+
+class DatabaseOtpStore:
+    """
+    Codes in email_verification_tokens, shared by every node.
+
+    sweep() deletes expired and used rows batch_size at a time, one short
+    transaction per batch, so the table stays proportional to the codes
+    currently outstanding.
+    """
+
+    def __init__(self, engine_provider: Callable[[], Engine], ttl_seconds: float, batch_size: int = 1000):
+        self.engine_provider = engine_provider
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+
+        self.issued = 0
+        self.verified = 0
+        self.swept = 0
+
+    def issue(self, user_id: int, conn: Optional[Connection] = None) -> str:
+        if conn is None:
+            with self.engine_provider().begin() as conn:
+                return self.issue(user_id, conn)
+
+        code = generate_otp()
+        conn.execute(
+            insert(email_verification_tokens).values(
+                user_id=user_id,
+                otp_code=code,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                used=False
+            )
+        )
+        self.issued += 1
+        return code
+
+    def consume(self, user_id: int, code: str, conn: Optional[Connection] = None) -> str:
+        if conn is None:
+            with self.engine_provider().begin() as conn:
+                return self.consume(user_id, code, conn)
+
+        token = conn.execute(
+            select(email_verification_tokens).where(
+                email_verification_tokens.c.user_id == user_id,
+                email_verification_tokens.c.otp_code == code,
+                email_verification_tokens.c.used == False
+            )
+        ).first()
+
+        if not token:
+            return INVALID
+
+        if token.expires_at < datetime.utcnow():
+            return EXPIRED
+
+        conn.execute(
+            update(email_verification_tokens).where(
+                email_verification_tokens.c.id == token.id
+            ).values(used=True)
+        )
+        self.verified += 1
+        return VALID
+
+    def sweep(self) -> int:
+        """Delete expired and used rows in batches. Returns the count deleted."""
+        engine = self.engine_provider()
+        removed = 0
+        while True:
+            with engine.begin() as conn:
+                ids = conn.execute(
+                    select(email_verification_tokens.c.id)
+                    .where(or_(
+                        email_verification_tokens.c.used == True,
+                        email_verification_tokens.c.expires_at < datetime.utcnow(),
+                    ))
+                    .order_by(email_verification_tokens.c.id)
+                    .limit(self.batch_size)
+                ).scalars().all()
+                if ids:
+                    conn.execute(
+                        delete(email_verification_tokens).where(email_verification_tokens.c.id.in_(ids))
+                    )
+            removed += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        self.swept += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "issued": self.issued,
+            "verified": self.verified,
+            "swept": self.swept,
+        }
+
+
+class OtpSweeper:
+    """Calls store.sweep() every interval seconds on a daemon thread."""
+
+    def __init__(self, store, interval: float):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.failed_sweeps = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="otp-sweeper", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.sweep()
+            except Exception:
+                self.failed_sweeps += 1
+
+
+_store = None
+_sweeper = None
+
+
+def start_otp_store(
+    backend: str,
+    engine_provider: Callable[[], Engine],
+    ttl_seconds: float,
+    max_entries: int,
+    sweep_interval: float,
+    sweep_batch_size: int,
+):
+    global _store, _sweeper
+    if _store is None:
+        if backend == MEMORY:
+            _store = MemoryOtpStore(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        elif backend == DATABASE:
+            _store = DatabaseOtpStore(engine_provider, ttl_seconds=ttl_seconds, batch_size=sweep_batch_size)
+        else:
+            raise ValueError(f"Unknown OTP store: {backend}")
+        _sweeper = OtpSweeper(_store, sweep_interval)
+        _sweeper.start()
+    return _store
+
+
+def stop_otp_store():
+    global _store, _sweeper
+    if _sweeper is not None:
+        _sweeper.close()
+        _sweeper = None
+    _store = None
+
+
+def get_otp_store():
+    return _store
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.sessions import sessions
+
+MAX_CACHED_OWNERS = 10000
+
+_owners = OrderedDict()
+_lock = threading.Lock()
+
+
+def _owner_query(session_id: int):
+    return select(sessions.c.user_id).where(sessions.c.id == session_id)
+
+
+def _cached_owner(session_id: int):
+    with _lock:
+        owner = _owners.get(session_id)
+        if owner is not None:
+            _owners.move_to_end(session_id)
+        return owner
+
+
+def _check_owner(session_id: int, user_id: int, owner, cached: bool):
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if not cached:
+        with _lock:
+            _owners[session_id] = owner
+            while len(_owners) > MAX_CACHED_OWNERS:
+                _owners.popitem(last=False)
+
+    if owner != user_id:
+        raise HTTPException(status_code=403, detail="Session belongs to another user")
+
+
+def require_session_owner(engine: Engine, session_id: int, user_id: int):
+    """
+    Raise 404 for an unknown session and 403 for another user's session.
+
+    A session's owner never changes, so owners are cached in a bounded LRU
+    and repeated executions in one session skip the lookup.
+    """
+    owner = _cached_owner(session_id)
+    cached = owner is not None
+
+    if not cached:
+        with engine.connect() as conn:
+            owner = conn.execute(_owner_query(session_id)).scalar()
+
+    _check_owner(session_id, user_id, owner, cached)
+
+
+async def require_session_owner_async(engine: AsyncEngine, session_id: int, user_id: int):
+    """require_session_owner on the asyncio engine, sharing the same owner cache."""
+    owner = _cached_owner(session_id)
+    cached = owner is not None
+
+    if not cached:
+        async with engine.connect() as conn:
+            owner = (await conn.execute(_owner_query(session_id))).scalar()
+
+    _check_owner(session_id, user_id, owner, cached)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+
+from app.config import settings
+from app.security.auth import decode_access_token
+
+
+class TokenCache:
+    """
+    Bounded LRU of already-verified access tokens to user ids.
+
+    Entries remember the token's own expiry and are dropped once it passes,
+    so a cached token is never honoured longer than the JWT itself allows.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user_id, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, user_id: int, expires_at: float):
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache(max_entries=settings.token_cache_size)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> int:
+    """
+    FastAPI dependency resolving the bearer token to a user id.
+
+    Verifies the JWT only on a cache miss. Raises 401 for a missing,
+    malformed, tampered or expired token. Runs on the event loop, as it
+    does no I/O, so authenticating costs no threadpool hop.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    token = credentials.credentials
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    try:
+        claims = decode_access_token(token)
+        user_id = int(claims["sub"])
+        expires_at = float(claims["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    token_cache.put(token, user_id, expires_at)
+    return user_id
@@ -0,0 +1,344 @@
+"""
+Declarative signal engine.
+
+Each signal is registered with register_signal() as a measure, an
+aggregate over one session's runs and errors, plus a description template
+and the condition under which it is shown. signals_query() compiles the
+measures of every registered signal into one query over sessions
+left-joined to session_activity: measures the activity record already
+maintains read its columns, any other becomes a correlated aggregate over
+run_events and error_events. build_signals() then only formats the
+signals of one result row, so adding a signal adds neither round trips
+nor Python work over event rows.
+
+Archived sessions have no live events or activity record. Their
+activity-backed measures are read from the event archive instead, and
+other event measures are treated as missing, so those signals are omitted.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Union
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.execution.archive import get_archive_store
+from app.models.activity import session_activity
+from app.models.events import error_events, run_events
+from app.models.sessions import sessions
+from app.schemas.signals import Signal
+
+RUNS = "runs"
+ERRORS = "errors"
+
+# Aggregates session_activity maintains as events are recorded, by signature.
+_ACTIVITY_COLUMNS = {
+    ("count", RUNS): "run_count",
+    ("count", ERRORS): "error_count",
+    ("first", RUNS): "first_run_at",
+    ("first", ERRORS): "first_error_at",
+    ("last", RUNS): "last_run_at",
+    ("count_after", RUNS, ERRORS): "runs_after_first_error",
+}
+
+_SESSION_COLUMNS = [sessions.c.id, sessions.c.user_id, sessions.c.started_at, sessions.c.archived_at]
+
+
+def _event_aggregate(kind: str, aggregate: Callable, condition: Optional[Callable] = None):
+    """
+    Correlated scalar subquery applying aggregate(timestamp) to one kind of
+    the session's events, optionally filtered by condition(timestamp).
+    Tables are aliased so these subqueries can nest.
+    """
+    runs = run_events.alias()
+    if kind == RUNS:
+        source, timestamp = runs, runs.c.executed_at
+    elif kind == ERRORS:
+        errors = error_events.alias()
+        source, timestamp = errors.join(runs, errors.c.run_id == runs.c.id), errors.c.occurred_at
+    else:
+        raise ValueError(f"Unknown event kind: {kind}")
+
+    query = select(aggregate(timestamp)).select_from(source).where(runs.c.session_id == sessions.c.id)
+    if condition is not None:
+        query = query.where(condition(timestamp))
+    return query.correlate(sessions).scalar_subquery()
+
+
+class Measure:
+    """An aggregate selected as one column of signals_query()."""
+
+    signature: tuple = ()
+
+    @property
+    def label(self) -> str:
+        return _ACTIVITY_COLUMNS.get(self.signature) or "_".join(self.signature)
+
+    def columns(self) -> List["Measure"]:
+        """The measures selected in SQL that this one is computed from."""
+        return [self]
+
+    def expression(self):
+        column = _ACTIVITY_COLUMNS.get(self.signature)
+        if column is not None:
+            return self._from_activity(session_activity.c[column])
+        return self._from_events()
+
+    def _from_activity(self, column):
+        return column
+
+    def _from_events(self):
+        raise NotImplementedError
+
+    def archived(self, activity, value):
+        """This measure for an archived session, from its ArchivedActivity."""
+        column = _ACTIVITY_COLUMNS.get(self.signature)
+        return getattr(activity, column) if column is not None else None
+
+    def value(self, values: dict):
+        return values[self.label]
+
+
+@dataclass(frozen=True)
+class Count(Measure):
+    events: str
+
+    @property
+    def signature(self):
+        return ("count", self.events)
+
+    def _from_activity(self, column):
+        return func.coalesce(column, 0)
+
+    def _from_events(self):
+        return _event_aggregate(self.events, lambda timestamp: func.count())
+
+
+@dataclass(frozen=True)
+class FirstAt(Measure):
+    events: str
+
+    @property
+    def signature(self):
+        return ("first", self.events)
+
+    def _from_events(self):
+        return _event_aggregate(self.events, func.min)
+
+
+@dataclass(frozen=True)
+class LastAt(Measure):
+    events: str
+
+    @property
+    def signature(self):
+        return ("last", self.events)
+
+    def _from_events(self):
+        return _event_aggregate(self.events, func.max)
+
+
+@dataclass(frozen=True)
+class CountAfter(Measure):
+    """Events of one kind later than the first event of another."""
+    events: str
+    after: str
+
+    @property
+    def signature(self):
+        return ("count_after", self.events, self.after)
+
+    def _from_activity(self, column):
+        return func.coalesce(column, 0)
+
+    def _from_events(self):
+        first = FirstAt(self.after)._from_events()
+        return _event_aggregate(self.events, lambda timestamp: func.count(), lambda timestamp: timestamp > first)
+
+
+@dataclass(frozen=True)
+class ExistsAfter(Measure):
+    """Whether any event of one kind is later than the first of another."""
+    events: str
+    after: str
+
+    @property
+    def signature(self):
+        return ("exists_after", self.events, self.after)
+
+    def expression(self):
+        return CountAfter(self.events, self.after).expression() > 0
+
+    def archived(self, activity, value):
+        count = CountAfter(self.events, self.after).archived(activity, None)
+        return None if count is None else count > 0
+
+    def value(self, values: dict):
+        value = values[self.label]
+        return None if value is None else bool(value)
+
+
+@dataclass(frozen=True)
+class SessionTime(Measure):
+    """A timestamp column of the session itself."""
+    column: str
+
+    @property
+    def label(self) -> str:
+        return self.column
+
+    def expression(self):
+        return sessions.c[self.column]
+
+    def archived(self, activity, value):
+        return value
+
+
+@dataclass(frozen=True)
+class Duration(Measure):
+    """Whole minutes between two timestamp measures, rounded like round()."""
+    start: Measure
+    end: Measure
+
+    def columns(self) -> List[Measure]:
+        return self.start.columns() + self.end.columns()
+
+    def value(self, values: dict):
+        start, end = self.start.value(values), self.end.value(values)
+        if start is None or end is None:
+            return None
+        return round((end - start).total_seconds() / 60)
+
+
+SESSION_START = SessionTime("started_at")
+SESSION_END = SessionTime("ended_at")
+
+
+@dataclass
+class SignalDefinition:
+    key: str
+    measure: Measure
+    description: Union[str, Callable[[Any], str]]
+    when: Callable[[Any], bool]
+    shown_value: Optional[Callable[[Any], Any]] = None
+
+    def describe(self, value) -> str:
+        if callable(self.description):
+            return self.description(value)
+        return self.description.format(value=value)
+
+
+SIGNALS: List[SignalDefinition] = []
+
+
+def register_signal(
+    key: str,
+    measure: Measure,
+    description: Union[str, Callable[[Any], str]],
+    when: Callable[[Any], bool] = lambda value: True,
+    shown_value: Optional[Callable[[Any], Any]] = None,
+) -> SignalDefinition:
+    """
+    Register a signal, shown in registration order. It is omitted when its
+    measure is missing or when(value) is false. description is a template
+    formatted with {value}, or a function of the value; shown_value, when
+    given, maps the measure to the reported value.
+    """
+    definition = SignalDefinition(key, measure, description, when, shown_value)
+    SIGNALS.append(definition)
+    return definition
+
+
+def _sql_measures() -> List[Measure]:
+    labels = {column.name for column in _SESSION_COLUMNS}
+    measures = []
+    for definition in SIGNALS:
+        for measure in definition.measure.columns():
+            if measure.label not in labels:
+                labels.add(measure.label)
+                measures.append(measure)
+    return measures
+
+
+def signals_query():
+    """Every registered measure for each session, one row per session."""
+    return select(
+        *_SESSION_COLUMNS,
+        *[measure.expression().label(measure.label) for measure in _sql_measures()],
+    ).select_from(sessions.outerjoin(
+        session_activity, session_activity.c.session_id == sessions.c.id
+    ))
+
+
+def measure_values(row) -> dict:
+    """A signals_query() row as a dict, with archived sessions filled in from the archive."""
+    values = dict(row._mapping)
+    if row.archived_at is not None:
+        activity = get_archive_store(settings.archive_dir).activity(row.id, row.started_at)
+        for measure in _sql_measures():
+            values[measure.label] = measure.archived(activity, values[measure.label])
+    return values
+
+
+def build_signals(row) -> List[Signal]:
+    """The registered signals of one signals_query() row, omitting those without data."""
+    values = measure_values(row)
+    signals = []
+    for definition in SIGNALS:
+        value = definition.measure.value(values)
+        if value is None or not definition.when(value):
+            continue
+        signals.append(Signal(
+            key=definition.key,
+            value=definition.shown_value(value) if definition.shown_value else value,
+            description=definition.describe(value),
+        ))
+    return signals
+
+
+# v1 signals, as specified in Docs/PHASE_5_2_SIGNAL_SPEC_V1.md.
+
+register_signal(
+    "run_count",
+    Count(RUNS),
+    lambda value: (
+        "You ran your code once during this session."
+        if value == 1
+        else "You ran your code multiple times during this session."
+    ),
+    when=lambda value: value > 0,
+)
+
+register_signal(
+    "repeated_execution",
+    Count(RUNS),
+    "The code was executed more than once during this session.",
+    when=lambda value: value > 1,
+    shown_value=lambda value: True,
+)
+
+register_signal(
+    "errors_present",
+    Count(ERRORS),
+    "Errors occurred during this session.",
+    when=lambda value: value > 0,
+    shown_value=lambda value: True,
+)
+
+register_signal(
+    "error_followed_by_run",
+    ExistsAfter(RUNS, ERRORS),
+    "After an error occurred, the code was run again.",
+    when=lambda value: value,
+)
+
+register_signal(
+    "session_duration_minutes",
+    Duration(SESSION_START, SESSION_END),
+    "This session lasted {value} minutes.",
+)
+
+register_signal(
+    "time_to_first_run_minutes",
+    Duration(SESSION_START, FirstAt(RUNS)),
+    "The first code execution occurred after {value} minutes.",
+)
@@ -0,0 +1,26 @@
+import argparse
+from datetime import timedelta
+
+from app.db import get_engine
+from app.config import settings
+from app.execution.archive import archive_sessions
+
+# Usage: python archive_events.py [--older-than-days N] [--batch-size N]
+parser = argparse.ArgumentParser(description="Move events of old ended sessions into the archive")
+parser.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+parser.add_argument("--batch-size", type=int, default=500)
+args = parser.parse_args()
+
+engine = get_engine(settings.database_url)
+
+totals = archive_sessions(
+    engine,
+    settings.archive_dir,
+    timedelta(days=args.older_than_days),
+    batch_size=args.batch_size,
+)
+
+print(
+    f"✅ Archived {totals['sessions']} sessions ({totals['runs']} runs, "
+    f"{totals['errors']} errors) into {settings.archive_dir} in {totals['batches']} batches"
+)
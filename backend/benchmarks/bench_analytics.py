@@ -0,0 +1,156 @@
+"""
+Benchmark cohort analytics at scale: vectorized NumPy vs a per-session loop.
+
+Seeds a scratch database with --events run events spread over sessions of
+one prompt (a fifth of them failing), then times loading the cohort into
+NumPy arrays, computing the v1 signals vectorized, and the same signals
+computed by grouping rows per session in plain Python.
+
+Usage (from backend/):
+    python -m benchmarks.bench_analytics --events 1000000 --runs-per-session 100
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.analytics import load_cohort, session_signals, summarize
+from app.config import settings
+from app.db import get_engine
+from app.execution.fingerprints import error_event_rows
+from app.migrations import upgrade
+from app.models.events import error_events, run_events
+from app.models.sessions import sessions
+from app.models.users import users
+
+PROMPT = "Benchmark cohort prompt"
+BATCH_ROWS = 50000
+
+
+def seed(engine, events: int, runs_per_session: int):
+    started = datetime(2026, 1, 1)
+    session_count = max(1, events // runs_per_session)
+
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(users).returning(users.c.id),
+            [{"email": "cohort@example.com", "password_hash": "x", "is_verified": True, "created_at": started}],
+        ).scalar()
+        conn.execute(insert(sessions), [
+            {
+                "user_id": user_id,
+                "prompt_text": PROMPT,
+                "started_at": started + timedelta(minutes=index),
+                "ended_at": started + timedelta(minutes=index + 45),
+            }
+            for index in range(session_count)
+        ])
+        session_ids = list(conn.execute(select(sessions.c.id).order_by(sessions.c.id)).scalars())
+
+    for batch_start in range(0, events, BATCH_ROWS):
+        positions = range(batch_start, min(events, batch_start + BATCH_ROWS))
+        with engine.begin() as conn:
+            run_ids = conn.execute(
+                insert(run_events).returning(run_events.c.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "session_id": session_ids[position % session_count],
+                        "executed_at": started + timedelta(minutes=position % session_count, seconds=30 + position // session_count),
+                    }
+                    for position in positions
+                ],
+            ).scalars().all()
+            conn.execute(insert(error_events), error_event_rows(conn, [
+                {
+                    "run_id": run_id,
+                    "error_message": "NameError: name 'x' is not defined",
+                    "occurred_at": started + timedelta(minutes=position % session_count, seconds=31 + position // session_count),
+                }
+                for position, run_id in zip(positions, run_ids)
+                if position % 5 == 0
+            ], settings.error_message_storage))
+
+
+def python_signals(conn) -> dict:
+    """Baseline: the same v1 aggregates computed row by row in Python."""
+    rows = conn.execute(
+        select(
+            sessions.c.id,
+            sessions.c.started_at,
+            sessions.c.ended_at,
+            run_events.c.executed_at,
+            error_events.c.occurred_at,
+        )
+        .select_from(
+            sessions
+            .outerjoin(run_events, run_events.c.session_id == sessions.c.id)
+            .outerjoin(error_events, error_events.c.run_id == run_events.c.id)
+        )
+        .where(sessions.c.prompt_text == PROMPT)
+    ).all()
+
+    grouped = defaultdict(lambda: {"runs": [], "errors": []})
+    for session_id, started_at, ended_at, executed_at, occurred_at in rows:
+        entry = grouped[session_id]
+        entry["started_at"], entry["ended_at"] = started_at, ended_at
+        if executed_at is not None:
+            entry["runs"].append(executed_at)
+        if occurred_at is not None:
+            entry["errors"].append(occurred_at)
+
+    signals = {}
+    for session_id, entry in grouped.items():
+        first_error = min(entry["errors"], default=None)
+        signals[session_id] = {
+            "run_count": len(entry["runs"]),
+            "error_count": len(entry["errors"]),
+            "runs_after_first_error": sum(1 for run in entry["runs"] if first_error and run > first_error),
+            "time_to_first_run_minutes": (
+                round((min(entry["runs"]) - entry["started_at"]).total_seconds() / 60) if entry["runs"] else None
+            ),
+        }
+    return signals
+
+
+def timed(label: str, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{label:<40} {(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--runs-per-session", type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cogniflow-analytics-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'analytics.sqlite')}"
+    engine = get_engine(database_url)
+    upgrade(engine)
+
+    timed(f"seed {args.events} events", lambda: seed(engine, args.events, args.runs_per_session))
+
+    with engine.connect() as conn:
+        events = timed("load cohort into NumPy (one query)", lambda: load_cohort(conn, prompt_text=PROMPT))
+        vectorized = timed("vectorized v1 signals", lambda: session_signals(events))
+        timed("vectorized summary (percentiles, histograms)", lambda: summarize(events))
+        baseline = timed("per-session Python loop (query + compute)", lambda: python_signals(conn))
+
+    mismatches = sum(
+        1
+        for index, session_id in enumerate(events.session_ids)
+        if baseline[int(session_id)]["run_count"] != vectorized["run_count"][index]
+        or baseline[int(session_id)]["error_count"] != vectorized["error_count"][index]
+    )
+    print(f"sessions: {len(events.session_ids)}, runs: {len(events.run_at)}, errors: {len(events.error_at)}, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark concurrent throughput of the sync and async request paths.
+
+Seeds a scratch database, then starts the API once per mode (ASYNC_MODE
+false, then true) and drives it with --concurrency keep-alive clients for
+--duration seconds. Each client logs in, starts a session, and then loops
+over GET /prompts/random, GET /sessions/{id}/signals and, every
+--execute-every iterations, POST /execute. The interpreter pool is
+disabled unless --pool is given, so both modes execute code in a fresh
+subprocess and differ only in how they wait for it and for the database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async --concurrency 64 --duration 20
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.load_test import SEED_PASSWORD, Client, percentile, seed_database, wait_for_server
+
+MODES = ("sync", "async")
+
+
+def client_setup(client: Client, email: str, ready: list):
+    """Log in and start a session; not part of the measured load."""
+    login = client.call("POST", "POST /auth/login", "/auth/login", {"email": email, "password": SEED_PASSWORD})
+    if not login:
+        return
+    client.token = login["access_token"]
+
+    session = client.call("POST", "POST /sessions/start", "/sessions/start", {"prompt_text": "Benchmark prompt"})
+    if session:
+        ready.append((client, session["session_id"]))
+
+
+def client_loop(client: Client, session_id: int, deadline: float, execute_every: int):
+    iteration = 0
+    while time.monotonic() < deadline:
+        iteration += 1
+        client.call("GET", "GET /prompts/random", "/prompts/random")
+        client.call("GET", "GET /sessions/{session_id}/signals", f"/sessions/{session_id}/signals")
+        if execute_every and iteration % execute_every == 0:
+            client.call("POST", "POST /execute", "/execute", {"session_id": session_id, "code": "print(sum(range(100)))"})
+
+
+def run_mode(mode: str, args, emails) -> dict:
+    env = os.environ.copy()
+    env["ASYNC_MODE"] = "true" if mode == "async" else "false"
+    env["EXECUTE_POOL_ENABLED"] = "true" if args.pool else "false"
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(args.port),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+    samples = defaultdict(list)
+    failures = defaultdict(int)
+    lock = threading.Lock()
+    measuring = False
+
+    def record(route, seconds, ok):
+        with lock:
+            if not measuring:
+                return
+            if ok:
+                samples[route].append(seconds)
+            else:
+                failures[route] += 1
+
+    def run_threads(target, argument_lists):
+        threads = [threading.Thread(target=target, args=arguments) for arguments in argument_lists]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    try:
+        wait_for_server(args.port)
+
+        ready = []
+        run_threads(client_setup, [
+            (Client(args.port, record), emails[index % len(emails)], ready)
+            for index in range(args.concurrency)
+        ])
+        if len(ready) < args.concurrency:
+            raise RuntimeError(f"Only {len(ready)} of {args.concurrency} clients logged in")
+        for client, _ in ready:
+            # Logins can outlast the server's keep-alive timeout; reconnect lazily.
+            client.connection.close()
+
+        measuring = True
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        run_threads(client_loop, [
+            (client, session_id, deadline, args.execute_every)
+            for client, session_id in ready
+        ])
+
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    routes = {}
+    for route in sorted(set(samples) | set(failures)):
+        ordered = sorted(samples[route])
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": failures[route],
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+        }
+
+    everything = sorted(seconds for route_samples in samples.values() for seconds in route_samples)
+    return {
+        "throughput_rps": round(len(everything) / elapsed, 2),
+        "errors": sum(failures.values()),
+        "p50_ms": round(percentile(everything, 0.50) * 1000, 2) if everything else None,
+        "p99_ms": round(percentile(everything, 0.99) * 1000, 2) if everything else None,
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--runs-per-session", type=int, default=200)
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per mode")
+    parser.add_argument("--execute-every", type=int, default=5, help="POST /execute every N iterations (0 disables)")
+    parser.add_argument("--pool", action="store_true", help="enable the interpreter pool (sync mode only uses it)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default="bench_async_results.json")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cogniflow-async-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["ENV"] = "benchmark"
+
+    emails = seed_database(database_url, args.users, args.sessions_per_user, args.runs_per_session, args.prompts)
+
+    results = {mode: run_mode(mode, args, emails) for mode in MODES}
+
+    print(f"{'mode':<8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<8} {result['throughput_rps']:>10} {result['p50_ms']:>10} {result['p99_ms']:>10} {result['errors']:>8}")
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "config": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "execute_every": args.execute_every,
+            "pool": args.pool,
+        },
+        "modes": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare /execute backends: subprocess-per-request vs the warm interpreter pool.
+
+Runs the same snippet through both paths sequentially and with a thread
+fan-out, then prints per-run latency percentiles and runs/sec.
+
+Usage (from backend/):
+    python -m benchmarks.bench_execute --runs 200 --concurrency 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.execution.pool import InterpreterPool
+from app.execution.runner import run_in_subprocess
+
+SNIPPET = "total = sum(i * i for i in range(1000))\nprint(total)\n"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(run, runs: int, concurrency: int) -> dict:
+    def timed(_):
+        started = time.perf_counter()
+        result = run(SNIPPET)
+        assert not result.stderr, result.stderr
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(runs)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "runs_per_sec": runs / elapsed,
+    }
+
+
+def report(label: str, stats: dict):
+    print(
+        f"{label:<28} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   "
+        f"mean {stats['mean_ms']:8.2f} ms   {stats['runs_per_sec']:8.1f} runs/sec"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-runs", type=int, default=50, help="jobs per pooled worker before recycling")
+    args = parser.parse_args()
+
+    pool = InterpreterPool(min_size=args.concurrency, max_size=args.concurrency, max_runs=args.max_runs)
+    pool.start()
+    try:
+        for concurrency in (1, args.concurrency):
+            report(f"subprocess  x{concurrency}", measure(run_in_subprocess, args.runs, concurrency))
+            report(f"pool        x{concurrency}", measure(pool.run, args.runs, concurrency))
+        print(f"pool stats: {pool.stats()}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Reproducible load test for every endpoint.
+
+Builds a database seeded at a configurable scale, starts the FastAPI app
+under uvicorn against it, drives signup/verify/login, prompts, session
+start/end, /execute and the signals endpoints from concurrent virtual
+users for a fixed duration, and writes per-route throughput and p50/p95/p99
+latency to a JSON file that can be diffed between releases.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --users 20 --sessions-per-user 5 \\
+        --runs-per-session 1000 --concurrency 16 --duration 30 \\
+        --output bench_results.json
+
+Defaults to a fresh SQLite file in a temporary directory; pass
+--database-url postgresql://... to benchmark a local Postgres database
+(its tables are created with the migrations but never dropped).
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+SEED_PASSWORD = "benchmark-password"
+
+SNIPPETS = [
+    "print(sum(range(100)))",
+    "values = [i * i for i in range(50)]\nprint(max(values))",
+    "print(undefined_name)",
+    "def f(n):\n    return 1 if n < 2 else n * f(n - 1)\nprint(f(10))",
+]
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_database(database_url: str, users: int, sessions_per_user: int, runs_per_session: int, prompts_count: int):
+    """Create the schema and bulk-load users, prompts, sessions and events."""
+    from sqlalchemy import insert
+
+    from app.db import get_engine
+    from app.execution.activity import rebuild_activity
+    from app.execution.fingerprints import error_event_rows
+    from app.migrations import upgrade
+    from app.prompt_import import prompt_row
+    from app.models.events import error_events, run_events
+    from app.models.prompts import prompts
+    from app.models.sessions import sessions
+    from app.models.users import users as users_table
+    from app.config import settings
+    from app.security.auth import hash_password
+
+    engine = get_engine(database_url)
+    upgrade(engine)
+
+    started = datetime.utcnow() - timedelta(days=7)
+    password_hash = hash_password(SEED_PASSWORD, settings.bcrypt_rounds)
+
+    with engine.begin() as conn:
+        conn.execute(insert(prompts), [
+            prompt_row(f"Benchmark prompt {index}", started)
+            for index in range(prompts_count)
+        ])
+
+        user_ids = conn.execute(
+            insert(users_table).returning(users_table.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "email": f"bench-{index}@example.com",
+                    "password_hash": password_hash,
+                    "is_verified": True,
+                    "created_at": started,
+                }
+                for index in range(users)
+            ],
+        ).scalars().all()
+
+        session_ids = conn.execute(
+            insert(sessions).returning(sessions.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "prompt_text": "Benchmark prompt",
+                    "started_at": started,
+                    "ended_at": started + timedelta(hours=1),
+                }
+                for user_id in user_ids
+                for _ in range(sessions_per_user)
+            ],
+        ).scalars().all()
+
+        for session_id in session_ids:
+            run_ids = conn.execute(
+                insert(run_events).returning(run_events.c.id, sort_by_parameter_order=True),
+                [
+                    {"session_id": session_id, "executed_at": started + timedelta(seconds=index)}
+                    for index in range(runs_per_session)
+                ],
+            ).scalars().all()
+
+            errors = [
+                {
+                    "run_id": run_id,
+                    "error_message": "NameError: name 'x' is not defined",
+                    "occurred_at": started + timedelta(seconds=index, milliseconds=1),
+                }
+                for index, run_id in enumerate(run_ids)
+                if index % 5 == 0
+            ]
+            if errors:
+                conn.execute(insert(error_events), error_event_rows(conn, errors, settings.error_message_storage))
+
+        rebuild_activity(conn)
+
+    engine.dispose()
+    return [f"bench-{index}@example.com" for index in range(users)]
+
+
+def latest_otp(database_url: str, email: str) -> str:
+    from sqlalchemy import select
+
+    from app.db import get_engine
+    from app.models.email_verification import email_verification_tokens
+    from app.models.users import users
+
+    engine = get_engine(database_url)
+    with engine.connect() as conn:
+        otp = conn.execute(
+            select(email_verification_tokens.c.otp_code)
+            .join(users, users.c.id == email_verification_tokens.c.user_id)
+            .where(users.c.email == email)
+            .order_by(email_verification_tokens.c.id.desc())
+            .limit(1)
+        ).scalar()
+    engine.dispose()
+    return otp
+
+
+class Client:
+    """One keep-alive HTTP connection that records latency per route."""
+
+    def __init__(self, port: int, recorder):
+        self.port = port
+        self.recorder = recorder
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.token = None
+
+    def call(self, method: str, route: str, path: str, body=None, expected=(200,)):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            self.recorder(route, time.perf_counter() - started, False)
+            return None
+
+        ok = status in expected
+        self.recorder(route, time.perf_counter() - started, ok)
+        return json.loads(data) if ok and data else None
+
+
+def virtual_user(client: Client, email: str, deadline: float, database_url: str, runs_per_visit: int, signup_every: int):
+    iteration = 0
+    while time.monotonic() < deadline:
+        iteration += 1
+
+        if signup_every and iteration % signup_every == 0:
+            new_email = f"signup-{threading.get_ident()}-{iteration}-{random.randrange(10 ** 9)}@example.com"
+            if client.call("POST", "POST /auth/signup", "/auth/signup", {"email": new_email, "password": SEED_PASSWORD}):
+                otp = latest_otp(database_url, new_email)
+                client.call("POST", "POST /auth/verify-email", "/auth/verify-email", {"email": new_email, "otp": otp})
+
+        login = client.call("POST", "POST /auth/login", "/auth/login", {"email": email, "password": SEED_PASSWORD})
+        if not login:
+            continue
+        client.token = login["access_token"]
+
+        prompt = client.call("GET", "GET /prompts/random", "/prompts/random")
+        prompt_text = prompt["text"] if prompt else "Benchmark prompt"
+
+        session = client.call("POST", "POST /sessions/start", "/sessions/start", {"prompt_text": prompt_text})
+        if not session:
+            continue
+        session_id = session["session_id"]
+
+        for _ in range(runs_per_visit):
+            client.call("POST", "POST /execute", "/execute", {"session_id": session_id, "code": random.choice(SNIPPETS)})
+
+        client.call("GET", "GET /sessions/{session_id}/signals", f"/sessions/{session_id}/signals")
+        client.call("POST", "POST /sessions/end", "/sessions/end", {"session_id": session_id})
+        client.call(
+            "POST",
+            "POST /sessions/signals/bulk",
+            "/sessions/signals/bulk",
+            {"started_after": (datetime.utcnow() - timedelta(days=30)).isoformat()},
+        )
+
+
+def wait_for_server(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions-per-user", type=int, default=5)
+    parser.add_argument("--runs-per-session", type=int, default=1000)
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--runs-per-visit", type=int, default=5, help="/execute calls per session visit")
+    parser.add_argument("--signup-every", type=int, default=10, help="sign up a new user every N visits (0 disables)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for the workload mix")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="cogniflow-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["ENV"] = "benchmark"
+    # latest_otp reads codes from the table, so the server must keep them there.
+    os.environ["OTP_STORE"] = "database"
+
+    seed_started = time.perf_counter()
+    emails = seed_database(database_url, args.users, args.sessions_per_user, args.runs_per_session, args.prompts)
+    seed_seconds = time.perf_counter() - seed_started
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(args.port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+        ],
+        env=os.environ.copy(),
+    )
+
+    samples = defaultdict(list)
+    failures = defaultdict(int)
+    lock = threading.Lock()
+
+    def record(route, seconds, ok):
+        with lock:
+            if ok:
+                samples[route].append(seconds)
+            else:
+                failures[route] += 1
+
+    try:
+        wait_for_server(args.port)
+        deadline = time.monotonic() + args.duration
+        load_started = time.perf_counter()
+
+        threads = [
+            threading.Thread(
+                target=virtual_user,
+                args=(
+                    Client(args.port, record),
+                    emails[index % len(emails)],
+                    deadline,
+                    database_url,
+                    args.runs_per_visit,
+                    args.signup_every,
+                ),
+            )
+            for index in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - load_started
+    finally:
+        server.terminate()
+        server.wait()
+
+    routes = {}
+    for route in sorted(set(samples) | set(failures)):
+        ordered = sorted(samples[route])
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": failures[route],
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2) if ordered else None,
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+        }
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "config": {
+            "users": args.users,
+            "sessions_per_user": args.sessions_per_user,
+            "runs_per_session": args.runs_per_session,
+            "prompts": args.prompts,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "runs_per_visit": args.runs_per_visit,
+            "signup_every": args.signup_every,
+            "workers": args.workers,
+            "seed": args.seed,
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "routes": routes,
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+    for route, stats in routes.items():
+        print(
+            f"{route:<36} {stats['requests']:>7} req  {stats['errors']:>5} err  "
+            f"{stats['throughput_rps']:>8} rps  p50 {stats['p50_ms']}  p95 {stats['p95_ms']}  p99 {stats['p99_ms']} ms"
+        )
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
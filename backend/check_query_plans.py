@@ -0,0 +1,223 @@
+"""
+Run every hot route query through EXPLAIN and fail on sequential scans.
+
+Checks the database at DATABASE_URL (PostgreSQL or SQLite). A plan fails
+when it scans a table without an index and that table holds at least
+--min-rows rows; small tables are skipped because planners rightly prefer
+scanning them. Use --seed N on a scratch database to load N synthetic runs
+first.
+
+Usage (from backend/):
+    python check_query_plans.py [--min-rows 10000] [--seed 200000]
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app.analytics import cohort_query
+from app.config import settings
+from app.costs import prompt_costs_query, session_costs_query
+from app.db import get_engine
+from app.execution.fingerprints import error_event_rows
+from app.migrations import upgrade
+from app.models.email_verification import email_verification_tokens
+from app.models.events import error_events, run_events
+from app.models.prompts import prompts
+from app.models.sessions import sessions
+from app.models.users import users
+from app.signal_engine import signals_query
+
+LARGE_TABLES = [
+    users,
+    sessions,
+    run_events,
+    error_events,
+    email_verification_tokens,
+]
+
+
+def route_queries(dialect_name: str):
+    """
+    Representative statements for every per-request lookup, keyed by route.
+    Analytics endpoints are checked with their filters: unfiltered, they
+    aggregate every session by design.
+    """
+    window_start = datetime.utcnow() - timedelta(days=1)
+    return [
+        ("POST /auth/signup, /auth/login: user by email",
+         select(users).where(users.c.email == "student@example.com")),
+        ("POST /auth/verify-email: unused token",
+         select(email_verification_tokens).where(
+             email_verification_tokens.c.user_id == 1,
+             email_verification_tokens.c.otp_code == "123456",
+             email_verification_tokens.c.used == False,
+         )),
+        ("POST /sessions/end: session by id",
+         select(sessions).where(sessions.c.id == 1)),
+        ("POST /execute/jobs: session owner",
+         select(sessions.c.user_id).where(sessions.c.id == 1)),
+        ("GET /sessions/{id}/signals",
+         signals_query().where(sessions.c.id == 1)),
+        ("POST /sessions/signals/bulk: by user",
+         signals_query().where(sessions.c.user_id == 1)
+         .order_by(sessions.c.started_at, sessions.c.id).limit(1000)),
+        ("GET /prompts/random: cold-cache seek",
+         select(prompts.c.id, prompts.c.text).where(prompts.c.id >= 1)
+         .order_by(prompts.c.id).limit(1)),
+        ("Session event history",
+         select(run_events).where(run_events.c.session_id == 1)
+         .order_by(run_events.c.executed_at)),
+        ("Errors for a run",
+         select(error_events).where(error_events.c.run_id == 1)),
+        ("GET /analytics/cohort: by prompt",
+         cohort_query(dialect_name, prompt_text="seed 1")),
+        ("GET /analytics/cohort: by start window",
+         cohort_query(dialect_name, started_after=window_start, started_before=datetime.utcnow())),
+        ("GET /analytics/costs/sessions/{session_id}",
+         session_costs_query(1)),
+        ("GET /analytics/costs/prompts: by start window",
+         prompt_costs_query(started_after=window_start)),
+        ("archive_events.py: sessions due for archiving",
+         select(sessions.c.id, sessions.c.started_at)
+         .where(
+             sessions.c.ended_at.is_not(None),
+             sessions.c.ended_at < window_start,
+             sessions.c.archived_at.is_(None),
+         )
+         .order_by(sessions.c.id).limit(500)),
+    ]
+
+
+def seed(engine, runs: int):
+    """Load synthetic users, sessions, runs and errors in bulk."""
+    started = datetime.utcnow() - timedelta(days=30)
+    users_count = max(1, runs // 1000)
+    sessions_count = max(1, runs // 50)
+
+    with engine.begin() as conn:
+        conn.execute(insert(users), [
+            {
+                "email": f"seed-{index}@example.com",
+                "password_hash": "x",
+                "is_verified": True,
+                "created_at": started,
+            }
+            for index in range(users_count)
+        ])
+        user_ids = list(conn.execute(select(users.c.id)).scalars())
+
+        conn.execute(insert(email_verification_tokens), [
+            {
+                "user_id": user_id,
+                "otp_code": f"{random.randrange(10 ** 6):06d}",
+                "expires_at": started,
+                "used": True,
+            }
+            for user_id in user_ids
+            for _ in range(10)
+        ])
+
+        conn.execute(insert(sessions), [
+            {
+                "user_id": random.choice(user_ids),
+                "prompt_text": f"seed {index % 100}",
+                "started_at": started + timedelta(minutes=index),
+                "ended_at": started + timedelta(minutes=index + 30) if index % 2 else None,
+            }
+            for index in range(sessions_count)
+        ])
+        session_ids = list(conn.execute(select(sessions.c.id)).scalars())
+
+        conn.execute(insert(run_events), [
+            {
+                "session_id": random.choice(session_ids),
+                "executed_at": started + timedelta(seconds=index),
+            }
+            for index in range(runs)
+        ])
+        run_ids = list(conn.execute(select(run_events.c.id)).scalars())
+
+        conn.execute(insert(error_events), error_event_rows(conn, [
+            {
+                "run_id": run_id,
+                "error_message": "NameError: name 'x' is not defined",
+                "occurred_at": started,
+            }
+            for run_id in random.sample(run_ids, len(run_ids) // 4)
+        ], settings.error_message_storage))
+
+        conn.execute(text("ANALYZE"))
+
+
+def sequential_scans(conn, statement) -> list:
+    """Names of tables the plan reads without an index."""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scanned = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Node Type") == "Seq Scan":
+                scanned.append(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+        return scanned
+
+    if conn.dialect.name == "sqlite":
+        scanned = []
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+            detail = row[-1]
+            if detail.startswith("SCAN ") and " USING " not in detail:
+                scanned.append(detail.split()[1])
+        return scanned
+
+    raise NotImplementedError(f"EXPLAIN parsing is not implemented for {conn.dialect.name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="synthetic runs to insert before checking")
+    args = parser.parse_args()
+
+    engine = get_engine(settings.database_url)
+    upgrade(engine)
+
+    if args.seed:
+        seed(engine, args.seed)
+
+    failures = 0
+    with engine.connect() as conn:
+        row_counts = {
+            table.name: conn.execute(select(func.count()).select_from(table)).scalar()
+            for table in LARGE_TABLES
+        }
+
+        for name, statement in route_queries(conn.dialect.name):
+            large_scans = [
+                table for table in sequential_scans(conn, statement)
+                if row_counts.get(table, 0) >= args.min_rows
+            ]
+            if large_scans:
+                failures += 1
+                print(f"FAIL  {name}: sequential scan on {', '.join(large_scans)}")
+            else:
+                print(f"ok    {name}")
+
+    if failures:
+        print(f"❌ {failures} queries scan large tables")
+        return 1
+
+    print("✅ No sequential scans on large tables")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import argparse
+import json
+from datetime import datetime
+
+from app.analytics import load_cohort, summarize
+from app.db import get_engine
+from app.config import settings
+
+# Usage: python cohort_analytics.py [--prompt-text TEXT] [--started-after ISO] [--started-before ISO] [--bins N]
+parser = argparse.ArgumentParser(description="Summarize v1 signals across a cohort of sessions")
+parser.add_argument("--prompt-text")
+parser.add_argument("--started-after", type=datetime.fromisoformat)
+parser.add_argument("--started-before", type=datetime.fromisoformat)
+parser.add_argument("--bins", type=int, default=20)
+args = parser.parse_args()
+
+engine = get_engine(settings.database_url)
+
+with engine.connect() as conn:
+    events = load_cohort(conn, args.prompt_text, args.started_after, args.started_before, settings.archive_dir)
+
+summary = summarize(events, args.bins)
+
+print(json.dumps(summary, indent=2))
+print(f"✅ Summarized {summary['sessions']} sessions ({summary['runs']} runs, {summary['errors']} errors)")
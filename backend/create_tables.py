@@ -1,29 +1,11 @@
 from app.db import get_engine
 from app.config import settings
+from app.migrations import upgrade
 
-from app.models.users import users
-from app.models.sessions import sessions
-from app.models.prompts import prompts
-from app.models.events import run_events, error_events
-from app.models.email_verification import email_verification_tokens
-
-from sqlalchemy import MetaData
-
-metadata = MetaData()
-
-# Attach all tables to metadata
-for table in [
-    users,
-    sessions,
-    prompts,
-    run_events,
-    error_events,
-    email_verification_tokens,
-]:
-    table.tometadata(metadata)
-
+# Tables are created by the versioned migrations so that fresh databases
+# record the same schema_migrations history as upgraded ones.
 engine = get_engine(settings.database_url)
 
-metadata.create_all(engine)
+upgrade(engine)
 
-print("✅ All tables created")
\ No newline at end of file
+print("✅ All tables created")
@@ -0,0 +1,33 @@
+import argparse
+
+from app.db import get_engine
+from app.config import settings
+from app.prompt_import import FORMATS, import_prompts, read_prompts
+
+# Usage: python import_prompts.py FILE [--format jsonl|csv] [--batch-size N] [--batches-per-transaction N]
+parser = argparse.ArgumentParser(description="Stream prompts from a JSONL or CSV file into the catalog")
+parser.add_argument("path")
+parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+parser.add_argument("--batch-size", type=int, default=1000, help="rows per multi-row INSERT")
+parser.add_argument("--batches-per-transaction", type=int, default=20)
+args = parser.parse_args()
+
+engine = get_engine(settings.database_url)
+
+
+def report(progress):
+    print(f"  {progress.read} rows read, {progress.inserted} inserted ({progress.rows_per_second:,.0f} rows/sec)")
+
+
+result = import_prompts(
+    engine,
+    read_prompts(args.path, args.format),
+    batch_size=args.batch_size,
+    batches_per_transaction=args.batches_per_transaction,
+    progress=report,
+)
+
+print(
+    f"✅ Imported {result.inserted} prompts ({result.skipped} duplicates skipped) from {result.read} rows "
+    f"in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/sec)"
+)
@@ -0,0 +1,12 @@
+from app.db import get_engine
+from app.config import settings
+from app.migrations import upgrade
+
+engine = get_engine(settings.database_url)
+
+applied = upgrade(engine)
+
+for migration in applied:
+    print(f"Applied {migration.version:04d}: {migration.description}")
+
+print(f"✅ Schema up to date ({len(applied)} migrations applied)")
@@ -0,0 +1,15 @@
+import sys
+
+from app.db import get_engine
+from app.config import settings
+from app.execution.activity import rebuild_activity
+
+# Usage: python rebuild_session_activity.py [session_id ...]
+session_ids = [int(arg) for arg in sys.argv[1:]] or None
+
+engine = get_engine(settings.database_url)
+
+with engine.begin() as conn:
+    rebuilt = rebuild_activity(conn, session_ids)
+
+print(f"✅ Rebuilt activity for {rebuilt} sessions")
@@ -1,7 +1,6 @@
 from app.db import get_engine
 from app.config import settings
-from app.models.prompts import prompts
-from sqlalchemy import insert
+from app.prompt_import import import_prompts
 
 engine = get_engine(settings.database_url)
 
@@ -13,9 +12,6 @@ sample_prompts = [
     "Implement a function that finds the largest number in an array."
 ]
 
-with engine.connect() as conn:
-    for prompt_text in sample_prompts:
-        conn.execute(insert(prompts).values(text=prompt_text))
-    conn.commit()
+result = import_prompts(engine, sample_prompts)
     
-print(f"✅ Seeded {len(sample_prompts)} prompts")
\ No newline at end of file
+print(f"✅ Seeded {result.inserted} prompts ({result.skipped} already present)")
@@ -0,0 +1,98 @@
+"""
+Shared fixtures.
+
+Settings are read from the environment when app.config is first imported,
+so the test database and directories are configured here, before any test
+module imports the app. The environment overrides .env, which points at a
+development database.
+"""
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+_directory = tempfile.mkdtemp(prefix="cogniflow-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_directory, 'cogniflow.sqlite')}",
+    "SECRET_KEY": "test-secret",
+    "ENV": "development",
+    "ARCHIVE_DIR": os.path.join(_directory, "archive"),
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "1",
+    "EXECUTE_POOL_MIN_SIZE": "1",
+    "EXECUTE_POOL_MAX_SIZE": "2",
+})
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.config import settings
+from app.db import get_engine
+from app.migrations import upgrade
+from app.models.sessions import sessions
+from app.models.users import users
+
+_emails = count(1)
+_OTP = re.compile(r"\[DEV MODE\] OTP for (?P<email>\S+): (?P<code>\d{6})")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """The migrated test database, shared by every test."""
+    engine = get_engine(settings.database_url)
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def sign_up(client, capsys):
+    """Returns a function that signs up, verifies and logs in a fresh user, returning auth headers."""
+
+    def sign_up():
+        email = f"user{next(_emails)}@example.com"
+        assert client.post("/auth/signup", json={"email": email, "password": "pw"}).status_code == 200
+        code = next(match["code"] for match in _OTP.finditer(capsys.readouterr().out) if match["email"] == email)
+        assert client.post("/auth/verify-email", json={"email": email, "otp": code}).status_code == 200
+        token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return sign_up
+
+
+@pytest.fixture
+def auth_headers(sign_up):
+    return sign_up()
+
+
+@pytest.fixture
+def create_session(engine):
+    """Returns a function that inserts a session for a new user, started and ended days_ago days ago."""
+
+    def create_session(days_ago: float = 0, ended: bool = True, prompt_text: str = "Reverse a list") -> int:
+        started_at = datetime.utcnow() - timedelta(days=days_ago)
+        with engine.begin() as conn:
+            user_id = conn.execute(
+                insert(users).values(email=f"user{next(_emails)}@example.com", password_hash="x", is_verified=True)
+            ).inserted_primary_key[0]
+            return conn.execute(
+                insert(sessions).values(
+                    user_id=user_id,
+                    prompt_text=prompt_text,
+                    started_at=started_at,
+                    ended_at=started_at + timedelta(minutes=30) if ended else None,
+                )
+            ).inserted_primary_key[0]
+
+    return create_session
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from app import admission
+from app.admission import AdmissionController, AdmissionRejected, TokenBuckets, client_address
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _request(peer="10.0.0.1", forwarded=()):
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({"type": "http", "headers": headers, "client": (peer, 4321)})
+
+
+def test_token_bucket_allows_a_burst_then_refills(clock):
+    buckets = TokenBuckets(rate=2.0, burst=3)
+
+    assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a") == pytest.approx(0.5)
+    assert buckets.take("b") == 0
+    clock.now += 0.5
+    assert buckets.take("a") == 0
+
+
+def test_token_buckets_forget_the_least_recent_keys(clock):
+    buckets = TokenBuckets(rate=1.0, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        buckets.take(key)
+
+    assert len(buckets) == 2
+    assert buckets.take("a") == 0
+
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    (0, ["1.1.1.1"], "10.0.0.1"),
+    (1, [], "10.0.0.1"),
+    (1, ["6.6.6.6, 1.1.1.1"], "1.1.1.1"),
+    (2, ["6.6.6.6, 1.1.1.1", "172.16.0.2"], "1.1.1.1"),
+    (3, ["1.1.1.1"], "1.1.1.1"),
+])
+def test_client_address_skips_trusted_proxy_hops(hops, forwarded, expected):
+    assert client_address(_request(forwarded=forwarded), hops) == expected
+
+
+def test_controller_queues_then_sheds():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queued=1, queue_timeout=1.0, client_rate=100, client_burst=100)
+        held = await controller.acquire("a")
+        waiting = asyncio.ensure_future(controller.acquire("b"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as shed:
+            await controller.acquire("c")
+        controller.release(held)
+        handed_over = await waiting
+        controller.release(handed_over)
+        return controller, shed.value
+
+    controller, shed = asyncio.run(scenario())
+
+    assert shed.status_code == 503
+    assert controller.stats()["in_flight"] == 0
+    assert (controller.admitted, controller.queued, controller.shed) == (2, 1, 1)
+
+
+def test_controller_rate_limits_each_client():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=10, max_queued=10, queue_timeout=1.0, client_rate=0.5, client_burst=1)
+        controller.release(await controller.acquire("a"))
+        with pytest.raises(AdmissionRejected) as limited:
+            await controller.acquire("a")
+        controller.release(await controller.acquire("b"))
+        return limited.value
+
+    limited = asyncio.run(scenario())
+
+    assert limited.status_code == 429
+    assert limited.retry_after > 0
@@ -0,0 +1,110 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.analytics import load_cohort, session_signals, summarize
+from app.config import settings
+from app.execution.archive import archive_sessions
+from app.execution.recording import _write_run
+from app.models.sessions import sessions
+from app.signal_engine import SIGNALS, build_signals, signals_query
+
+ERROR = "Traceback (most recent call last):\nZeroDivisionError: division by zero"
+
+
+@pytest.fixture
+def cohort(engine, create_session, request):
+    """
+    A prompt with three sessions: one without runs, one with two clean runs
+    and one that errors on its second run and runs again after.
+    """
+    prompt_text = f"Cohort prompt {request.node.name}"
+
+    def create(days_ago=0):
+        ids = [create_session(days_ago=days_ago, prompt_text=prompt_text) for _ in range(3)]
+        with engine.begin() as conn:
+            started = dict(conn.execute(select(sessions.c.id, sessions.c.started_at).where(sessions.c.id.in_(ids))).all())
+            for minutes in (2, 5):
+                _write_run(conn, ids[1], started[ids[1]] + timedelta(minutes=minutes), None, [], None)
+            for minutes, errors in ((1, []), (3, [ERROR]), (8, [])):
+                executed_at = started[ids[2]] + timedelta(minutes=minutes)
+                _write_run(conn, ids[2], executed_at, executed_at if errors else None, errors, None)
+        return prompt_text, ids
+
+    return create
+
+
+def test_session_signals_match_build_signals(engine, cohort):
+    prompt_text, ids = cohort()
+
+    with engine.connect() as conn:
+        events = load_cohort(conn, prompt_text=prompt_text)
+        rows = {row.id: row for row in conn.execute(signals_query().where(sessions.c.id.in_(ids)))}
+    values = session_signals(events)
+
+    assert list(events.session_ids) == ids
+    for index, session_id in enumerate(ids):
+        shown = {signal.key: signal.value for signal in build_signals(rows[session_id])}
+        for key in {definition.key for definition in SIGNALS}:
+            value = values[key][index]
+            if key in shown:
+                assert value == shown[key], key
+            else:
+                assert not value or math.isnan(value), key
+
+
+def test_summary_totals_and_shares(engine, cohort):
+    prompt_text, _ = cohort()
+
+    with engine.connect() as conn:
+        summary = summarize(load_cohort(conn, prompt_text=prompt_text), bins=4)
+
+    assert (summary["sessions"], summary["runs"], summary["errors"]) == (3, 5, 1)
+    assert summary["error_rate"] == pytest.approx(0.2)
+    assert summary["shares"] == pytest.approx({
+        "ran_code": 2 / 3,
+        "repeated_execution": 2 / 3,
+        "errors_present": 1 / 3,
+        "error_followed_by_run": 1 / 3,
+    })
+    time_to_first_run = summary["distributions"]["time_to_first_run_minutes"]
+    assert time_to_first_run["count"] == 2
+    assert time_to_first_run["mean"] == pytest.approx(1.5)
+    assert sum(time_to_first_run["histogram"]["counts"]) == 2
+
+
+def test_runs_with_several_errors_count_once(engine, create_session):
+    session_id = create_session(prompt_text="Cohort prompt with a batch run")
+    with engine.begin() as conn:
+        started = conn.execute(select(sessions.c.started_at).where(sessions.c.id == session_id)).scalar()
+        _write_run(conn, session_id, started, started, [ERROR, ERROR], None)
+
+    with engine.connect() as conn:
+        summary = summarize(load_cohort(conn, prompt_text="Cohort prompt with a batch run"))
+
+    assert (summary["runs"], summary["errors"]) == (1, 2)
+
+
+def test_archived_sessions_are_read_back_from_the_archive(engine, cohort):
+    prompt_text, _ = cohort(days_ago=400)
+    with engine.connect() as conn:
+        before = summarize(load_cohort(conn, prompt_text=prompt_text))
+
+    archive_sessions(engine, settings.archive_dir, timedelta(days=200))
+
+    with engine.connect() as conn:
+        assert summarize(load_cohort(conn, prompt_text=prompt_text, archive_dir=settings.archive_dir)) == before
+        assert summarize(load_cohort(conn, prompt_text=prompt_text))["runs"] == 0
+
+
+def test_cohort_endpoint_requires_a_filter(client, auth_headers, cohort):
+    prompt_text, _ = cohort()
+
+    assert client.get("/analytics/cohort", headers=auth_headers).status_code == 400
+    response = client.get("/analytics/cohort", params={"prompt_text": prompt_text}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["sessions"] == 3
+    started_after = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    assert client.get("/analytics/cohort", params={"started_after": started_after}, headers=auth_headers).json()["sessions"] == 0
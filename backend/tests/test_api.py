@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.execution.archive import archive_sessions
+from app.models.sessions import sessions
+
+ARCHIVED_AGE = timedelta(days=400)
+
+
+def _start_session(client, headers, prompt_text="Reverse a list"):
+    response = client.post("/sessions/start", json={"prompt_text": prompt_text}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["session_id"]
+
+
+def _signals(client, headers, session_id):
+    response = client.get(f"/sessions/{session_id}/signals", headers=headers)
+    assert response.status_code == 200
+    return {signal["key"]: signal["value"] for signal in response.json()["signals"]}
+
+
+def test_login_requires_a_verified_email(client):
+    client.post("/auth/signup", json={"email": "unverified@example.com", "password": "pw"})
+
+    response = client.post("/auth/login", json={"email": "unverified@example.com", "password": "pw"})
+
+    assert response.status_code == 403
+
+
+def test_session_signals_follow_its_runs(client, auth_headers):
+    session_id = _start_session(client, auth_headers)
+
+    assert client.post("/execute", json={"session_id": session_id, "code": "print(6 * 7)"}, headers=auth_headers).json() == {
+        "output": "42\n",
+        "error": False,
+    }
+    failed = client.post("/execute", json={"session_id": session_id, "code": "1 / 0"}, headers=auth_headers).json()
+    assert failed["error"] is True
+    assert "ZeroDivisionError" in failed["output"]
+    client.post("/execute", json={"session_id": session_id, "code": "print(1)"}, headers=auth_headers)
+    assert client.post("/sessions/end", json={"session_id": session_id}, headers=auth_headers).status_code == 200
+
+    signals = _signals(client, auth_headers, session_id)
+    assert signals["run_count"] == 3
+    assert signals["errors_present"] is True
+    assert signals["error_followed_by_run"] is True
+
+
+def test_sessions_are_private_to_their_owner(client, auth_headers, sign_up):
+    session_id = _start_session(client, auth_headers)
+    other_headers = sign_up()
+
+    assert client.post("/execute", json={"session_id": session_id, "code": "print(1)"}, headers=other_headers).status_code == 403
+    assert client.get(f"/sessions/{session_id}/signals", headers=other_headers).status_code == 403
+    assert client.post("/execute", json={"session_id": session_id, "code": "print(1)"}).status_code == 401
+
+
+def test_session_costs_total_recorded_usage(client, auth_headers):
+    session_id = _start_session(client, auth_headers)
+    for _ in range(2):
+        client.post("/execute", json={"session_id": session_id, "code": "sum(range(10000))"}, headers=auth_headers)
+
+    body = client.get(f"/analytics/costs/sessions/{session_id}", headers=auth_headers).json()
+
+    assert body["archived"] is False
+    assert body["costs"]["runs"] == 2
+    assert body["costs"]["measured_runs"] == 2
+    assert body["costs"]["cpu_seconds"] > 0
+
+
+def test_archived_sessions_keep_signals_but_lose_costs(client, auth_headers, engine):
+    session_id = _start_session(client, auth_headers)
+    for code in ("1 / 0", "print(1)"):
+        client.post("/execute", json={"session_id": session_id, "code": code}, headers=auth_headers)
+    client.post("/sessions/end", json={"session_id": session_id}, headers=auth_headers)
+    signals = _signals(client, auth_headers, session_id)
+    with engine.begin() as conn:
+        started_at, ended_at = conn.execute(
+            select(sessions.c.started_at, sessions.c.ended_at).where(sessions.c.id == session_id)
+        ).one()
+        conn.execute(
+            update(sessions)
+            .where(sessions.c.id == session_id)
+            .values(started_at=started_at - ARCHIVED_AGE, ended_at=ended_at - ARCHIVED_AGE)
+        )
+
+    archive_sessions(engine, settings.archive_dir, ARCHIVED_AGE / 2)
+
+    archived = _signals(client, auth_headers, session_id)
+    # Only the session was moved back in time, not its runs.
+    del signals["time_to_first_run_minutes"], archived["time_to_first_run_minutes"]
+    assert archived == signals
+    body = client.get(f"/analytics/costs/sessions/{session_id}", headers=auth_headers).json()
+    assert body["archived"] is True
+    assert body["costs"]["runs"] == 0
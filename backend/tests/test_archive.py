@@ -0,0 +1,143 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.execution import archive
+from app.execution.archive import BLOCK_ROWS, ArchiveStore, archive_sessions, write_segment
+from app.execution.fingerprints import fingerprint
+from app.execution.recording import record_run
+from app.models.events import error_events, error_fingerprints, run_events
+from app.models.sessions import sessions
+
+DAY = date(2024, 3, 1)
+STARTED_AT = datetime(2024, 3, 1, 9, 30)
+ARCHIVE_AFTER = timedelta(days=30)
+
+
+def _runs(session_id, first_run_id, count):
+    return [(session_id, first_run_id + n, STARTED_AT + timedelta(seconds=n, microseconds=n)) for n in range(count)]
+
+
+def test_segment_round_trip(tmp_path):
+    runs = _runs(7, 1, BLOCK_ROWS + 10) + _runs(3, 100000, 2)
+    errors = [
+        (7, 5, STARTED_AT + timedelta(seconds=5), 11, "Traceback ...\nZeroDivisionError: division by zero"),
+        (7, BLOCK_ROWS + 5, STARTED_AT, None, None),
+        (3, 100001, STARTED_AT, 12, "ValueError: é ✓ \udcff"),
+    ]
+    path = write_segment(str(tmp_path), DAY, runs, errors)
+    store = ArchiveStore(str(tmp_path))
+
+    for session_id in (7, 3):
+        session_runs, session_errors = store.session_events(session_id, STARTED_AT)
+        assert session_runs == [run[1:] for run in runs if run[0] == session_id]
+        assert session_errors == [error[1:] for error in errors if error[0] == session_id]
+    assert store.session_events(5, STARTED_AT) == ([], [])
+    assert os.path.basename(path).startswith(f"events-{DAY.isoformat()}-")
+    store.close()
+
+
+def test_segment_rejects_other_files(tmp_path):
+    path = tmp_path / f"events-{DAY.isoformat()}-1.cfa"
+    path.write_bytes(b"not a segment")
+
+    with pytest.raises(ValueError):
+        ArchiveStore(str(tmp_path)).session_events(1, STARTED_AT)
+
+
+def test_events_archived_twice_are_read_once(tmp_path):
+    """A crash between writing segments and deleting the live rows archives a batch again."""
+    runs = _runs(1, 1, 3)
+    errors = [(1, 2, runs[1][2], 4, "boom")]
+    write_segment(str(tmp_path), DAY, runs, errors)
+    write_segment(str(tmp_path), DAY, runs, errors)
+
+    activity = ArchiveStore(str(tmp_path)).activity(1, STARTED_AT)
+
+    assert (activity.run_count, activity.error_count, activity.runs_after_first_error) == (3, 1, 1)
+
+
+def _live_counts(engine, session_id):
+    with engine.connect() as conn:
+        runs = conn.execute(select(func.count()).where(run_events.c.session_id == session_id)).scalar()
+        errors = conn.execute(
+            select(func.count())
+            .select_from(error_events.join(run_events, run_events.c.id == error_events.c.run_id))
+            .where(run_events.c.session_id == session_id)
+        ).scalar()
+    return runs, errors
+
+
+def _fingerprint_counts(engine, message):
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(error_fingerprints.c.occurrences, error_fingerprints.c.archived_occurrences)
+            .where(error_fingerprints.c.digest == fingerprint(message).digest)
+        ).one()
+    return tuple(row)
+
+
+def test_archive_moves_events_and_fingerprint_references(engine, create_session, tmp_path):
+    session_id = create_session(days_ago=40)
+    message = "Traceback (most recent call last):\nNameError: name 'archived_only' is not defined"
+    record_run(engine, session_id, "")
+    record_run(engine, session_id, message)
+    assert _fingerprint_counts(engine, message) == (1, 0)
+
+    totals = archive_sessions(engine, str(tmp_path), ARCHIVE_AFTER)
+
+    assert totals["runs"] >= 2
+    assert _live_counts(engine, session_id) == (0, 0)
+    assert _fingerprint_counts(engine, message) == (0, 1)
+    with engine.connect() as conn:
+        started_at, archived_at = conn.execute(
+            select(sessions.c.started_at, sessions.c.archived_at).where(sessions.c.id == session_id)
+        ).one()
+    assert archived_at is not None
+    runs, errors = ArchiveStore(str(tmp_path)).session_events(session_id, started_at)
+    assert len(runs) == 2
+    assert [error[3] for error in errors] == [message]
+
+
+def test_failed_archive_commit_removes_its_segments(engine, create_session, tmp_path):
+    session_id = create_session(days_ago=40)
+    record_run(engine, session_id, "ValueError: boom")
+
+    def fail_commit(conn):
+        raise RuntimeError("commit failed")
+
+    event.listen(engine, "commit", fail_commit)
+    try:
+        with pytest.raises(RuntimeError):
+            archive_sessions(engine, str(tmp_path), ARCHIVE_AFTER)
+    finally:
+        event.remove(engine, "commit", fail_commit)
+
+    assert os.listdir(tmp_path) == []
+    assert _live_counts(engine, session_id) == (1, 1)
+
+    archive_sessions(engine, str(tmp_path), ARCHIVE_AFTER)
+
+    assert len(os.listdir(tmp_path)) >= 1
+    assert _live_counts(engine, session_id) == (0, 0)
+
+
+def test_recent_and_open_sessions_are_not_archived(engine, create_session, tmp_path):
+    recent = create_session(days_ago=1)
+    still_open = create_session(days_ago=40, ended=False)
+    for session_id in (recent, still_open):
+        record_run(engine, session_id, "")
+
+    archive_sessions(engine, str(tmp_path), ARCHIVE_AFTER)
+
+    assert _live_counts(engine, recent) == (1, 0)
+    assert _live_counts(engine, still_open) == (1, 0)
+
+
+def test_archive_store_is_shared_per_directory(tmp_path):
+    store = archive.get_archive_store(str(tmp_path))
+
+    assert archive.get_archive_store(str(tmp_path)) is store
+    assert archive.get_archive_store(str(tmp_path / "other")) is not store
@@ -0,0 +1,106 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.execution.buffer import SPILL_PREFIX, SPILL_SUFFIX, EventBuffer
+from app.execution.usage import ResourceUsage, usage_columns
+from app.models.events import error_events, run_events
+
+
+def _buffer(engine, spill_dir, max_events=1000):
+    # A long flush interval keeps the background thread from flushing mid-test.
+    return EventBuffer(lambda: engine, max_events=max_events, flush_interval=3600, spill_dir=str(spill_dir))
+
+
+def _counts(engine, session_id):
+    with engine.connect() as conn:
+        runs = conn.execute(select(func.count()).where(run_events.c.session_id == session_id)).scalar()
+        errors = conn.execute(
+            select(func.count())
+            .select_from(error_events.join(run_events, run_events.c.id == error_events.c.run_id))
+            .where(run_events.c.session_id == session_id)
+        ).scalar()
+    return runs, errors
+
+
+def _spilled(spill_dir):
+    return sorted(path.name for path in spill_dir.iterdir() if path.name.startswith(SPILL_PREFIX))
+
+
+def test_flush_writes_runs_errors_and_usage(engine, create_session, tmp_path):
+    session_id = create_session()
+    buffer = _buffer(engine, tmp_path)
+    buffer.start()
+    now = datetime.utcnow()
+    buffer.add(session_id, now, None, None, ResourceUsage(wall_seconds=0.5, cpu_user_seconds=0.25, cpu_system_seconds=0.0, max_rss_kb=1024))
+    buffer.add(session_id, now, "ValueError: boom", now)
+
+    assert buffer.flush() == 2
+
+    assert _counts(engine, session_id) == (2, 1)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.sum(run_events.c.wall_seconds)).where(run_events.c.session_id == session_id)).scalar() == 0.5
+    buffer.close()
+    assert _spilled(tmp_path) == []
+
+
+def test_unflushed_events_are_replayed_after_a_crash(engine, create_session, tmp_path):
+    session_id = create_session()
+    crashed = _buffer(engine, tmp_path)
+    crashed.start()
+    crashed.add(session_id, datetime.utcnow(), None, None)
+    crashed.add(session_id, datetime.utcnow(), "ValueError: lost?", datetime.utcnow())
+    # The process dies here: nothing is flushed and the segment stays on disk.
+    crashed._closed = True
+    assert _spilled(tmp_path)
+    assert _counts(engine, session_id) == (0, 0)
+
+    recovered = _buffer(engine, tmp_path)
+    recovered.start()
+
+    assert _counts(engine, session_id) == (2, 1)
+    recovered.close()
+    assert _spilled(tmp_path) == []
+
+
+def test_torn_final_line_is_skipped_on_recovery(engine, create_session, tmp_path):
+    session_id = create_session()
+    event = {
+        "session_id": session_id,
+        "executed_at": datetime.utcnow().isoformat(),
+        "error_message": None,
+        "occurred_at": None,
+        **usage_columns(None),
+    }
+    # A crash mid-write leaves a partial last line that was never acknowledged.
+    (tmp_path / f"{SPILL_PREFIX}{7:012d}{SPILL_SUFFIX}").write_text(json.dumps(event) + "\n" + json.dumps(event)[:20])
+
+    buffer = _buffer(engine, tmp_path)
+    buffer.start()
+
+    assert _counts(engine, session_id) == (1, 0)
+    buffer.add(session_id, datetime.utcnow(), None, None)
+    assert _spilled(tmp_path) == [f"{SPILL_PREFIX}{8:012d}{SPILL_SUFFIX}"]
+    buffer.close()
+
+
+def test_failed_flush_keeps_events_and_segments(engine, create_session, tmp_path):
+    session_id = create_session()
+    failing = {"engine": None}
+    buffer = EventBuffer(lambda: failing["engine"], max_events=1000, flush_interval=3600, spill_dir=str(tmp_path))
+    buffer.start()
+    buffer.add(session_id, datetime.utcnow(), None, None)
+
+    with pytest.raises(Exception):
+        buffer.flush()
+
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["failed_flushes"] == 1
+    failing["engine"] = engine
+    buffer.add(session_id, datetime.utcnow(), None, None)
+    assert buffer.flush() == 2
+    assert _counts(engine, session_id) == (2, 0)
+    buffer.close()
+    assert _spilled(tmp_path) == []
@@ -0,0 +1,156 @@
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.execution import cache as cache_module
+from app.execution.cache import ResultCache, is_cacheable, is_deterministic, run_code_cached
+from app.execution.runner import TIMEOUT_MESSAGE, ExecutionResult
+from app.models.events import error_events, run_events
+from app.routes.execute import execute_and_record
+
+
+@pytest.mark.parametrize("code, deterministic", [
+    ("print(sum(range(10)))", True),
+    ("def f(x):\n    return x * 2\nprint(f(21))", True),
+    ("print(sorted([3, 1, 2]))", True),
+    ("print(", True),
+    ("import random\nprint(random.random())", False),
+    ("from os import path", False),
+    ("print({'a', 'b'})", False),
+    ("print(id(1))", False),
+    ("print(object())", False),
+    ("class A: pass\nprint(A())", False),
+    ("print(lambda: 0)", False),
+    ("print(vars())", False),
+    ("print(globals())", False),
+    ("print(locals())", False),
+    ("print(dir())", False),
+    ("print((1).__class__.__subclasses__)", False),
+])
+def test_is_deterministic(code, deterministic):
+    assert is_deterministic(code) is deterministic
+
+
+@pytest.mark.parametrize("result, cacheable", [
+    (ExecutionResult(stdout="42\n", stderr=""), True),
+    (ExecutionResult(stdout="", stderr="ZeroDivisionError: division by zero"), True),
+    (ExecutionResult(stdout="0x10\n", stderr=""), True),
+    (ExecutionResult(stdout="<function f at 0x7f3a2c1b9e40>\n", stderr=""), False),
+    (ExecutionResult(stdout="", stderr="<generator object g at 0x7f3a2c1b9e40>"), False),
+    (ExecutionResult(stdout="", stderr=TIMEOUT_MESSAGE), False),
+])
+def test_is_cacheable(result, cacheable):
+    assert is_cacheable(result) is cacheable
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Stubs execution with an echo of the code, recording each run."""
+    runs = []
+
+    def run_code(code):
+        runs.append(code)
+        return ExecutionResult(stdout=code, stderr="")
+
+    monkeypatch.setattr(cache_module, "run_code", run_code)
+    return runs
+
+
+def test_repeated_code_is_served_from_the_cache(runs):
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60, version="test")
+
+    assert cache.run("print(1)").stdout == "print(1)"
+    assert cache.run("print(1)").stdout == "print(1)"
+
+    assert runs == ["print(1)"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_nondeterministic_code_is_not_cached(runs):
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60, version="test")
+
+    cache.run("print(object())")
+    cache.run("print(object())")
+
+    assert len(runs) == 2
+    assert cache.stats()["skipped"] == 2
+
+
+def test_output_with_addresses_is_not_stored(monkeypatch):
+    monkeypatch.setattr(cache_module, "run_code", lambda code: ExecutionResult(stdout="<function f at 0x7f3a2c1b9e40>\n", stderr=""))
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60, version="test")
+
+    cache.run("def f(): pass\nprint(f)")
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ResultCache(max_bytes=10, ttl_seconds=60, version="test")
+    cache.put("a", ExecutionResult(stdout="aaaa", stderr=""))
+    cache.put("b", ExecutionResult(stdout="bbbb", stderr=""))
+    cache.get("a")
+
+    cache.put("c", ExecutionResult(stdout="cccc", stderr=""))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_results_larger_than_the_cache_are_not_stored():
+    cache = ResultCache(max_bytes=4, ttl_seconds=60, version="test")
+
+    cache.put("a", ExecutionResult(stdout="too long", stderr=""))
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResultCache(max_bytes=1024, ttl_seconds=0.05, version="test")
+    cache.put("a", ExecutionResult(stdout="a", stderr=""))
+
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_interpreter_version_is_part_of_the_key():
+    assert ResultCache(1024, 60, "3.11").key("print(1)") != ResultCache(1024, 60, "3.12").key("print(1)")
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60, version="test")
+    monkeypatch.setattr(cache_module, "_cache", cache)
+    return cache
+
+
+def test_bypass_runs_and_does_not_store(runs, result_cache):
+    run_code_cached("print(1)", bypass_cache=True)
+    run_code_cached("print(1)", bypass_cache=True)
+
+    assert len(runs) == 2
+    assert result_cache.stats()["entries"] == 0
+
+
+def test_cache_hits_still_record_run_and_error_events(result_cache, engine, create_session):
+    session_id = create_session()
+
+    first = execute_and_record(engine, session_id, "1 / 0")
+    second = execute_and_record(engine, session_id, "1 / 0")
+
+    assert second == first
+    assert result_cache.stats()["hits"] == 1
+    with engine.connect() as conn:
+        run_count = conn.execute(select(func.count()).where(run_events.c.session_id == session_id)).scalar()
+        error_count = conn.execute(
+            select(func.count())
+            .select_from(error_events.join(run_events, error_events.c.run_id == run_events.c.id))
+            .where(run_events.c.session_id == session_id)
+        ).scalar()
+    assert (run_count, error_count) == (2, 2)
@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.execution.fingerprints import (
+    COMPRESSED,
+    NONE,
+    TEXT,
+    decode_error_message,
+    encode_error_message,
+    fingerprint,
+    release_fingerprints,
+    resolve_fingerprints,
+)
+from app.models.events import error_fingerprints
+
+
+def _traceback(line, message):
+    return (
+        "Traceback (most recent call last):\n"
+        f'  File "<string>", line {line}, in <module>\n'
+        f"{message}\n"
+    )
+
+
+def test_fingerprint_ignores_values_that_vary_between_runs():
+    first = fingerprint(_traceback(3, "KeyError: 'alice'"))
+    second = fingerprint(_traceback(3, "KeyError: 'bob'"))
+
+    assert first == second
+    assert (first.exception_type, first.location, first.message) == ("KeyError", "<string>:3:<module>", "'?'")
+    assert fingerprint(_traceback(4, "KeyError: 'alice'")).digest != first.digest
+    assert fingerprint(_traceback(3, "ValueError: 'alice'")).digest != first.digest
+
+
+def test_output_that_is_not_a_traceback_is_keyed_on_its_last_line():
+    printed = fingerprint("progress 10%\nsomething went wrong at 0x7f00\n")
+
+    assert (printed.exception_type, printed.location, printed.message) == ("", None, "something went wrong at 0x?")
+
+
+@pytest.mark.parametrize("storage", [TEXT, COMPRESSED])
+def test_error_message_round_trip(storage):
+    stderr = _traceback(1, "UnicodeError: é ✓ \udcff")
+
+    assert decode_error_message(SimpleNamespace(**encode_error_message(stderr, storage))) == stderr
+
+
+def test_error_message_storage_none_keeps_nothing():
+    assert decode_error_message(SimpleNamespace(**encode_error_message("boom", NONE))) is None
+    with pytest.raises(ValueError):
+        encode_error_message("boom", "gzip")
+
+
+def _counts(conn, fingerprint_id):
+    row = conn.execute(
+        select(error_fingerprints.c.occurrences, error_fingerprints.c.archived_occurrences)
+        .where(error_fingerprints.c.id == fingerprint_id)
+    ).first()
+    return tuple(row) if row else None
+
+
+def test_references_are_counted_and_released(engine):
+    message = _traceback(9, "IndexError: list index out of range in fingerprint test")
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        ids = resolve_fingerprints(conn, [message, message, message], [now] * 3)
+        assert len(set(ids)) == 1
+        fingerprint_id = ids[0]
+        assert _counts(conn, fingerprint_id) == (3, 0)
+
+        release_fingerprints(conn, [fingerprint_id], archived=True)
+        assert _counts(conn, fingerprint_id) == (2, 1)
+        release_fingerprints(conn, [fingerprint_id, fingerprint_id])
+        assert _counts(conn, fingerprint_id) == (0, 1)
+
+        conn.execute(
+            error_fingerprints.update()
+            .where(error_fingerprints.c.id == fingerprint_id)
+            .values(archived_occurrences=0)
+        )
+        release_fingerprints(conn, [fingerprint_id, None])
+        assert _counts(conn, fingerprint_id) is None
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from app.execution.jobs import COMPLETED, FAILED, JobQueue, QueueFullError
+
+
+def _queue(handler, max_in_flight=1, max_queued_per_user=10, result_ttl_seconds=60.0):
+    return JobQueue(handler, max_in_flight=max_in_flight, max_queued_per_user=max_queued_per_user, result_ttl_seconds=result_ttl_seconds)
+
+
+def test_users_are_drained_round_robin():
+    order = []
+    queue = _queue(lambda job: order.append((job.user_id, job.code)))
+    jobs = [queue.submit(1, 1, f"a{n}") for n in range(3)] + [queue.submit(2, 2, "b0")]
+
+    queue.start()
+    for job in jobs:
+        job.future.result(5)
+    queue.close()
+
+    assert order == [(1, "a0"), (2, "b0"), (1, "a1"), (1, "a2")]
+
+
+def test_per_user_queue_is_bounded():
+    queue = _queue(lambda job: None, max_queued_per_user=2)
+    queue.submit(1, 1, "a")
+    queue.submit(1, 1, "b")
+
+    with pytest.raises(QueueFullError):
+        queue.submit(1, 1, "c")
+    queue.submit(2, 2, "d")
+    queue.close()
+
+
+def test_handler_errors_fail_the_job():
+    def handler(job):
+        raise ValueError("boom")
+
+    queue = _queue(handler)
+    queue.start()
+    job = queue.submit(1, 1, "x")
+
+    with pytest.raises(ValueError):
+        job.future.result(5)
+    assert job.status == FAILED
+    queue.close()
+
+
+def test_finished_jobs_expire_after_the_ttl():
+    queue = _queue(lambda job: job.code, result_ttl_seconds=0.1)
+    queue.start()
+    job = queue.submit(1, 1, "x")
+    assert job.future.result(5) == "x"
+    assert job.status == COMPLETED
+    assert queue.get(job.id) is job
+
+    time.sleep(0.25)
+
+    assert queue.get(job.id) is None
+    assert queue.stats()["retained"] == 0
+    queue.close()
+
+
+def test_close_fails_jobs_still_queued():
+    queue = _queue(lambda job: None)
+    job = queue.submit(1, 1, "x")
+
+    queue.close()
+
+    assert job.status == FAILED
+    with pytest.raises(RuntimeError):
+        job.future.result(0)
@@ -0,0 +1,88 @@
+import resource
+import subprocess
+
+import pytest
+
+from app.execution import usage
+from app.execution.pool import InterpreterPool
+from app.execution.rlimits import set_soft_limits
+from app.execution.runner import PYTHON_COMMAND, run_in_subprocess
+from app.execution.streaming import STDERR, STDOUT, stream_subprocess
+from app.execution.usage import CPU_LIMIT_MESSAGE, ResourceLimits
+
+MEMORY_BYTES = 512 * 1024 * 1024
+SPIN_CPU = "import time\nstart = time.process_time()\nwhile time.process_time() - start < 0.6: pass\nprint('done')"
+PRINT_LIMITS = "import resource\nprint(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_AS)[0])"
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    limits = ResourceLimits(cpu_seconds=1, memory_bytes=MEMORY_BYTES)
+    monkeypatch.setattr(usage, "_limits", limits)
+    return limits
+
+
+@pytest.fixture
+def pool(limits):
+    pool = InterpreterPool(min_size=1, max_size=1, max_runs=50, timeout=5)
+    pool.start()
+    yield pool
+    pool.close()
+
+
+def test_subprocess_runs_under_the_limits(limits):
+    result = run_in_subprocess(PRINT_LIMITS)
+
+    assert result.stdout == f"1 {MEMORY_BYTES}\n"
+    assert result.usage.cpu_user_seconds is not None
+
+
+def test_subprocess_over_the_cpu_limit_is_stopped(limits):
+    result = run_in_subprocess("while True: pass")
+
+    assert result.stderr.endswith(CPU_LIMIT_MESSAGE.format(1))
+
+
+def test_subprocess_over_the_memory_limit_gets_memory_error(limits):
+    assert run_in_subprocess("bytearray(1024 ** 3)").stderr.rstrip().endswith("MemoryError")
+
+
+def test_streamed_subprocess_runs_under_the_limits(limits):
+    chunks = list(stream_subprocess(PRINT_LIMITS, max_output_bytes=1000))
+
+    assert "".join(text for kind, text in chunks if kind == STDOUT) == f"1 {MEMORY_BYTES}\n"
+    assert not [text for kind, text in chunks if kind == STDERR]
+
+
+def test_pooled_jobs_each_get_the_full_cpu_allowance(pool):
+    # Together over the 1 second limit; RLIMIT_CPU counts the worker's lifetime.
+    for _ in range(2):
+        assert pool.run(SPIN_CPU).stdout == "done\n"
+    assert pool.stats()["spawned"] == 1
+    assert pool.run("while True: pass").stderr.endswith(CPU_LIMIT_MESSAGE.format(1))
+
+
+def test_pooled_jobs_run_under_the_memory_limit(pool):
+    assert pool.run(PRINT_LIMITS).stdout.split()[1] == str(MEMORY_BYTES)
+    assert pool.run("bytearray(1024 ** 3)").stderr.rstrip().endswith("MemoryError")
+    assert pool.run("print('still here')").stdout == "still here\n"
+
+
+def test_unlimited_raises_soft_limits_back_to_hard():
+    before = {name: resource.getrlimit(name) for name in (resource.RLIMIT_CPU, resource.RLIMIT_AS)}
+    hard = before[resource.RLIMIT_AS][1]
+    try:
+        set_soft_limits(0, 0, MEMORY_BYTES)
+        assert resource.getrlimit(resource.RLIMIT_AS) == (MEMORY_BYTES if hard == resource.RLIM_INFINITY else min(MEMORY_BYTES, hard), hard)
+        set_soft_limits(0, 0, 0)
+        assert resource.getrlimit(resource.RLIMIT_AS) == (hard, hard)
+    finally:
+        for name, limit in before.items():
+            resource.setrlimit(name, limit)
+
+
+def test_limits_ignore_a_process_that_already_exited():
+    process = subprocess.Popen([PYTHON_COMMAND, "-c", "pass"])
+    process.wait()
+
+    ResourceLimits(cpu_seconds=1).apply_to_child(process)
@@ -0,0 +1,68 @@
+import pytest
+
+from app import metrics
+from app.metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(seconds, '/a "quoted"\\path')
+
+    lines = histogram.render()
+
+    label = 'route="/a \\"quoted\\"\\\\path"'
+    assert lines[2:] == [
+        f'latency_seconds_bucket{{{label},le="0.1"}} 1',
+        f'latency_seconds_bucket{{{label},le="1.0"}} 3',
+        f'latency_seconds_bucket{{{label},le="+Inf"}} 4',
+        f"latency_seconds_sum{{{label}}} 4.25",
+        f"latency_seconds_count{{{label}}} 4",
+    ]
+
+
+def test_span_does_not_observe_when_disabled(monkeypatch):
+    histogram = Histogram("span_seconds", "Span.", ["name"])
+    monkeypatch.setattr(metrics, "enabled", False)
+
+    with metrics.span(histogram, "off"):
+        pass
+
+    assert histogram.render()[2:] == []
+
+
+@pytest.fixture
+def collectors(monkeypatch):
+    monkeypatch.setattr(metrics, "_collectors", {})
+
+
+def test_collectors_expose_numeric_values_only(collectors):
+    metrics.register_collector("queue", lambda: {"depth": 3, "ratio": 0.5, "open": True, "name": "x"})
+
+    def broken():
+        raise RuntimeError("not started")
+
+    metrics.register_collector("broken", broken)
+
+    rendered = metrics.render()
+
+    assert "cogniflow_queue_depth 3\n" in rendered
+    assert "cogniflow_queue_ratio 0.5\n" in rendered
+    assert "cogniflow_queue_open" not in rendered
+    assert "cogniflow_queue_name" not in rendered
+    assert "cogniflow_broken" not in rendered
+
+
+def test_endpoint_reports_requests_and_queries_by_route_template(client, auth_headers):
+    session_id = client.post("/sessions/start", json={"prompt_text": "Reverse a list"}, headers=auth_headers).json()["session_id"]
+    client.get(f"/sessions/{session_id}/signals", headers=auth_headers)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'cogniflow_http_request_duration_seconds_count{method="GET",route="/sessions/{session_id}/signals",status="200"}' in body
+    assert 'cogniflow_db_query_duration_seconds_count{route="/sessions/start",statement="INSERT"}' in body
+    assert "cogniflow_db_pool_" in body
+    assert f"/sessions/{session_id}/signals" not in body
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, inspect, select
+
+from app.execution.fingerprints import decode_error_message
+from app.migrations import MIGRATIONS, baseline_metadata, fingerprint_error_events, metadata, upgrade
+from app.models.activity import session_activity
+from app.models.events import error_events, error_fingerprints
+
+STARTED_AT = datetime(2024, 3, 1, 9, 30)
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def _engine(tmp_path, name):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_fresh_database_matches_the_models(tmp_path):
+    migrated = _engine(tmp_path, "migrated.sqlite")
+    modelled = _engine(tmp_path, "modelled.sqlite")
+
+    applied = upgrade(migrated)
+    metadata.create_all(modelled)
+
+    assert [migration.version for migration in applied] == list(range(1, len(MIGRATIONS) + 1))
+    assert _schema(migrated) == _schema(modelled)
+
+
+def test_upgrade_is_idempotent(tmp_path):
+    engine = _engine(tmp_path, "twice.sqlite")
+    upgrade(engine)
+
+    assert upgrade(engine) == []
+
+
+def test_baseline_database_is_upgraded_with_its_data(tmp_path):
+    engine = _engine(tmp_path, "baseline.sqlite")
+    baseline_metadata.create_all(engine)
+    tables = baseline_metadata.tables
+    message = "Traceback (most recent call last):\nValueError: invalid literal 12"
+    with engine.begin() as conn:
+        conn.execute(insert(tables["users"]).values(id=1, email="old@example.com", password_hash="x", is_verified=True, created_at=STARTED_AT))
+        conn.execute(insert(tables["sessions"]).values(id=1, user_id=1, prompt_text="p", started_at=STARTED_AT))
+        conn.execute(insert(tables["prompts"]).values(text="Reverse a list", created_at=STARTED_AT))
+        for run_id in (1, 2, 3):
+            conn.execute(insert(tables["run_events"]).values(id=run_id, session_id=1, executed_at=STARTED_AT + timedelta(minutes=run_id)))
+        conn.execute(insert(tables["error_events"]).values(run_id=2, error_message=message, occurred_at=STARTED_AT + timedelta(minutes=2)))
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        activity = conn.execute(select(session_activity).where(session_activity.c.session_id == 1)).one()
+        error = conn.execute(select(error_events)).one()
+        occurrences, archived = conn.execute(
+            select(error_fingerprints.c.occurrences, error_fingerprints.c.archived_occurrences)
+        ).one()
+        prompt_hash = conn.execute(select(metadata.tables["prompts"].c.text_hash)).scalar()
+    assert (activity.run_count, activity.error_count, activity.runs_after_first_error) == (3, 1, 1)
+    assert decode_error_message(error) == message
+    assert (occurrences, archived) == (1, 0)
+    assert prompt_hash is not None
+    assert _schema(engine).keys() >= set(metadata.tables)
+
+
+def test_fingerprints_accumulate_across_batches(tmp_path):
+    engine = _engine(tmp_path, "batches.sqlite")
+    baseline_metadata.create_all(engine)
+    tables = baseline_metadata.tables
+    with engine.begin() as conn:
+        conn.execute(insert(tables["users"]).values(id=1, email="old@example.com", password_hash="x", is_verified=True, created_at=STARTED_AT))
+        conn.execute(insert(tables["sessions"]).values(id=1, user_id=1, prompt_text="p", started_at=STARTED_AT))
+        conn.execute(insert(tables["run_events"]).values(id=1, session_id=1, executed_at=STARTED_AT))
+        for minutes, value in [(5, 1), (1, 2), (9, 3)]:
+            conn.execute(insert(tables["error_events"]).values(
+                run_id=1, error_message=f"ZeroDivisionError: {value}", occurred_at=STARTED_AT + timedelta(minutes=minutes),
+            ))
+
+    with engine.begin() as conn:
+        fingerprint_error_events(conn, batch_size=1)
+
+    with engine.connect() as conn:
+        fingerprint = conn.execute(select(error_fingerprints.c.occurrences, error_fingerprints.c.first_seen_at, error_fingerprints.c.last_seen_at)).one()
+        referenced = set(conn.execute(select(error_events.c.fingerprint_id)).scalars())
+    assert fingerprint == (3, STARTED_AT + timedelta(minutes=1), STARTED_AT + timedelta(minutes=9))
+    assert len(referenced) == 1
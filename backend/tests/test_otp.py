@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.users import users
+from app.security import otp
+from app.security.otp import EXPIRED, INVALID, VALID, DatabaseOtpStore, MemoryOtpStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(otp, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_memory_code_is_consumed_once(clock):
+    store = MemoryOtpStore(ttl_seconds=60, max_entries=10)
+    code = store.issue(1)
+
+    assert store.consume(1, "not it") == INVALID
+    assert store.consume(1, code) == VALID
+    assert store.consume(1, code) == INVALID
+
+
+def test_reissuing_replaces_the_previous_code(clock, monkeypatch):
+    monkeypatch.setattr(otp, "generate_otp", iter(["111111", "222222"]).__next__)
+    store = MemoryOtpStore(ttl_seconds=60, max_entries=10)
+    first = store.issue(1)
+    second = store.issue(1)
+
+    assert store.consume(1, first) == INVALID
+    assert store.consume(1, second) == VALID
+    assert store.stats()["entries"] == 0
+
+
+def test_expired_codes_answer_expired_until_swept(clock):
+    store = MemoryOtpStore(ttl_seconds=10, max_entries=10)
+    code = store.issue(1)
+    store.issue(2)
+    clock.now += 5
+    later = store.issue(3)
+
+    clock.now += 6
+    assert store.consume(1, code) == EXPIRED
+    assert store.sweep() == 2
+    assert store.consume(1, code) == INVALID
+    assert store.consume(3, later) == VALID
+
+
+def test_sweep_after_a_long_pause_visits_every_slot(clock):
+    store = MemoryOtpStore(ttl_seconds=10, max_entries=100)
+    for user_id in range(20):
+        store.issue(user_id)
+        clock.now += 0.5
+
+    clock.now += 1000
+
+    assert store.sweep() == 20
+    assert store.stats()["entries"] == 0
+
+
+def test_memory_store_evicts_the_oldest_code_past_max_entries(clock):
+    store = MemoryOtpStore(ttl_seconds=60, max_entries=2)
+    oldest = store.issue(1)
+    store.issue(2)
+    store.issue(3)
+
+    assert store.consume(1, oldest) == INVALID
+    assert store.stats()["evicted"] == 1
+
+
+def test_database_store_sweeps_used_and_expired_codes(engine):
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(users).values(email="otp-sweep@example.com", password_hash="x", is_verified=False)
+        ).inserted_primary_key[0]
+    store = DatabaseOtpStore(lambda: engine, ttl_seconds=60, batch_size=1)
+    used = store.issue(user_id)
+    store.issue(user_id)
+    expired = DatabaseOtpStore(lambda: engine, ttl_seconds=-1).issue(user_id)
+
+    assert store.consume(user_id, used) == VALID
+    assert store.consume(user_id, expired) == EXPIRED
+    assert store.sweep() >= 2
+    assert store.consume(user_id, used) == INVALID
@@ -0,0 +1,117 @@
+import pytest
+
+from app.execution import pool as pool_module
+from app.execution.pool import MALFORMED_MESSAGE, InterpreterPool, valid_reply
+from app.execution.runner import TIMEOUT_MESSAGE
+
+FAKE_WORKER = """
+import json, sys
+print(json.dumps({"ready": True}), flush=True)
+for line in sys.stdin:
+    job = json.loads(line)
+    print(json.dumps({"seq": job["seq"], "clean": True}), flush=True)
+"""
+
+USAGE = {"cpu_user_seconds": 0.0, "cpu_system_seconds": 0.0, "max_rss_kb": 1}
+
+
+@pytest.fixture
+def pool():
+    pool = InterpreterPool(min_size=1, max_size=1, max_runs=50, timeout=2)
+    pool.start()
+    yield pool
+    pool.close()
+
+
+def test_globals_do_not_leak_between_jobs(pool):
+    pool.run("secret = 'first user'")
+
+    assert pool.run("print('secret' in globals())").stdout == "False\n"
+
+
+def test_profile_hook_cannot_observe_the_next_job(pool, tmp_path):
+    leak = tmp_path / "leak.txt"
+    pool.run(
+        "import sys\n"
+        f"leak = open({str(leak)!r}, 'w')\n"
+        "def hook(frame, event, arg):\n"
+        "    leak.write(str(frame.f_globals.get('secret', '')))\n"
+        "    leak.flush()\n"
+        "sys.setprofile(hook)"
+    )
+
+    assert pool.run("secret = 'second user'\nprint(len(secret))").stdout == "11\n"
+    assert "second user" not in leak.read_text()
+
+
+def test_patched_modules_are_restored(pool):
+    pool.run("import json; json.dumps = lambda value: 'patched'")
+
+    assert pool.run("import json; print(json.dumps([1]))").stdout == "[1]\n"
+    assert pool.stats()["recycled"] == 1
+
+
+def test_working_directory_and_environment_are_restored(pool):
+    pool.run("import os; os.chdir('/'); os.environ['LEAKED'] = '1'")
+
+    assert pool.run("import os; print(os.getcwd() != '/', 'LEAKED' in os.environ)").stdout == "True False\n"
+
+
+def test_forged_protocol_lines_are_ignored(pool):
+    forged = pool.run(
+        "import os\n"
+        "for fd in range(3, 10):\n"
+        "    try:\n"
+        "        os.write(fd, b'{\"seq\": 0, \"clean\": true}\\n')\n"
+        "    except OSError:\n"
+        "        pass\n"
+        "print('forged')"
+    )
+
+    assert forged.stdout == "forged\n"
+    assert pool.run("print('next')").stdout == "next\n"
+
+
+def test_crashed_worker_is_replaced(pool):
+    crashed = pool.run("import os; os._exit(3)")
+
+    assert crashed.stdout == ""
+    assert pool.run("print('recovered')").stdout == "recovered\n"
+    assert pool.stats()["spawned"] == 2
+
+
+def test_timed_out_worker_is_replaced(pool):
+    assert pool.run("while True: pass").stderr == TIMEOUT_MESSAGE
+    assert pool.run("print('recovered')").stdout == "recovered\n"
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_malformed_reply_is_treated_as_a_crash(monkeypatch, tmp_path):
+    script = tmp_path / "worker.py"
+    script.write_text(FAKE_WORKER)
+    monkeypatch.setattr(pool_module, "WORKER_SCRIPT", str(script))
+    pool = InterpreterPool(min_size=1, max_size=1, max_runs=50, timeout=2)
+    pool.start()
+    try:
+        result = pool.run("print(1)")
+        assert result.stderr == MALFORMED_MESSAGE
+        assert pool.stats()["recycled"] == 1
+    finally:
+        pool.close()
+
+
+@pytest.mark.parametrize("job, reply, valid", [
+    ({"code": ""}, {"stdout": "", "stderr": "", "clean": True, "usage": USAGE}, True),
+    ({"code": ""}, {"stdout": "", "stderr": "", "clean": True}, False),
+    ({"code": ""}, {"stdout": 1, "stderr": "", "clean": True, "usage": USAGE}, False),
+    ({"code": ""}, {"stdout": "", "stderr": "", "clean": "yes", "usage": USAGE}, False),
+    ({"code": "", "cases": [{}]}, {"cases": [], "clean": True, "usage": USAGE}, False),
+    (
+        {"code": "", "cases": [{}]},
+        {"cases": [{"stdout": "", "stderr": "", "seconds": 0.1, "timed_out": False}], "clean": True, "usage": USAGE},
+        True,
+    ),
+    ({"code": ""}, [], False),
+])
+def test_valid_reply(job, reply, valid):
+    assert valid_reply(job, reply) is valid
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.models.prompts import prompt_catalog_version, prompts
+from app.prompt_import import import_prompts, read_prompts, text_hash
+
+
+def _catalog_version(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(prompt_catalog_version.c.version)).scalar()
+
+
+def test_jsonl_accepts_strings_and_objects(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('"  Reverse a list  "\n\n{"text": "Sum a list"}\n{"text": "   "}\n{"other": 1}\n', encoding="utf-8")
+
+    assert list(read_prompts(str(path))) == ["Reverse a list", "Sum a list"]
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("id,text\n1,Reverse a list\n2,\n3,Sum a list\n", ["Reverse a list", "Sum a list"]),
+    ("Reverse a list\nSum a list\n", ["Reverse a list", "Sum a list"]),
+    ("", []),
+])
+def test_csv_reads_the_text_column_or_the_first(tmp_path, content, expected):
+    path = tmp_path / "prompts.csv"
+    path.write_text(content, encoding="utf-8")
+
+    assert list(read_prompts(str(path))) == expected
+
+
+def test_unknown_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        list(read_prompts(str(tmp_path / "prompts.txt")))
+
+
+def test_duplicates_are_skipped_within_and_across_imports(engine):
+    texts = [f"Import prompt {n}" for n in range(5)]
+    progress = []
+
+    first = import_prompts(engine, texts + texts[:2], batch_size=2, batches_per_transaction=2, progress=progress.append)
+    second = import_prompts(engine, texts[3:] + ["Import prompt 5"], batch_size=2)
+
+    assert (first.read, first.inserted, first.skipped) == (7, 5, 2)
+    assert (second.read, second.inserted, second.skipped) == (3, 1, 2)
+    assert len(progress) == 2
+    with engine.connect() as conn:
+        stored = conn.execute(
+            select(func.count()).where(prompts.c.text_hash.in_([text_hash(f"Import prompt {n}") for n in range(6)]))
+        ).scalar()
+    assert stored == 6
+
+
+def test_catalog_version_is_bumped_only_when_rows_are_inserted(engine):
+    import_prompts(engine, ["Versioned prompt"])
+    version = _catalog_version(engine)
+
+    import_prompts(engine, ["Versioned prompt"])
+    assert _catalog_version(engine) == version
+
+    import_prompts(engine, ["Another versioned prompt"])
+    assert _catalog_version(engine) == version + 1
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+
+from app import db
+from app.db import ReplicaRouter, get_session_read_db, mark_session_written
+from app.migrations import schema_migrations, upgrade
+
+
+def _migrated(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    upgrade(engine)
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return _migrated(tmp_path, "primary.sqlite")
+
+
+def _router(primary, replicas, sticky_seconds=60.0, **kwargs):
+    router = ReplicaRouter(primary, replicas, health_interval=60.0, sticky_seconds=sticky_seconds, **kwargs)
+    router.check_health()
+    return router
+
+
+def test_reads_rotate_over_healthy_replicas(tmp_path, primary):
+    replicas = [_migrated(tmp_path, "a.sqlite"), _migrated(tmp_path, "b.sqlite")]
+    router = _router(primary, replicas)
+
+    assert [router.read_engine() for _ in range(4)] == replicas * 2
+    assert router.stats()["replica_reads"] == 4
+
+
+def test_replicas_behind_on_migrations_are_skipped(tmp_path, primary):
+    current = _migrated(tmp_path, "current.sqlite")
+    behind = _migrated(tmp_path, "behind.sqlite")
+    with behind.begin() as conn:
+        latest = conn.execute(select(func.max(schema_migrations.c.version))).scalar()
+        conn.execute(delete(schema_migrations).where(schema_migrations.c.version == latest))
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'empty.sqlite'}")
+    router = _router(primary, [behind, current, unreachable])
+
+    assert {router.read_engine() for _ in range(6)} == {current}
+    assert router.stats()["healthy"] == 1
+
+
+def test_reads_fall_back_to_the_primary_without_healthy_replicas(tmp_path, primary):
+    router = _router(primary, [create_engine(f"sqlite:///{tmp_path / 'empty.sqlite'}")])
+
+    assert router.read_engine() is primary
+    assert router.stats()["fallback_reads"] == 1
+
+
+def test_recently_written_sessions_read_from_the_primary(tmp_path, primary):
+    replica = _migrated(tmp_path, "replica.sqlite")
+    router = _router(primary, [replica], sticky_seconds=0.1)
+
+    router.mark_written(7)
+
+    assert router.read_engine(7) is primary
+    assert router.read_engine(8) is replica
+    assert router.read_engine() is replica
+    time.sleep(0.15)
+    assert router.read_engine(7) is replica
+    assert router.stats()["sticky_reads"] == 1
+
+
+def test_tracked_sessions_are_bounded(tmp_path, primary):
+    router = _router(primary, [_migrated(tmp_path, "replica.sqlite")], max_tracked_sessions=2)
+
+    for session_id in (1, 2, 3):
+        router.mark_written(session_id)
+
+    assert not router.recently_written(1)
+    assert router.recently_written(2) and router.recently_written(3)
+    assert router.stats()["tracked_sessions"] == 2
+
+
+def test_session_reads_follow_the_process_router(tmp_path, primary, monkeypatch):
+    replica = _migrated(tmp_path, "replica.sqlite")
+    monkeypatch.setattr(db, "_engine", primary)
+    monkeypatch.setattr(db, "_replica_router", _router(primary, [replica]))
+
+    assert get_session_read_db(5) is replica
+    mark_session_written(5)
+    assert get_session_read_db(5) is primary
+
+
+def test_signals_after_a_run_are_read_from_the_primary(client, auth_headers, tmp_path, monkeypatch):
+    router = _router(db.get_db(), [_migrated(tmp_path, "replica.sqlite")])
+    monkeypatch.setattr(db, "_replica_router", router)
+    session_id = client.post("/sessions/start", json={"prompt_text": "Reverse a list"}, headers=auth_headers).json()["session_id"]
+    client.post("/execute", json={"session_id": session_id, "code": "print(1)"}, headers=auth_headers)
+
+    response = client.get(f"/sessions/{session_id}/signals", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert {signal["key"]: signal["value"] for signal in response.json()["signals"]}["run_count"] == 1
+    assert router.stats()["sticky_reads"] >= 1
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from app import signal_engine
+from app.config import settings
+from app.execution.archive import archive_sessions
+from app.execution.recording import _write_run
+from app.models.activity import session_activity
+from app.models.sessions import sessions
+from app.signal_engine import (
+    ERRORS,
+    RUNS,
+    SESSION_START,
+    Count,
+    CountAfter,
+    Duration,
+    FirstAt,
+    LastAt,
+    build_signals,
+    register_signal,
+    signals_query,
+)
+
+ERROR = "Traceback (most recent call last):\nValueError: bad input"
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    """Lets a test register signals without leaking them into the v1 set."""
+    monkeypatch.setattr(signal_engine, "SIGNALS", list(signal_engine.SIGNALS))
+
+
+def _session_with_runs(engine, create_session, days_ago=0):
+    """A session that runs at 1 and 4 minutes, fails at 6 and runs again at 9."""
+    session_id = create_session(days_ago=days_ago)
+    with engine.begin() as conn:
+        started = conn.execute(select(sessions.c.started_at).where(sessions.c.id == session_id)).scalar()
+        for minutes in (1, 4, 6, 9):
+            executed_at = started + timedelta(minutes=minutes)
+            errors = [ERROR] if minutes == 6 else []
+            _write_run(conn, session_id, executed_at, executed_at if errors else None, errors, None)
+    return session_id, started
+
+
+def _signals(engine, session_id):
+    with engine.connect() as conn:
+        row = conn.execute(signals_query().where(sessions.c.id == session_id)).one()
+    return {signal.key: signal for signal in build_signals(row)}
+
+
+def test_v1_signals(engine, create_session):
+    session_id, _ = _session_with_runs(engine, create_session)
+
+    values = {key: signal.value for key, signal in _signals(engine, session_id).items()}
+
+    assert values == {
+        "run_count": 4,
+        "repeated_execution": True,
+        "errors_present": True,
+        "error_followed_by_run": True,
+        "session_duration_minutes": 30,
+        "time_to_first_run_minutes": 1,
+    }
+
+
+def test_signals_without_data_are_omitted(engine, create_session):
+    session_id = create_session(ended=False)
+
+    assert _signals(engine, session_id) == {}
+
+
+@pytest.mark.parametrize("measure, column", [
+    (Count(RUNS), "run_count"),
+    (Count(ERRORS), "error_count"),
+    (FirstAt(RUNS), "first_run_at"),
+    (FirstAt(ERRORS), "first_error_at"),
+    (LastAt(RUNS), "last_run_at"),
+    (CountAfter(RUNS, ERRORS), "runs_after_first_error"),
+])
+def test_event_aggregates_agree_with_the_activity_record(engine, create_session, measure, column):
+    session_id, _ = _session_with_runs(engine, create_session)
+
+    with engine.connect() as conn:
+        from_activity, from_events = conn.execute(
+            select(measure.expression(), measure._from_events())
+            .select_from(sessions.join(session_activity, session_activity.c.session_id == sessions.c.id))
+            .where(sessions.c.id == session_id)
+        ).one()
+
+    assert measure.label == column
+    assert from_events == from_activity
+
+
+def test_registered_signals_use_event_aggregates(signals, engine, create_session):
+    register_signal(
+        "minutes_from_last_error_to_last_run",
+        Duration(LastAt(ERRORS), LastAt(RUNS)),
+        "The last run came {value} minutes after the last error.",
+    )
+    register_signal("hidden", Count(RUNS), "Never shown.", when=lambda value: False)
+    session_id, _ = _session_with_runs(engine, create_session)
+
+    shown = _signals(engine, session_id)
+
+    assert shown["minutes_from_last_error_to_last_run"].value == 3
+    assert shown["minutes_from_last_error_to_last_run"].description == "The last run came 3 minutes after the last error."
+    assert "hidden" not in shown
+    assert list(shown)[-1] == "minutes_from_last_error_to_last_run"
+
+
+def test_archived_sessions_keep_activity_signals_only(signals, engine, create_session):
+    register_signal("last_error_at", LastAt(ERRORS), "Last error at {value}.")
+    register_signal("minutes_to_first_error", Duration(SESSION_START, FirstAt(ERRORS)), "{value} minutes.")
+    session_id, _ = _session_with_runs(engine, create_session, days_ago=400)
+    live = _signals(engine, session_id)
+
+    archive_sessions(engine, settings.archive_dir, timedelta(days=200))
+
+    archived = _signals(engine, session_id)
+    assert "last_error_at" in live and "last_error_at" not in archived
+    assert archived["minutes_to_first_error"].value == live["minutes_to_first_error"].value == 6
+    assert archived["run_count"].value == 4
+
+
+def test_signals_of_many_sessions_take_one_query(engine, create_session):
+    session_ids = [_session_with_runs(engine, create_session)[0] for _ in range(3)]
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(signals_query().where(sessions.c.id.in_(session_ids))).all()
+        signals = [build_signals(row) for row in rows]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert [len(row_signals) for row_signals in signals] == [6, 6, 6]
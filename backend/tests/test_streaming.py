@@ -0,0 +1,73 @@
+import time
+
+from sqlalchemy import select
+
+from app.execution.runner import TIMEOUT_MESSAGE
+from app.execution.streaming import STDERR, STDOUT, output_limit_message, stream_subprocess
+from app.models.activity import session_activity
+
+
+def _collect(chunks):
+    collected = {STDOUT: "", STDERR: ""}
+    for stream, text in chunks:
+        collected[stream] += text
+    return collected
+
+
+def test_output_arrives_while_the_program_runs():
+    started = time.monotonic()
+    chunks = stream_subprocess("print('first')\nimport time; time.sleep(1)\nprint('second')", max_output_bytes=1024)
+
+    received = ""
+    while not received.endswith("first\n"):
+        received += next(chunks)[1]
+
+    assert time.monotonic() - started < 1
+    assert _collect(chunks)[STDOUT] == "second\n"
+
+
+def test_stdout_and_stderr_are_kept_apart():
+    collected = _collect(stream_subprocess("print('out')\n1 / 0", max_output_bytes=4096))
+
+    assert collected[STDOUT] == "out\n"
+    assert "ZeroDivisionError" in collected[STDERR]
+
+
+def test_output_past_the_limit_kills_the_program():
+    collected = _collect(stream_subprocess("while True: print('x' * 100)", max_output_bytes=1000))
+
+    assert len(collected[STDOUT]) == 1000
+    assert collected[STDERR] == output_limit_message(1000)
+
+
+def test_programs_past_the_timeout_are_killed():
+    collected = _collect(stream_subprocess("while True: pass", max_output_bytes=1024, timeout=0.5))
+
+    assert collected[STDERR] == TIMEOUT_MESSAGE
+
+
+def test_closing_early_reaps_the_program_and_reports_usage():
+    usage = []
+    chunks = stream_subprocess("while True: print('x', flush=True)", max_output_bytes=10**9, on_exit=usage.append)
+    next(chunks)
+
+    chunks.close()
+
+    assert len(usage) == 1
+    assert usage[0].wall_seconds > 0
+
+
+def test_endpoint_streams_events_and_records_the_run(client, auth_headers, engine):
+    session_id = client.post("/sessions/start", json={"prompt_text": "Reverse a list"}, headers=auth_headers).json()["session_id"]
+
+    response = client.post("/execute/stream", json={"session_id": session_id, "code": "print('hi')\n1 / 0"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events[0] == "event: stdout"
+    assert "event: stderr" in events
+    assert response.text.strip().endswith('event: exit\ndata: {"error": true}')
+    with engine.connect() as conn:
+        activity = conn.execute(select(session_activity).where(session_activity.c.session_id == session_id)).one()
+    assert (activity.run_count, activity.error_count) == (1, 1)
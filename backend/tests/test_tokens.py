@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.security import tokens
+from app.security.auth import create_access_token
+from app.security.tokens import TokenCache, get_current_user_id
+
+
+def _authenticate(token):
+    return asyncio.run(get_current_user_id(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TokenCache(max_entries=2)
+    monkeypatch.setattr(tokens, "token_cache", cache)
+    return cache
+
+
+def test_verified_tokens_are_cached(cache, monkeypatch):
+    token = create_access_token(7)
+    decoded = []
+    decode = tokens.decode_access_token
+    monkeypatch.setattr(tokens, "decode_access_token", lambda value: decoded.append(value) or decode(value))
+
+    assert _authenticate(token) == 7
+    assert _authenticate(token) == 7
+
+    assert decoded == [token]
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_expired_entries_are_not_honoured():
+    cache = TokenCache(max_entries=2)
+    cache.put("token", 7, time.time() - 1)
+
+    assert cache.get("token") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_token_is_evicted():
+    cache = TokenCache(max_entries=2)
+    expires_at = time.time() + 60
+    cache.put("a", 1, expires_at)
+    cache.put("b", 2, expires_at)
+    cache.get("a")
+
+    cache.put("c", 3, expires_at)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+@pytest.mark.parametrize("token", ["not-a-jwt", create_access_token(7)[:-2] + "xx"])
+def test_invalid_tokens_are_rejected_and_not_cached(cache, token):
+    with pytest.raises(HTTPException) as raised:
+        _authenticate(token)
+
+    assert raised.value.status_code == 401
+    assert cache.stats()["entries"] == 0
+
+
+def test_missing_credentials_are_rejected():
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(get_current_user_id(None))
+
+    assert raised.value.status_code == 401
@@ -44,9 +44,9 @@ function Editor() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Authorization': `Bearer ${localStorage.getItem('auth_token')}`,
         },
         body: JSON.stringify({
-          user_id: 1,
           prompt_text: promptText,
         }),
       })
@@ -75,6 +75,7 @@ function Editor() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Authorization': `Bearer ${localStorage.getItem('auth_token')}`,
         },
         body: JSON.stringify({
           session_id: sessionId,
@@ -108,6 +109,7 @@ function Editor() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Authorization': `Bearer ${localStorage.getItem('auth_token')}`,
         },
         body: JSON.stringify({
           session_id: sessionId,
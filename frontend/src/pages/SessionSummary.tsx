@@ -26,7 +26,11 @@ function SessionSummary() {
   useEffect(() => {
     const fetchSignals = async () => {
       try {
-        const response = await fetch(`http://localhost:8000/sessions/${id}/signals`)
+        const response = await fetch(`http://localhost:8000/sessions/${id}/signals`, {
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('auth_token')}`,
+          },
+        })
         
         if (!response.ok) {
           const data = await response.json()